@@ -1,6 +1,11 @@
+import os
+
 from flask import Flask, jsonify
 from flask_cors import CORS
 
+from config import Config
+from database.migrations import migrate
+
 app = Flask(__name__)
 
 # 启用调试模式
@@ -9,10 +14,20 @@ app.debug = True
 # 简化 CORS 配置
 CORS(app, resources={r"/*": {"origins": "*"}})
 
+# 启动时将数据库迁移到最新版本
+migrate('finance.db')
+
 # 注册路由
-from routes.fund import fund_bp
+from routes.fund import fund_bp, nav_scheduler
 app.register_blueprint(fund_bp, url_prefix='/api/fund')
 
+# 启动后台净值刷新任务。调试模式下 werkzeug 的重载器会在子进程中再次执行本文件，
+# 只在实际处理请求的子进程中启动；被其他脚本导入（如压测）时不启动
+if Config.NAV_SCHEDULER_ENABLED and (
+    not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+):
+    nav_scheduler.start()
+
 # 测试路由
 @app.route('/')
 def index():
@@ -2,3 +2,69 @@ class Config:
     DATABASE = 'finance.db'
     DEBUG = True
     SECRET_KEY = 'your-secret-key'  # 请更改为随机字符串
+
+    # 批量刷新净值时并发请求估值接口的线程数
+    NAV_REFRESH_WORKERS = 8
+
+    # 外部接口 HTTP 客户端配置：每个主机的连接池大小、超时（秒）和失败重试
+    HTTP_POOL_CONNECTIONS = 10  # 缓存连接池的主机数
+    HTTP_POOL_MAXSIZE = 16  # 每个主机保持的最大连接数，应不小于 NAV_REFRESH_WORKERS
+    HTTP_TIMEOUT = 10
+    HTTP_MAX_RETRIES = 2
+    HTTP_BACKOFF_FACTOR = 0.3
+
+    # 异步 HTTP 客户端（async_http_client）：同时进行的最大请求数和保持的空闲连接数，
+    # 超时和重试与同步客户端一致
+    ASYNC_HTTP_MAX_CONNECTIONS = 200
+    ASYNC_HTTP_MAX_KEEPALIVE = 32
+
+    # 基金估值缓存：盘中的有效期（秒）和最多缓存的基金数。收盘后缓存到当天净值的发布时间，
+    # 之后官方净值仍未公布时每 ESTIMATE_CACHE_TTL_PENDING 秒重新获取，
+    # 公布后缓存到下一个交易时段开盘
+    ESTIMATE_CACHE_TTL_TRADING = 60
+    ESTIMATE_CACHE_TTL_PENDING = 600
+    ESTIMATE_CACHE_MAXSIZE = 1024
+
+    # 接口响应缓存（持仓、基金设置、交易记录）：最多缓存的响应数和有效期（秒），
+    # 数据库中的数据版本变化后整体清空，有效期只用于释放不再使用的条目
+    RESPONSE_CACHE_MAXSIZE = 256
+    RESPONSE_CACHE_TTL = 3600
+
+    # 基金详情（基金经理、规模、成立日等）抓取后在数据库中的有效天数，过期后重新抓取
+    FUND_INFO_REFRESH_DAYS = 7
+
+    # 基金详情页解析后端：fragment（只截取所需片段）、lxml 或 bs4，失败时回退到 bs4
+    FUND_PAGE_PARSER = 'fragment'
+
+    # 历史净值批量回填：每页条数和并发请求的分页数
+    NAV_BACKFILL_PAGE_SIZE = 100
+    NAV_BACKFILL_WORKERS = 8
+
+    # SQLite 连接：是否使用连接池复用连接、最多保留的空闲连接数、
+    # 忙等待超时（秒）和每个连接缓存的已编译语句数
+    DB_CONNECTION_POOL = True
+    DB_POOL_SIZE = 8
+    DB_BUSY_TIMEOUT = 5
+    DB_CACHED_STATEMENTS = 256
+
+    # 交易记录列表：分页的默认和最大每页条数，流式导出时每次从游标读取的条数
+    TRANSACTIONS_PAGE_SIZE = 100
+    TRANSACTIONS_MAX_PAGE_SIZE = 1000
+    TRANSACTIONS_STREAM_BATCH = 500
+
+    # 批量导入交易记录：单次请求最多的条数
+    TRANSACTIONS_BULK_MAX_ROWS = 10000
+
+    # 批量获取当前净值：单次请求最多的基金数
+    NAV_BATCH_MAX_CODES = 200
+
+    # 交易日历：沪深交易所休市日文件，相对路径相对 backend 目录
+    TRADING_HOLIDAYS_FILE = 'data/trading_holidays.txt'
+
+    # 后台净值刷新：是否随应用启动、检查任务的间隔（秒）、盘中刷新估值的间隔（分钟）、
+    # 收盘后检查官方净值是否发布的间隔（分钟）和每天预热的历史净值交易日数
+    NAV_SCHEDULER_ENABLED = True
+    NAV_SCHEDULER_TICK = 30
+    NAV_SCHEDULER_ESTIMATE_INTERVAL = 5
+    NAV_SCHEDULER_OFFICIAL_INTERVAL = 30
+    NAV_SCHEDULER_HISTORY_DAYS = 30
@@ -0,0 +1,162 @@
+"""SQLite 连接池
+
+FundService 的每个方法都会获取连接并在结束时 close()。这里把 close() 变为
+归还连接，连接在请求之间复用，已编译的语句缓存（cached_statements）也随之复用。
+
+- 连接以 WAL 模式打开，读写互不阻塞，并设置 synchronous=NORMAL 和忙等待超时
+- 同一线程在归还之前再次获取连接（方法内部调用其他方法）时返回同一个连接，
+  不会在同一线程中打开第二个连接而互相锁住
+- Config.DB_CONNECTION_POOL 为 False 时退回每次调用新建连接的方式
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List
+
+from config import Config
+
+
+class PooledConnection:
+    """连接池中连接的代理，close() 时归还连接而不是关闭"""
+
+    def __init__(self, pool: "ConnectionPool", conn: sqlite3.Connection):
+        self._pool = pool
+        self._conn = conn
+        self._released = False
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    def __enter__(self) -> sqlite3.Connection:
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc_info) -> Any:
+        return self._conn.__exit__(*exc_info)
+
+    def close(self) -> None:
+        if not self._released:
+            self._released = True
+            self._pool._release()
+
+
+class ConnectionPool:
+    """按数据库文件共享的连接池"""
+
+    def __init__(self, db_name: str):
+        self.db_name = db_name
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._wal_enabled = False
+        self.created = 0
+        self.checkouts = 0
+        self.reuses = 0
+        self.nested = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.rollbacks = 0
+        self.discarded = 0
+
+    def connection(self):
+        """获取当前线程的连接，用完后调用 close() 归还"""
+        if not Config.DB_CONNECTION_POOL:
+            conn = sqlite3.connect(self.db_name)
+            conn.row_factory = sqlite3.Row
+            return conn
+
+        local = self._local
+        if getattr(local, "conn", None) is None:
+            local.conn = self._checkout()
+            local.depth = 0
+        else:
+            with self._lock:
+                self.nested += 1
+        local.depth += 1
+        return PooledConnection(self, local.conn)
+
+    def _checkout(self) -> sqlite3.Connection:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            if self._idle:
+                self.reuses += 1
+                return self._idle.pop()
+        return self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=Config.DB_BUSY_TIMEOUT,
+            cached_statements=Config.DB_CACHED_STATEMENTS,
+            check_same_thread=False,  # 连接会在线程之间传递，但同一时间只由一个线程使用
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous = NORMAL")
+        if not self._wal_enabled:
+            # journal_mode 保存在数据库文件中，只需设置一次
+            conn.execute("PRAGMA journal_mode = WAL")
+            self._wal_enabled = True
+        with self._lock:
+            self.created += 1
+        return conn
+
+    def _release(self) -> None:
+        local = self._local
+        local.depth -= 1
+        if local.depth > 0:
+            return
+
+        conn, local.conn = local.conn, None
+        # 未提交的事务不能带到下一次使用中
+        if conn.in_transaction:
+            conn.rollback()
+            with self._lock:
+                self.rollbacks += 1
+
+        with self._lock:
+            self.in_use -= 1
+            if len(self._idle) < Config.DB_POOL_SIZE:
+                self._idle.append(conn)
+                return
+            self.discarded += 1
+        conn.close()
+
+    def close_all(self) -> None:
+        """关闭所有空闲连接"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回连接池的运行指标"""
+        with self._lock:
+            return {
+                "enabled": Config.DB_CONNECTION_POOL,
+                "db_name": self.db_name,
+                "pool_size": Config.DB_POOL_SIZE,
+                "idle": len(self._idle),
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "created": self.created,
+                "checkouts": self.checkouts,
+                "reuse_rate": self.reuses / self.checkouts if self.checkouts else 0,
+                "nested": self.nested,
+                "rollbacks": self.rollbacks,
+                "discarded": self.discarded,
+            }
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_name: str) -> ConnectionPool:
+    """获取数据库文件对应的连接池"""
+    path = os.path.abspath(db_name)
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
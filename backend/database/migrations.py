@@ -0,0 +1,452 @@
+"""数据库结构迁移
+
+使用 SQLite 的 PRAGMA user_version 记录数据库当前的结构版本，按顺序执行尚未
+应用的迁移。每个迁移在单独的事务中执行并同时更新 user_version，失败时整体回滚，
+因此可以在原有数据库上直接增加索引、缓存表和快照表，无需导出再导入数据。
+
+新增结构变更时，在 MIGRATIONS 末尾追加一个迁移函数即可，已发布的迁移不要再修改。
+迁移函数需要兼容此前由 FundService 自动补齐过部分表和字段的数据库，
+因此建表和加字段都使用 IF NOT EXISTS / add_column_if_missing。
+"""
+
+import calendar
+import os
+import sqlite3
+from typing import Callable, List, Optional, Tuple
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql")
+
+
+def table_exists(cursor: sqlite3.Cursor, table: str) -> bool:
+    """判断表是否存在"""
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    )
+    return cursor.fetchone() is not None
+
+
+def add_column_if_missing(
+    cursor: sqlite3.Cursor, table: str, column: str, column_type: str
+) -> None:
+    """字段不存在时为表增加字段"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+
+def execute_script(cursor: sqlite3.Cursor, script: str) -> None:
+    """在当前事务中逐条执行 SQL 脚本
+
+    sqlite3 的 executescript 会先提交当前事务，这里按完整语句拆分后逐条执行。
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            cursor.execute(statement)
+            statement = ""
+    if statement.strip():
+        cursor.execute(statement)
+
+
+def _create_baseline(cursor: sqlite3.Cursor) -> None:
+    """版本1：基金表和交易表（schema.sql）"""
+    if table_exists(cursor, "funds"):
+        return
+    with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+        execute_script(cursor, f.read())
+
+
+def _create_nav_history(cursor: sqlite3.Cursor) -> None:
+    """版本2：历史净值缓存表"""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS nav_history (
+            fund_code TEXT NOT NULL,
+            nav_date DATE NOT NULL,
+            unit_value REAL NOT NULL,
+            cumulative_value REAL,
+            daily_growth REAL,
+            PRIMARY KEY (fund_code, nav_date)  -- 主键即 (fund_code, nav_date) 索引
+        )
+    """
+    )
+
+
+def _add_fund_detail_columns(cursor: sqlite3.Cursor) -> None:
+    """版本3：funds 表保存从基金详情页抓取的资料"""
+    for column, column_type in (
+        ("manager", "TEXT"),
+        ("scale", "TEXT"),
+        ("establish_date", "TEXT"),
+        ("risk_level", "TEXT"),
+        ("company", "TEXT"),
+        ("purchase_fee", "REAL"),
+        ("info_fetched_at", "DATETIME"),  # 基金资料的抓取时间
+    ):
+        add_column_if_missing(cursor, "funds", column, column_type)
+
+
+def _create_positions(cursor: sqlite3.Cursor) -> None:
+    """版本4：持仓快照表和月末持仓检查点表，并根据已有交易记录初始化"""
+    position_columns = """
+        total_shares REAL NOT NULL DEFAULT 0,       -- 持有份额
+        total_cost REAL NOT NULL DEFAULT 0,         -- 持仓成本（移动加权平均）
+        realized_profit REAL NOT NULL DEFAULT 0,    -- 已实现收益
+        total_buy_amount REAL NOT NULL DEFAULT 0,
+        total_sell_amount REAL NOT NULL DEFAULT 0,
+        total_buy_shares REAL NOT NULL DEFAULT 0,
+        total_sell_shares REAL NOT NULL DEFAULT 0,
+        last_buy_nav REAL,
+        last_buy_date DATE,
+        last_sell_nav REAL,
+        last_sell_date DATE,
+        last_transaction_date DATE,                 -- 快照中最后一笔交易的日期
+    """
+    # 持仓快照表：每个基金按时间顺序计入全部交易后的持仓，随交易的增删改同步维护
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS positions (
+            fund_code TEXT PRIMARY KEY,
+            {position_columns}
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+    )
+    # 月末持仓检查点：每个基金每个有交易的月份，保存月末时的持仓快照，
+    # 查询历史某天的持仓时从之前最近的检查点开始重放
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS position_checkpoints (
+            fund_code TEXT NOT NULL,
+            checkpoint_date DATE NOT NULL,              -- 月末日期
+            {position_columns}
+            PRIMARY KEY (fund_code, checkpoint_date)
+        )
+    """
+    )
+    _init_positions_v4(cursor)
+
+
+def _init_positions_v4(cursor: sqlite3.Cursor) -> None:
+    """按版本4时的移动加权平均成本法重放已有交易，写入持仓快照和月末检查点
+
+    迁移不依赖 FundService：之后持仓计算的实现如何变化，这个迁移的结果都不变。
+    """
+    fields = (
+        "total_shares",
+        "total_cost",
+        "realized_profit",
+        "total_buy_amount",
+        "total_sell_amount",
+        "total_buy_shares",
+        "total_sell_shares",
+        "last_buy_nav",
+        "last_buy_date",
+        "last_sell_nav",
+        "last_sell_date",
+        "last_transaction_date",
+    )
+
+    def month_end(date: str) -> str:
+        year, month = int(date[:4]), int(date[5:7])
+        return f"{year:04d}-{month:02d}-{calendar.monthrange(year, month)[1]:02d}"
+
+    positions = {}
+    checkpoints = []
+    cursor.execute(
+        """
+        SELECT fund_code, transaction_type, amount, nav, shares, transaction_date
+        FROM fund_transactions
+        ORDER BY fund_code, transaction_date, transaction_id
+    """
+    )
+    for fund_code, tx_type, amount, nav, shares, tx_date in cursor.fetchall():
+        position = positions.get(fund_code)
+        if position is None:
+            position = positions[fund_code] = dict.fromkeys(fields)
+            for field in fields[:7]:
+                position[field] = 0.0
+        elif tx_date > month_end(position["last_transaction_date"]):
+            checkpoints.append(
+                (fund_code, month_end(position["last_transaction_date"]), position)
+            )
+            position = positions[fund_code] = dict(position)
+
+        if tx_type == "buy":
+            position["total_buy_amount"] += amount
+            position["total_buy_shares"] += shares
+            position["last_buy_nav"] = nav
+            position["last_buy_date"] = tx_date
+            position["total_shares"] += shares
+            position["total_cost"] += amount
+        elif tx_type == "sell":
+            position["total_sell_amount"] += amount
+            position["total_sell_shares"] += shares
+            position["last_sell_nav"] = nav
+            position["last_sell_date"] = tx_date
+            avg_cost = (
+                position["total_cost"] / position["total_shares"]
+                if position["total_shares"] > 0
+                else 0
+            )
+            position["total_shares"] -= shares
+            sell_cost = shares * avg_cost
+            position["realized_profit"] += shares * nav - sell_cost
+            position["total_cost"] -= sell_cost
+        position["last_transaction_date"] = tx_date
+
+    for fund_code, position in positions.items():
+        checkpoints.append(
+            (fund_code, month_end(position["last_transaction_date"]), position)
+        )
+
+    columns = ", ".join(fields)
+    placeholders = ", ".join("?" * len(fields))
+    cursor.execute("DELETE FROM positions")
+    cursor.execute("DELETE FROM position_checkpoints")
+    cursor.executemany(
+        f"""
+        INSERT INTO positions (fund_code, {columns}, updated_at)
+        VALUES (?, {placeholders}, CURRENT_TIMESTAMP)
+    """,
+        [
+            (fund_code, *(position[field] for field in fields))
+            for fund_code, position in positions.items()
+        ],
+    )
+    cursor.executemany(
+        f"""
+        INSERT INTO position_checkpoints (fund_code, checkpoint_date, {columns})
+        VALUES (?, ?, {placeholders})
+    """,
+        [
+            (fund_code, checkpoint_date, *(position[field] for field in fields))
+            for fund_code, checkpoint_date, position in checkpoints
+        ],
+    )
+
+
+def _create_ledger_indexes(cursor: sqlite3.Cursor) -> None:
+    """版本5：交易表索引和基金名称全文索引"""
+    # 按基金、日期、交易ID 顺序重放持仓时直接读取该覆盖索引，无需回表和排序
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_fund_transactions_fund_date
+        ON fund_transactions (fund_code, transaction_date, transaction_id,
+                              transaction_type, amount, nav, shares)
+    """
+    )
+    # 交易列表按日期筛选和倒序排列
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_fund_transactions_date
+        ON fund_transactions (transaction_date)
+    """
+    )
+
+    # 基金名称的 trigram 全文索引，用于按名称模糊搜索；
+    # SQLite 未编译 FTS5 或版本低于 3.34 时跳过，按名称搜索退回 LIKE
+    if table_exists(cursor, "funds_fts"):
+        return
+    try:
+        cursor.execute(
+            """
+            CREATE VIRTUAL TABLE funds_fts
+            USING fts5(fund_code UNINDEXED, fund_name, tokenize = 'trigram')
+        """
+        )
+    except sqlite3.OperationalError as e:
+        print(f"创建基金名称全文索引失败，按名称搜索将使用 LIKE: {str(e)}")
+        return
+
+    # INSERT OR REPLACE 替换行时不会触发删除触发器，因此插入时先按代码删除旧条目
+    execute_script(
+        cursor,
+        """
+        CREATE TRIGGER IF NOT EXISTS funds_fts_insert AFTER INSERT ON funds BEGIN
+            DELETE FROM funds_fts WHERE fund_code = new.fund_code;
+            INSERT INTO funds_fts (fund_code, fund_name)
+            VALUES (new.fund_code, new.fund_name);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS funds_fts_update
+        AFTER UPDATE OF fund_code, fund_name ON funds BEGIN
+            DELETE FROM funds_fts WHERE fund_code = old.fund_code;
+            INSERT INTO funds_fts (fund_code, fund_name)
+            VALUES (new.fund_code, new.fund_name);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS funds_fts_delete AFTER DELETE ON funds BEGIN
+            DELETE FROM funds_fts WHERE fund_code = old.fund_code;
+        END;
+
+        INSERT INTO funds_fts (fund_code, fund_name)
+        SELECT fund_code, fund_name FROM funds;
+    """,
+    )
+
+
+def _add_fund_nav_reference_columns(cursor: sqlite3.Cursor) -> None:
+    """版本6：funds 表保存净值日期、上一个交易日净值和日涨幅"""
+    for column, column_type in (
+        ("nav_date", "DATE"),  # current_nav 对应的交易日
+        ("prev_nav", "REAL"),  # nav_date 之前最近一个交易日的净值
+        ("prev_nav_date", "DATE"),
+        ("daily_growth_rate", "REAL"),  # current_nav 相对 prev_nav 的涨幅
+    ):
+        add_column_if_missing(cursor, "funds", column, column_type)
+
+
+def _create_fund_detail_cache(cursor: sqlite3.Cursor) -> None:
+    """版本7：尚未加入 funds 表的基金的详情页资料缓存表"""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS fund_detail_cache (
+            fund_code TEXT PRIMARY KEY,
+            fund_name TEXT,
+            fund_type TEXT,
+            manager TEXT,
+            scale TEXT,
+            establish_date TEXT,
+            risk_level TEXT,
+            company TEXT,
+            purchase_fee REAL,
+            info_fetched_at DATETIME
+        )
+    """
+    )
+
+
+def _create_data_version(cursor: sqlite3.Cursor) -> None:
+    """版本8：数据版本号表和维护它的触发器"""
+    # 只有一行：token 在建表时随机生成，用于区分重建过的数据库；
+    # version 在接口结果所依赖的数据变化时由下面的触发器加一
+    execute_script(
+        cursor,
+        """
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            token TEXT NOT NULL,
+            version INTEGER NOT NULL
+        );
+
+        INSERT OR IGNORE INTO data_version (id, token, version)
+        VALUES (1, lower(hex(randomblob(8))), 0);
+    """,
+    )
+
+    bump = "UPDATE data_version SET version = version + 1;"
+    for table in ("fund_transactions", "positions"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_data_version_{event.lower()}
+                AFTER {event} ON {table} BEGIN {bump} END
+            """
+            )
+
+    # funds 只在接口返回的字段变化时加一，更新基金经理、规模等详情资料不影响版本号
+    for event in ("INSERT", "DELETE"):
+        cursor.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS funds_data_version_{event.lower()}
+            AFTER {event} ON funds BEGIN {bump} END
+        """
+        )
+    watched = (
+        "fund_code",
+        "fund_name",
+        "fund_type",
+        "buy_fee",
+        "current_nav",
+        "last_update_time",
+        "nav_date",
+        "daily_growth_rate",
+    )
+    changed = " OR ".join(f"old.{column} IS NOT new.{column}" for column in watched)
+    cursor.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS funds_data_version_update
+        AFTER UPDATE ON funds WHEN {changed} BEGIN {bump} END
+    """
+    )
+
+
+# 按版本顺序排列的迁移，下标 + 1 即迁移完成后的版本号
+MIGRATIONS: List[Callable[[sqlite3.Cursor], None]] = [
+    _create_baseline,
+    _create_nav_history,
+    _add_fund_detail_columns,
+    _create_positions,
+    _create_ledger_indexes,
+    _add_fund_nav_reference_columns,
+    _create_fund_detail_cache,
+    _create_data_version,
+]
+
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    """读取数据库当前的结构版本"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(
+    db_name: str = "finance.db", target_version: Optional[int] = None
+) -> Tuple[int, int]:
+    """将数据库迁移到目标版本
+
+    Args:
+        db_name: 数据库文件路径，不存在时会新建
+        target_version: 目标版本，默认迁移到最新版本
+
+    Returns:
+        (迁移前版本, 迁移后版本)
+    """
+    target_version = LATEST_VERSION if target_version is None else target_version
+    # 自动提交模式，由这里显式控制每个迁移的事务
+    conn = sqlite3.connect(db_name, isolation_level=None)
+    try:
+        conn.execute("PRAGMA busy_timeout = 30000")
+        start_version = version = get_version(conn)
+        if version > LATEST_VERSION:
+            raise RuntimeError(
+                f"数据库版本 {version} 高于程序支持的最新版本 {LATEST_VERSION}"
+            )
+
+        cursor = conn.cursor()
+        while version < target_version:
+            migration = MIGRATIONS[version]
+            # 获取写锁后再确认版本，避免多个进程同时执行同一个迁移
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                if get_version(conn) != version:
+                    cursor.execute("ROLLBACK")
+                    version = get_version(conn)
+                    continue
+                migration(cursor)
+                cursor.execute(f"PRAGMA user_version = {version + 1}")
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            version += 1
+            print(f"数据库已迁移: {migration.__doc__}")
+
+        return start_version, version
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="将数据库结构迁移到最新版本")
+    parser.add_argument("--db", default="finance.db", help="数据库文件路径")
+    parser.add_argument("--target", type=int, help="目标版本，默认最新版本")
+    args = parser.parse_args()
+
+    start, end = migrate(args.db, args.target)
+    print(f"数据库版本: {start} -> {end}（最新版本 {LATEST_VERSION}）")
@@ -1,3 +1,5 @@
+-- 数据库版本1的基础结构，之后的结构变更见 database/migrations.py
+
 -- 基金表：存储基金的基本信息和费率设置
 CREATE TABLE funds (
     fund_code TEXT PRIMARY KEY,  -- 使用 fund_code 作为主键
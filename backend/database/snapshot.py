@@ -0,0 +1,222 @@
+"""列式数据库快照
+
+将基金表、交易表和净值历史表按列保存为 Arrow IPC（默认）或 Parquet 文件，每张表
+一个文件，放在同一个快照目录中。分析任务可以用 read_table 以内存映射方式读取
+Arrow 文件，直接转换为 NumPy / pandas，无需重新解析 CSV 文本；恢复时按块写回
+SQLite。持仓快照和检查点可以由交易记录重建，不包含在快照中。
+
+列类型按 SQLite 声明类型的亲和性确定：INTEGER 为 int64，REAL 为 float64，
+其余（TEXT、DATE、DATETIME）为字符串，全部允许为空。与声明类型不符的值会直接报错，
+而不是被隐式转换，因此写回后的表内容与导出时完全一致。
+
+需要安装 pyarrow（可选依赖）。
+"""
+
+import os
+import sqlite3
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 为可选依赖
+    pa = None
+
+# 快照包含的表，按恢复顺序排列
+SNAPSHOT_TABLES = ("funds", "fund_transactions", "nav_history")
+
+# 快照文件格式和扩展名
+FORMATS = {"arrow": ".arrow", "parquet": ".parquet"}
+
+# 写入 Arrow 文件 schema 元数据的键
+_META_TABLE = b"fundtracker.table"
+_META_VERSION = b"fundtracker.schema_version"
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("列式快照需要安装 pyarrow: pip install pyarrow")
+
+
+def _arrow_type(declared_type: str) -> "pa.DataType":
+    """按 SQLite 类型亲和性规则将声明类型映射为 Arrow 类型"""
+    declared_type = declared_type.upper()
+    if "INT" in declared_type:
+        return pa.int64()
+    if any(name in declared_type for name in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    return pa.string()
+
+
+def table_schema(
+    cursor: sqlite3.Cursor, table: str, schema_version: int
+) -> "pa.Schema":
+    """根据表结构生成 Arrow schema"""
+    _require_pyarrow()
+    cursor.execute(f"PRAGMA table_info({table})")
+    fields = [pa.field(row[1], _arrow_type(row[2] or "")) for row in cursor.fetchall()]
+    if not fields:
+        raise ValueError(f"表不存在: {table}")
+    return pa.schema(
+        fields,
+        metadata={_META_TABLE: table, _META_VERSION: str(schema_version)},
+    )
+
+
+def _to_batch(
+    table: str, schema: "pa.Schema", rows: List[Tuple[Any, ...]]
+) -> "pa.RecordBatch":
+    """将一批行转换为 RecordBatch，值与列类型不符时报错"""
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(schema, columns):
+        try:
+            # from_pandas=False 时不会把 NaN 当作空值，保证浮点数原样保存
+            arrays.append(pa.array(values, type=field.type, from_pandas=False))
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ValueError(
+                f"{table}.{field.name} 包含与声明类型 {field.type} 不符的值: {e}"
+            ) from e
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def export_table(
+    conn: sqlite3.Connection,
+    table: str,
+    path: str,
+    fmt: str = "arrow",
+    chunk_size: int = 65536,
+    compression: Optional[str] = None,
+    schema_version: int = 0,
+) -> int:
+    """按游标分批读取表并写入快照文件，返回行数
+
+    Args:
+        conn: 数据库连接
+        table: 表名
+        path: 快照文件路径
+        fmt: arrow 或 parquet
+        chunk_size: 每批读取的行数
+        compression: 压缩算法（如 zstd、lz4），Arrow 文件压缩后无法零拷贝读取
+        schema_version: 写入元数据的数据库结构版本
+    """
+    cursor = conn.cursor()
+    schema = table_schema(cursor, table, schema_version)
+    # 按主键/rowid 顺序导出，恢复后的行顺序与原表一致
+    cursor.execute(f"SELECT {', '.join(schema.names)} FROM {table} ORDER BY rowid")
+
+    if fmt == "arrow":
+        options = pa_ipc.IpcWriteOptions(compression=compression)
+        writer = pa_ipc.new_file(path, schema, options=options)
+    elif fmt == "parquet":
+        writer = pq.ParquetWriter(path, schema, compression=compression or "snappy")
+    else:
+        raise ValueError(f"不支持的快照格式: {fmt}")
+
+    rows_written = 0
+    with writer:
+        while rows := cursor.fetchmany(chunk_size):
+            batch = _to_batch(table, schema, rows)
+            if fmt == "arrow":
+                writer.write_batch(batch)
+            else:
+                writer.write_table(pa.Table.from_batches([batch]))
+            rows_written += len(rows)
+    return rows_written
+
+
+def read_table(path: str) -> "pa.Table":
+    """读取快照文件
+
+    Arrow 文件以内存映射方式打开，未压缩时列数据直接引用映射的内存，
+    可以通过 column(name).to_numpy() 或 to_pandas() 零拷贝使用。
+    """
+    _require_pyarrow()
+    if path.endswith(FORMATS["parquet"]):
+        return pq.read_table(path, memory_map=True)
+    return pa_ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def snapshot_files(snapshot_dir: str) -> Dict[str, str]:
+    """返回快照目录中每张表对应的文件路径"""
+    files = {}
+    for table in SNAPSHOT_TABLES:
+        for extension in FORMATS.values():
+            path = os.path.join(snapshot_dir, table + extension)
+            if os.path.exists(path):
+                files[table] = path
+    return files
+
+
+def _iter_rows(
+    table: "pa.Table", columns: List[str], chunk_size: int
+) -> Iterator[List[Tuple[Any, ...]]]:
+    """按块产出表中指定列的行"""
+    for offset in range(0, table.num_rows, chunk_size):
+        chunk = table.slice(offset, chunk_size)
+        yield list(zip(*(chunk.column(name).to_pylist() for name in columns)))
+
+
+def restore_table(
+    conn: sqlite3.Connection,
+    table: str,
+    path: str,
+    chunk_size: int = 65536,
+    replace: bool = True,
+) -> int:
+    """将快照文件写回表中，返回行数
+
+    只写入快照和当前表结构都有的字段。replace 为 True 时先清空表，
+    恢复后的表内容与快照完全一致；否则按主键 INSERT OR REPLACE 合并。
+    调用方负责提交事务。
+    """
+    snapshot = read_table(path)
+    snapshot_table = (snapshot.schema.metadata or {}).get(_META_TABLE)
+    if snapshot_table and snapshot_table.decode() != table:
+        raise ValueError(f"快照文件 {path} 属于表 {snapshot_table.decode()}")
+
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({table})")
+    table_columns = {row[1] for row in cursor.fetchall()}
+    columns = [name for name in snapshot.schema.names if name in table_columns]
+
+    if replace:
+        cursor.execute(f"DELETE FROM {table}")
+    sql = "INSERT OR REPLACE INTO {} ({}) VALUES ({})".format(
+        table, ", ".join(columns), ", ".join("?" * len(columns))
+    )
+    for rows in _iter_rows(snapshot, columns, chunk_size):
+        cursor.executemany(sql, rows)
+    return snapshot.num_rows
+
+
+def _values_equal(value: Any, expected: Any) -> bool:
+    """比较表中的值和快照中的值，类型必须相同
+
+    SQLite 会把 NaN 保存为 NULL，因此快照中的 NaN 与表中的 NULL 或 NaN 都视为相等。
+    """
+    if isinstance(expected, float) and expected != expected:
+        return value is None or (isinstance(value, float) and value != value)
+    return type(value) is type(expected) and value == expected
+
+
+def verify_table(
+    conn: sqlite3.Connection, table: str, path: str, chunk_size: int = 65536
+) -> bool:
+    """检查表内容是否与快照文件完全一致
+
+    按块读取表并与快照的对应行逐个比较，不会一次性加载整张表。
+    """
+    snapshot = read_table(path)
+    columns = snapshot.schema.names
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid")
+    for expected in _iter_rows(snapshot, columns, chunk_size):
+        rows = cursor.fetchmany(len(expected))
+        if len(rows) != len(expected):
+            return False
+        for row, expected_row in zip(rows, expected):
+            if not all(map(_values_equal, row, expected_row)):
+                return False
+    return cursor.fetchone() is None
@@ -1,27 +1,25 @@
-import sqlite3
+import argparse
 import os
 
-def init_db():
-    # 检查数据库文件是否存在，如果存在则删除
-    if os.path.exists('finance.db'):
+from database.migrations import LATEST_VERSION, migrate
+
+
+def init_db(reset=False):
+    # 只有显式要求重置时才删除已有数据库
+    if reset and os.path.exists('finance.db'):
         os.remove('finance.db')
-    
-    # 创建新的数据库连接
-    conn = sqlite3.connect('finance.db')
-    cursor = conn.cursor()
-    
-    # 读取 schema.sql 文件
-    with open('database/schema.sql', 'r') as f:
-        schema = f.read()
-    
-    # 执行 SQL 语句r
-    cursor.executescript(schema)
-    
-    # 提交更改并关闭连接
-    conn.commit()
-    conn.close()
-    
-    print("数据库初始化完成！")
+
+    # 新数据库从版本1开始建表，已有数据库只执行尚未应用的迁移
+    start_version, version = migrate('finance.db')
+
+    if start_version == version:
+        print(f"数据库已是最新版本 {version}")
+    else:
+        print(f"数据库初始化完成！版本 {start_version} -> {version}（最新版本 {LATEST_VERSION}）")
+
 
 if __name__ == '__main__':
-    init_db() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='初始化数据库或迁移到最新版本')
+    parser.add_argument('--reset', action='store_true', help='删除已有数据库后重新创建')
+    args = parser.parse_args()
+    init_db(reset=args.reset)
@@ -1,45 +1,123 @@
-from flask import Blueprint, request, jsonify
+import hashlib
+import inspect
+import json
+import threading
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from config import Config
 from services.fund_service import FundService
+from services import async_http_client
+from services.eastmoney_api import estimate_cache, upstream_flights
+from services.nav_scheduler import NavRefreshScheduler
+from services.ttl_cache import TTLCache
+from database.connection import get_pool
 from functools import wraps
 
 fund_bp = Blueprint("fund", __name__)
 fund_service = FundService()
+# 后台净值刷新任务，由 app.py 启动
+nav_scheduler = NavRefreshScheduler(fund_service)
+
+# 序列化后的接口响应，键为 (接口, 参数, 数据版本, vary)，只保留当前数据版本的条目
+response_cache = TTLCache(maxsize=Config.RESPONSE_CACHE_MAXSIZE)
+_response_cache_version = None
+_response_cache_lock = threading.Lock()
+
+
+def _error_response(e):
+    if isinstance(e, ValueError):
+        return jsonify({"status": "error", "message": str(e)}), 400
+    print(f"API错误: {str(e)}")
+    return jsonify({"status": "error", "message": str(e)}), 500
 
 
 def handle_exceptions(f):
+    # 异步视图（需要请求外部接口的接口）同样处理异常
+    if inspect.iscoroutinefunction(f):
+
+        @wraps(f)
+        async def decorated_coroutine(*args, **kwargs):
+            try:
+                return await f(*args, **kwargs)
+            except Exception as e:
+                return _error_response(e)
+
+        return decorated_coroutine
+
     @wraps(f)
     def decorated_function(*args, **kwargs):
         try:
             return f(*args, **kwargs)
-        except ValueError as e:
-            return jsonify({"status": "error", "message": str(e)}), 400
         except Exception as e:
-            print(f"API错误: {str(e)}")
-            return jsonify({"status": "error", "message": str(e)}), 500
+            return _error_response(e)
 
     return decorated_function
 
 
+def cached_json(build, vary=None):
+    """按数据版本生成 ETag，并缓存序列化后的 JSON 响应
+
+    每个请求从数据库读取一次数据版本（FundService.data_version）。请求头
+    If-None-Match 与 ETag 一致时直接返回 304；否则从 response_cache 读取响应体，
+    没有时调用 build() 生成。数据版本变化后清空 response_cache，旧版本的响应体不会
+    留在缓存中。vary 为数据版本之外影响结果的值。响应带 Cache-Control: no-cache，
+    浏览器每次都会带上 ETag 重新验证。
+    """
+    global _response_cache_version
+    version = fund_service.data_version
+    params = tuple(sorted(request.args.items(multi=True)))
+    digest = hashlib.sha1(repr((request.endpoint, params, vary)).encode()).hexdigest()
+    etag = f"{version}-{digest[:16]}"
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        with _response_cache_lock:
+            if version != _response_cache_version:
+                response_cache.clear()
+                _response_cache_version = version
+
+        key = (request.endpoint, params, version, vary)
+        body = response_cache.get(key)
+        if body is None:
+            body = build().get_data()
+            with _response_cache_lock:
+                # 生成期间数据版本已变化时不再缓存
+                if version == _response_cache_version:
+                    response_cache.set(
+                        key,
+                        body,
+                        datetime.now() + timedelta(seconds=Config.RESPONSE_CACHE_TTL),
+                    )
+        response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
 # 基金基本信息接口
+# 以下需要请求外部接口的接口为异步视图，外部接口的请求在 async_http_client 的
+# 共享事件循环中进行
 @fund_bp.route("/funds/<fund_code>", methods=["GET"])
 @handle_exceptions
-def get_fund_info(fund_code):
+async def get_fund_info(fund_code):
     """获取基金基本信息"""
-    fund_info = fund_service.get_fund_info(fund_code)
+    fund_info = await fund_service.get_fund_info_async(fund_code)
     return jsonify({"status": "success", "data": fund_info})
 
 
 # 净值相关接口
 @fund_bp.route("/nav/<fund_code>", methods=["GET", "POST"])
 @handle_exceptions
-def handle_fund_nav(fund_code):
+async def handle_fund_nav(fund_code):
     """处理基金净值的获取和更新
 
     GET: 获取基金当前净值
     POST: 更新基金净值
     """
     if request.method == "GET":
-        nav_info = fund_service.fetch_current_nav(fund_code)
+        nav_info = await fund_service.fetch_current_nav_async(fund_code)
         if nav_info:
             return jsonify({"status": "success", "data": nav_info})
         return jsonify({"status": "error", "message": "获取净值失败"}), 404
@@ -50,11 +128,29 @@ def handle_fund_nav(fund_code):
         return jsonify({"status": "success", "message": "更新成功"})
 
 
+@fund_bp.route("/nav/batch", methods=["GET"])
+@handle_exceptions
+async def get_navs():
+    """批量获取基金当前净值
+
+    fund_codes 参数为逗号分隔的基金代码，也可以重复传入。
+    返回 {基金代码: 净值信息}，获取失败的基金为 null
+    """
+    fund_codes = [
+        code.strip()
+        for value in request.args.getlist("fund_codes")
+        for code in value.split(",")
+        if code.strip()
+    ]
+    navs = await fund_service.fetch_current_navs_async(fund_codes)
+    return jsonify({"status": "success", "data": navs})
+
+
 @fund_bp.route("/nav/<fund_code>/history/<date>", methods=["GET"])
 @handle_exceptions
-def get_historical_nav(fund_code, date):
+async def get_historical_nav(fund_code, date):
     """获取指定日期的基金净值"""
-    nav = fund_service.get_historical_nav(fund_code, date)
+    nav = await fund_service.get_historical_nav_async(fund_code, date)
     if nav:
         return jsonify({"status": "success", "data": {"date": date, "nav": nav}})
     return jsonify({"status": "error", "message": "未找到该日期的净值数据"}), 404
@@ -66,7 +162,7 @@ def update_navs():
     """批量更新基金净值
 
     如果请求体中包含 fund_codes 列表，则只更新指定基金
-    否则更新所有基金
+    否则更新所有基金。返回数据中包含总耗时以及每个基金的耗时和失败原因
     """
     data = request.get_json()
     if data and "fund_codes" in data:
@@ -76,11 +172,31 @@ def update_navs():
     return jsonify({"status": "success", "data": result})
 
 
+@fund_bp.route("/nav/history/backfill", methods=["POST"])
+@handle_exceptions
+def backfill_nav_history():
+    """批量回填基金历史净值
+
+    请求体可包含 fund_codes 列表（默认所有基金）和 start_date（最早回填到的日期），
+    已保存的净值会跳过，可重复调用以续传
+    """
+    data = request.get_json(silent=True) or {}
+    result = fund_service.backfill_nav_history(
+        fund_codes=data.get("fund_codes"), start_date=data.get("start_date")
+    )
+    return jsonify({"status": "success", "data": result})
+
+
 # 交易相关接口
 @fund_bp.route("/transactions", methods=["GET", "POST"])
 @handle_exceptions
 def handle_transactions():
-    """处理交易记录的查询和添加"""
+    """处理交易记录的查询和添加
+
+    GET 参数除筛选条件外还支持：
+    - limit / cursor: 按游标分页，返回 next_cursor 用于获取下一页
+    - format=ndjson: 以 NDJSON 流式返回全部符合条件的记录
+    """
     if request.method == "GET":
         filters = {
             "fund_code": request.args.get("fund_code"),
@@ -89,13 +205,60 @@ def handle_transactions():
             "end_date": request.args.get("end_date"),
             "transaction_type": request.args.get("transaction_type"),
         }
-        transactions = fund_service.get_transactions(filters)
-        return jsonify({"status": "success", "data": transactions})
+        # 流式导出：每行一个 JSON 对象（NDJSON），边读数据库边输出
+        if request.args.get("format") == "ndjson":
+            rows = fund_service.iter_transactions(filters)
+            return Response(
+                stream_with_context(
+                    json.dumps(row, ensure_ascii=False) + "\n" for row in rows
+                ),
+                mimetype="application/x-ndjson",
+            )
+
+        # 指定 limit 或 cursor 时按游标分页，否则返回全部记录
+        if "limit" in request.args or "cursor" in request.args:
+
+            def build():
+                transactions, next_cursor = fund_service.get_transactions_page(
+                    filters,
+                    request.args.get("limit", type=int),
+                    request.args.get("cursor"),
+                )
+                return jsonify(
+                    {
+                        "status": "success",
+                        "data": transactions,
+                        "next_cursor": next_cursor,
+                    }
+                )
+
+            return cached_json(build)
+
+        return cached_json(
+            lambda: jsonify(
+                {"status": "success", "data": fund_service.get_transactions(filters)}
+            )
+        )
     else:  # POST
         fund_service.add_transaction(request.json)
         return jsonify({"status": "success", "message": "交易添加成功"})
 
 
+@fund_bp.route("/transactions/bulk", methods=["POST"])
+@handle_exceptions
+def add_transactions_bulk():
+    """批量导入交易记录
+
+    请求体为 {"transactions": [...], "atomic": false}，每条记录的字段同添加交易接口。
+    返回每条失败记录的下标和原因；atomic 为 true 时有记录失败则全部不导入
+    """
+    data = request.get_json(silent=True) or {}
+    result = fund_service.add_transactions_bulk(
+        data.get("transactions"), atomic=bool(data.get("atomic", False))
+    )
+    return jsonify({"status": "success", "data": result})
+
+
 @fund_bp.route("/transactions/<int:transaction_id>", methods=["PUT", "DELETE"])
 @handle_exceptions
 def handle_transaction(transaction_id):
@@ -114,8 +277,11 @@ def handle_transaction(transaction_id):
 def handle_settings():
     """处理基金设置的查询和添加"""
     if request.method == "GET":
-        settings = fund_service.get_all_fund_settings()
-        return jsonify({"status": "success", "data": settings})
+        return cached_json(
+            lambda: jsonify(
+                {"status": "success", "data": fund_service.get_all_fund_settings()}
+            )
+        )
     else:  # POST
         fund_service.save_fund_settings(request.json)
         return jsonify({"status": "success", "message": "保存成功"})
@@ -139,10 +305,38 @@ def handle_fund_settings(fund_code):
 @fund_bp.route("/holdings", methods=["GET"])
 @handle_exceptions
 def get_holdings():
-    """获取基金持仓信息"""
+    """获取基金持仓信息
+
+    只读取数据库中保存的净值，不请求外部接口；每个持仓的 nav_stale 表示净值是否已过期
+    """
     cutoff_date = request.args.get("cutoff_date")  # 可选参数：截止日期
-    holdings = fund_service.get_holdings(cutoff_date)
-    return jsonify({"status": "success", "data": holdings})
+    return cached_json(
+        lambda: jsonify(
+            {"status": "success", "data": fund_service.get_holdings(cutoff_date)}
+        ),
+        vary=fund_service.holdings_time_key(),
+    )
+
+
+# 运行指标接口
+@fund_bp.route("/metrics", methods=["GET"])
+@handle_exceptions
+def get_metrics():
+    """获取缓存命中率、相同请求合并比例、数据库连接池、异步 HTTP 客户端、后台净值刷新等运行指标"""
+    return jsonify(
+        {
+            "status": "success",
+            "data": {
+                "estimate_cache": estimate_cache.stats(),
+                "response_cache": response_cache.stats(),
+                "data_version": fund_service.data_version,
+                "upstream_coalescing": upstream_flights.stats(),
+                "db_pool": get_pool(fund_service.db_name).stats(),
+                "async_http": async_http_client.stats(),
+                "nav_scheduler": nav_scheduler.stats(),
+            },
+        }
+    )
 
 
 # 测试路由
@@ -0,0 +1,48 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.fund_service import FundService  # noqa: E402
+
+
+def print_progress(detail):
+    """打印单个基金的回填结果"""
+    status = f"failed: {detail['error']}" if detail["error"] else "ok"
+    print(
+        f"{detail['fund_code']}: +{detail['saved_rows']} rows in {detail['pages']} pages, "
+        f"{detail['first_date']} ~ {detail['last_date']}, "
+        f"{detail['latency_ms']:.0f} ms ({status})"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="批量回填基金历史净值，已保存的净值会跳过（断点续传）"
+    )
+    parser.add_argument(
+        "fund_codes", nargs="*", help="要回填的基金代码，默认回填数据库中的所有基金"
+    )
+    parser.add_argument("--start-date", help="最早回填到的日期，格式为YYYY-MM-DD")
+    parser.add_argument("--page-size", type=int, help="每页条数")
+    parser.add_argument("--workers", type=int, help="并发请求数")
+    args = parser.parse_args()
+
+    try:
+        result = FundService().backfill_nav_history(
+            fund_codes=args.fund_codes or None,
+            start_date=args.start_date,
+            page_size=args.page_size,
+            max_workers=args.workers,
+            on_progress=print_progress,
+        )
+        print(
+            f"\nBackfill completed: {result['succeeded']}/{result['total']} funds, "
+            f"{result['saved_rows']} rows saved in {result['elapsed_ms'] / 1000:.1f}s"
+        )
+        if result["failed"]:
+            sys.exit(1)
+    except Exception as e:
+        print(f"Backfill failed: {str(e)}")
+        sys.exit(1)
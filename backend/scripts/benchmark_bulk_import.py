@@ -0,0 +1,97 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.connection import get_pool  # noqa: E402
+from database.migrations import migrate  # noqa: E402
+from services.fund_service import FundService  # noqa: E402
+
+
+def make_transactions(n_transactions, n_funds, seed=0):
+    """生成按日期顺序排列的随机交易记录（添加交易接口的请求格式）"""
+    rnd = random.Random(seed)
+    start = date.today() - timedelta(days=n_transactions)
+    transactions = []
+    for i in range(n_transactions):
+        fund_code = f"{rnd.randrange(n_funds):06d}"
+        nav = rnd.uniform(0.5, 3)
+        amount = rnd.uniform(100, 10000)
+        transactions.append(
+            {
+                "fund_code": fund_code,
+                "fund_name": f"测试成长混合{int(fund_code)}",
+                "transaction_type": "buy" if rnd.random() < 0.7 else "sell",
+                "amount": amount,
+                "nav": nav,
+                "fee": 0,
+                "shares": amount / nav * (1 if rnd.random() < 0.7 else 0.3),
+                "transaction_date": (start + timedelta(days=i)).isoformat(),
+            }
+        )
+    return transactions
+
+
+def run(name, transactions, load):
+    """在新的临时数据库上导入交易记录，返回 (耗时秒数, 持仓快照)"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_name = os.path.join(tmp_dir, "finance.db")
+        migrate(db_name)
+        service = FundService(db_name)
+
+        start_time = time.perf_counter()
+        load(service, transactions)
+        elapsed = time.perf_counter() - start_time
+
+        conn = service.get_db_connection()
+        positions = [
+            tuple(row)
+            for row in conn.execute(
+                "SELECT fund_code, total_shares, total_cost FROM positions"
+                " ORDER BY fund_code"
+            )
+        ]
+        conn.close()
+        get_pool(db_name).close_all()
+    print(
+        f"{name:<10} {elapsed:>8.2f} s {len(transactions) / elapsed:>12.0f} rows/s"
+    )
+    return elapsed, positions
+
+
+def load_per_row(service, transactions):
+    """原有方式：每条记录调用一次 add_transaction"""
+    for data in transactions:
+        service.add_transaction(data)
+
+
+def load_bulk(service, transactions):
+    result = service.add_transactions_bulk(transactions)
+    assert result["failed"] == 0, result["errors"][:5]
+
+
+def main(n_transactions, n_funds):
+    transactions = make_transactions(n_transactions, n_funds)
+    print(f"Importing {n_transactions} transactions across {n_funds} funds\n")
+    per_row_time, per_row_positions = run("per-row", transactions, load_per_row)
+    bulk_time, bulk_positions = run("bulk", transactions, load_bulk)
+
+    mismatches = sum(
+        a[0] != b[0] or abs(a[1] - b[1]) > 1e-6 or abs(a[2] - b[2]) > 1e-6
+        for a, b in zip(per_row_positions, bulk_positions)
+    ) + abs(len(per_row_positions) - len(bulk_positions))
+    print(f"\nSpeedup: {per_row_time / bulk_time:.1f}x")
+    print(f"Position mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量导入与逐条添加交易记录的性能对比")
+    parser.add_argument("--transactions", type=int, default=5000, help="交易记录条数")
+    parser.add_argument("--funds", type=int, default=20, help="基金数")
+    args = parser.parse_args()
+    main(args.transactions, args.funds)
@@ -0,0 +1,97 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.fund_page_parser import (  # noqa: E402
+    PARSER_BACKENDS,
+    lxml,
+    parse_fund_page,
+)
+
+DEFAULT_FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "fixtures", "fund_pages"
+)
+
+
+def fetch_fixtures(fund_codes, fixtures_dir):
+    """下载基金详情页保存为测试样本"""
+    from services.eastmoney_api import BASE_HEADERS, FUND_INFO_URL
+    from services.http_client import http_get
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    for fund_code in fund_codes:
+        response = http_get(FUND_INFO_URL.format(fund_code), headers=BASE_HEADERS)
+        response.raise_for_status()
+        response.encoding = "utf-8"
+        path = os.path.join(fixtures_dir, f"{fund_code}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(response.text)
+        print(f"Saved {path} ({len(response.text) / 1024:.1f} KB)")
+
+
+def benchmark_parsers(fixtures_dir, rounds):
+    """对每个解析后端统计 parse_fund_page 每秒可解析的页面数，并检查结果与 bs4 是否一致
+
+    计时的是应用实际调用的 parse_fund_page，包含其中回退到 bs4 的开销。
+    """
+    pages = []
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append((os.path.basename(path), f.read()))
+
+    if not pages:
+        print(f"No HTML fixtures found in {fixtures_dir}")
+        return {}
+
+    total_kb = sum(len(page) for _, page in pages) / 1024
+    print(f"Corpus: {len(pages)} pages, {total_kb:.1f} KB, {rounds} rounds\n")
+
+    reference = {name: PARSER_BACKENDS["bs4"](page) for name, page in pages}
+    results = {}
+
+    for backend in PARSER_BACKENDS:
+        if backend == "lxml" and lxml is None:
+            print(f"{backend:<10} skipped (lxml not installed)")
+            continue
+
+        mismatches = [
+            name
+            for name, page in pages
+            if parse_fund_page(page, backend) != reference[name]
+        ]
+
+        start_time = time.perf_counter()
+        for _ in range(rounds):
+            for _, page in pages:
+                parse_fund_page(page, backend)
+        elapsed = time.perf_counter() - start_time
+
+        pages_per_second = len(pages) * rounds / elapsed
+        results[backend] = pages_per_second
+        print(
+            f"{backend:<10} {pages_per_second:>10.1f} pages/s"
+            f"  ({elapsed * 1000 / (len(pages) * rounds):.3f} ms/page)"
+            + (f"  MISMATCH: {', '.join(mismatches)}" if mismatches else "")
+        )
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="基金详情页解析后端性能测试")
+    parser.add_argument(
+        "--fixtures", default=DEFAULT_FIXTURES_DIR, help="HTML 样本目录"
+    )
+    parser.add_argument("--rounds", type=int, default=50, help="每个样本的解析轮数")
+    parser.add_argument(
+        "--fetch", nargs="+", metavar="FUND_CODE", help="先下载这些基金的详情页作为样本"
+    )
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_fixtures(args.fetch, args.fixtures)
+    benchmark_parsers(args.fixtures, args.rounds)
@@ -0,0 +1,105 @@
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.eastmoney_api import select_netvalue  # noqa: E402
+
+
+def select_netvalue_pandas(history_list, target_date):
+    """原先基于 pandas 的实现，仅用于对比"""
+    import pandas as pd
+
+    df = pd.DataFrame(history_list)
+    if df.empty:
+        return None
+
+    df["date"] = pd.to_datetime(df["date"])
+    df = df.sort_values("date", ascending=False)
+
+    target_datetime = pd.to_datetime(target_date)
+    result_df = df[df["date"] <= target_datetime].head(1)
+
+    if result_df.empty:
+        return None
+
+    result_df["date"] = result_df["date"].dt.strftime("%Y-%m-%d")
+    return result_df[
+        ["date", "unit_value", "cumulative_value", "daily_growth"]
+    ].to_dict("records")[0]
+
+
+def make_history(end_date, rows=20):
+    """生成与接口返回格式相同的净值列表（按日期倒序，只包含工作日）"""
+    history = []
+    day = end_date
+    while len(history) < rows:
+        if day.weekday() < 5:
+            unit_value = random.uniform(0.8, 3.0)
+            history.append(
+                {
+                    "date": day.strftime("%Y-%m-%d"),
+                    "unit_value": f"{unit_value:.4f}",
+                    "cumulative_value": f"{unit_value + 0.5:.4f}",
+                    "daily_growth": f"{random.uniform(-3, 3):.2f}",
+                }
+            )
+        day -= timedelta(days=1)
+    return history
+
+
+def measure_import_time(module):
+    """在新进程中测量导入模块的耗时（秒）"""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return float(output.stdout.strip())
+
+
+def benchmark(iterations):
+    random.seed(0)
+    end_date = date(2024, 3, 8)
+    cases = []
+    for i in range(100):
+        history = make_history(end_date - timedelta(days=i))
+        target = (end_date - timedelta(days=i + random.randint(0, 10))).strftime(
+            "%Y-%m-%d"
+        )
+        cases.append((history, target))
+
+    mismatches = sum(
+        select_netvalue(history, target) != select_netvalue_pandas(history, target)
+        for history, target in cases
+    )
+
+    results = {}
+    for name, func in (
+        ("bisect", select_netvalue),
+        ("pandas", select_netvalue_pandas),
+    ):
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            for history, target in cases:
+                func(history, target)
+        elapsed = time.perf_counter() - start_time
+        results[name] = elapsed / (iterations * len(cases)) * 1e6
+
+    print(f"Lookups per implementation: {iterations * len(cases)}")
+    for name, micros in results.items():
+        print(f"{name:<8} {micros:>10.2f} us/lookup")
+    print(f"Speedup: {results['pandas'] / results['bisect']:.1f}x")
+    print(f"Result mismatches: {mismatches}")
+    print(f"\nCold import of pandas: {measure_import_time('pandas') * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="历史净值查找实现的性能对比")
+    parser.add_argument("--iterations", type=int, default=20, help="重复轮数")
+    args = parser.parse_args()
+    benchmark(args.iterations)
@@ -0,0 +1,100 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import portfolio_engine  # noqa: E402
+from services.fund_service import FundService  # noqa: E402
+
+
+def make_ledger(n_transactions, n_funds, seed=0):
+    """生成按 (基金代码, 交易日期) 排序的随机交易记录"""
+    rnd = random.Random(seed)
+    rows = []
+    for _ in range(n_transactions):
+        fund_code = f"{rnd.randrange(n_funds):06d}"
+        nav = rnd.uniform(0.5, 3.0)
+        amount = rnd.uniform(100, 10000)
+        rows.append(
+            (
+                fund_code,
+                rnd.choice(("buy", "buy", "sell")),
+                amount,
+                nav,
+                amount / nav * rnd.uniform(0.3, 1.0),
+                f"{rnd.randint(2015, 2024)}-{rnd.randint(1, 12):02d}-"
+                f"{rnd.randint(1, 28):02d}",
+            )
+        )
+    rows.sort(key=lambda row: (row[0], row[5]))
+    return rows
+
+
+def replay_python(rows, checkpoints):
+    """逐笔调用 FundService._apply_transaction 的原有实现，作为对照"""
+    positions = {}
+    for fund_code, tx_type, amount, nav, shares, tx_date in rows:
+        tx = {
+            "transaction_type": tx_type,
+            "amount": amount,
+            "nav": nav,
+            "shares": shares,
+            "transaction_date": tx_date,
+        }
+        if (position := positions.get(fund_code)) is None:
+            position = positions[fund_code] = FundService._new_position()
+        else:
+            month_end = FundService._month_end(position["last_transaction_date"])
+            if tx_date > month_end:
+                checkpoints.append((fund_code, month_end, dict(position)))
+        FundService._apply_transaction(position, tx)
+
+    for fund_code, position in positions.items():
+        month_end = FundService._month_end(position["last_transaction_date"])
+        checkpoints.append((fund_code, month_end, dict(position)))
+    return positions
+
+
+def replay_numpy(rows, checkpoints):
+    return portfolio_engine.replay_positions(portfolio_engine.Ledger(rows), checkpoints)
+
+
+def benchmark(sizes, n_funds):
+    print(
+        f"{'transactions':>12} {'python':>10} {'numpy':>10} {'speedup':>8}  identical"
+    )
+    for size in sizes:
+        rows = make_ledger(size, n_funds)
+        results = {}
+        timings = {}
+        for name, replay in (("python", replay_python), ("numpy", replay_numpy)):
+            checkpoints = []
+            start_time = time.perf_counter()
+            positions = replay(rows, checkpoints)
+            timings[name] = time.perf_counter() - start_time
+            results[name] = (positions, sorted(checkpoints, key=lambda c: c[:2]))
+
+        # 用 repr 比较，确保浮点数逐位一致
+        identical = repr(results["python"]) == repr(results["numpy"])
+        print(
+            f"{size:>12} {timings['python'] * 1000:>8.0f}ms "
+            f"{timings['numpy'] * 1000:>8.0f}ms "
+            f"{timings['python'] / timings['numpy']:>7.1f}x  {identical}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="持仓计算引擎性能测试")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+        help="交易记录条数",
+    )
+    parser.add_argument("--funds", type=int, default=200, help="基金数量")
+    args = parser.parse_args()
+    benchmark(args.sizes, args.funds)
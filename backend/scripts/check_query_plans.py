@@ -0,0 +1,46 @@
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.test_query_plans import (  # noqa: E402
+    TracingFundService,
+    find_full_scans,
+    run_hot_queries,
+    seed_database,
+)
+
+
+def main(verbose):
+    """打印热点查询的全表扫描（verbose 时打印全部执行计划），回归检查见 tests/test_query_plans.py"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_name = os.path.join(tmp_dir, "finance.db")
+        seed_database(db_name)
+        service = TracingFundService(db_name)
+        run_hot_queries(service)
+        checked, problems = find_full_scans(db_name, service.statements)
+
+        if verbose:
+            conn = sqlite3.connect(db_name)
+            for sql in dict.fromkeys(service.statements):
+                if re.match(r"\s*SELECT\b", sql, re.I):
+                    print(" ".join(sql.split()))
+                    for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+                        print(f"    {row[3]}")
+            conn.close()
+
+    print(f"Checked {checked} statements, full table scans: {len(problems)}")
+    for sql, detail in problems:
+        print(f"\n{detail}\n    {' '.join(sql.split())}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="检查热点查询的执行计划中没有全表扫描")
+    parser.add_argument("-v", "--verbose", action="store_true", help="打印所有查询计划")
+    args = parser.parse_args()
+    sys.exit(main(args.verbose))
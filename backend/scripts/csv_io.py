@@ -0,0 +1,52 @@
+"""CSV 导入导出脚本共用的文件打开和进度显示"""
+
+import gzip
+import sys
+import time
+
+
+def open_csv(path, mode="r"):
+    """以文本方式打开 CSV 文件，文件名以 .gz 结尾时按 gzip 压缩读写"""
+    if path.endswith(".gz"):
+        # compresslevel 6 的速度明显快于默认的 9，压缩率相差很小
+        return gzip.open(
+            path, mode + "t", newline="", encoding="utf-8", compresslevel=6
+        )
+    return open(path, mode, newline="", encoding="utf-8")
+
+
+class Progress:
+    """在同一行刷新已处理的行数和每秒行数"""
+
+    def __init__(self, label, interval=0.5):
+        self.label = label
+        self.interval = interval
+        self.rows = 0
+        self.start_time = time.perf_counter()
+        self._last_print = 0.0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def update(self, rows):
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self._last_print >= self.interval:
+            self._last_print = now
+            self._print("\r")
+
+    def done(self):
+        self._print("\r")
+        sys.stderr.write("\n")
+
+    def _print(self, prefix):
+        sys.stderr.write(
+            f"{prefix}{self.label}: {self.rows} rows, "
+            f"{self.elapsed:.1f}s, {self.rate:,.0f} rows/s"
+        )
+        sys.stderr.flush()
@@ -1,62 +1,88 @@
-import sqlite3
+import argparse
 import csv
 import os
+import sqlite3
+import sys
 from datetime import datetime
 
-def export_db_to_csv():
-    # 创建导出目录
-    export_dir = 'db_exports'
-    if not os.path.exists(export_dir):
-        os.makedirs(export_dir)
-    
-    # 生成时间戳
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    
-    # 连接数据库
-    conn = sqlite3.connect('finance.db')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from csv_io import Progress, open_csv  # noqa: E402
+
+# 导出的表，导出文件名为 <表名>_<时间戳>.csv[.gz]
+EXPORT_TABLES = ("funds", "fund_transactions")
+
+
+def export_table(conn, table, path, chunk_size=10000):
+    """将表按游标分批读取并写入 CSV 文件，不一次性加载整张表，返回导出行数"""
     cursor = conn.cursor()
-    
+    cursor.execute(f"SELECT * FROM {table}")
+    columns = [description[0] for description in cursor.description]
+
+    progress = Progress(f"Exporting {table}")
+    with open_csv(path, "w") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)  # 写入表头
+        while rows := cursor.fetchmany(chunk_size):
+            writer.writerows(rows)
+            progress.update(len(rows))
+    progress.done()
+    return progress.rows
+
+
+def export_db_to_csv(
+    db_name="finance.db", export_dir="db_exports", compress=False, chunk_size=10000
+):
+    """
+    导出数据库中的基金表和交易表到CSV文件
+    :param db_name: 数据库文件路径
+    :param export_dir: 导出目录
+    :param compress: 是否以 gzip 压缩（文件名以 .csv.gz 结尾）
+    :param chunk_size: 每次从游标读取的行数
+    :return: 各表导出文件路径
+    """
+    os.makedirs(export_dir, exist_ok=True)
+
+    # 生成时间戳
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    extension = ".csv.gz" if compress else ".csv"
+
+    conn = sqlite3.connect(db_name)
     try:
-        # 导出 funds 表
-        cursor.execute('SELECT * FROM funds')
-        columns = [description[0] for description in cursor.description]
-        rows = cursor.fetchall()
-        
-        funds_file = os.path.join(export_dir, f'funds_{timestamp}.csv')
-        with open(funds_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(columns)  # 写入表头
-            writer.writerows(rows)    # 写入数据
-        
-        print(f"Funds table exported to: {funds_file}")
-        
-        # 导出 fund_transactions 表
-        cursor.execute('SELECT * FROM fund_transactions')
-        columns = [description[0] for description in cursor.description]
-        rows = cursor.fetchall()
-        
-        transactions_file = os.path.join(export_dir, f'fund_transactions_{timestamp}.csv')
-        with open(transactions_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(columns)  # 写入表头
-            writer.writerows(rows)    # 写入数据
-            
-        print(f"Fund transactions table exported to: {transactions_file}")
-        
+        # 在同一个读事务中导出各表，导出期间的写入不会造成表之间不一致
+        conn.execute("BEGIN")
+        files = {}
+        for table in EXPORT_TABLES:
+            path = os.path.join(export_dir, f"{table}_{timestamp}{extension}")
+            rows = export_table(conn, table, path, chunk_size)
+            print(f"{table} table exported to: {path} ({rows} rows)")
+            files[table] = path
+
         return {
-            'funds_file': funds_file,
-            'transactions_file': transactions_file
+            "funds_file": files["funds"],
+            "transactions_file": files["fund_transactions"],
         }
-        
+
     except Exception as e:
         print(f"Error exporting database: {str(e)}")
         raise
     finally:
         conn.close()
 
-if __name__ == '__main__':
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="导出基金表和交易表到CSV文件")
+    parser.add_argument("--db", default="finance.db", help="数据库文件路径")
+    parser.add_argument("--output-dir", default="db_exports", help="导出目录")
+    parser.add_argument("--gzip", action="store_true", help="以 gzip 压缩导出文件")
+    parser.add_argument(
+        "--chunk-size", type=int, default=10000, help="每次从数据库读取的行数"
+    )
+    args = parser.parse_args()
+
     try:
-        export_db_to_csv()
+        export_db_to_csv(args.db, args.output_dir, args.gzip, args.chunk_size)
         print("Database export completed successfully!")
     except Exception as e:
         print(f"Export failed: {str(e)}")
+        sys.exit(1)
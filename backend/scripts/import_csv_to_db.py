@@ -1,18 +1,161 @@
+import argparse
 import sqlite3
 import csv
 import os
-from datetime import datetime
+import sys
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-def import_csv_to_db(funds_file=None, transactions_file=None):
+from csv_io import Progress, open_csv  # noqa: E402
+from database.migrations import migrate  # noqa: E402
+from services.fund_service import FundService  # noqa: E402
+
+# funds 表 CSV 中值为空时使用的默认值，其余字段为空时写入 NULL
+FUND_DEFAULTS = {"current_nav": 0, "buy_fee": 0, "fund_type": ""}
+
+TRANSACTIONS_INSERT = """
+    INSERT OR REPLACE INTO fund_transactions (
+        transaction_id, fund_code, transaction_type,
+        amount, nav, fee, transaction_date, shares
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# 批量导入期间的连接参数：关闭每次提交时的 fsync，加大页缓存，临时数据放在内存中。
+# 导入中途断电可能需要重新导入，但不会影响导入前已有的数据库文件结构
+FAST_LOAD_PRAGMAS = (
+    "PRAGMA synchronous = OFF",
+    "PRAGMA cache_size = -262144",  # 256 MB
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+def prepare_funds(conn, fieldnames):
+    """根据 CSV 表头生成 funds 表的插入语句和参数转换函数
+
+    只写入 CSV 与 funds 表都有的字段；已存在的基金只更新这些字段，
+    CSV 中没有的字段（如旧版本导出的文件）保留数据库中的值。
+    """
+    table_columns = {
+        row[1]: row[2].upper() for row in conn.execute("PRAGMA table_info(funds)")
+    }
+    columns = [column for column in fieldnames if column in table_columns]
+    for required in ("fund_code", "fund_name"):
+        if required not in columns:
+            raise ValueError(f"funds CSV 缺少字段: {required}")
+
+    updates = ", ".join(
+        f"{column} = excluded.{column}" for column in columns if column != "fund_code"
+    )
+    placeholders = ", ".join("?" * len(columns))
+    sql = f"""
+        INSERT INTO funds ({', '.join(columns)}) VALUES ({placeholders})
+        ON CONFLICT(fund_code) DO UPDATE SET {updates}
+    """
+    converters = [
+        float if table_columns[column] in ("REAL", "FLOAT", "DOUBLE") else str
+        for column in columns
+    ]
+
+    def fund_params(row):
+        """将 funds 表 CSV 的一行转换为插入参数"""
+        return tuple(
+            convert(row[column]) if row[column] else FUND_DEFAULTS.get(column)
+            for column, convert in zip(columns, converters)
+        )
+
+    return sql, fund_params
+
+
+def prepare_transactions(conn, fieldnames):
+    """fund_transactions 表的插入语句和参数转换函数"""
+    return TRANSACTIONS_INSERT, transaction_params
+
+
+def transaction_params(row):
+    """将 fund_transactions 表 CSV 的一行转换为插入参数"""
+    return (
+        int(row["transaction_id"]) if row.get("transaction_id") else None,
+        row["fund_code"],
+        row["transaction_type"],
+        float(row["amount"]),
+        float(row["nav"]),
+        float(row["fee"]),
+        row["transaction_date"],
+        float(row["shares"]),
+    )
+
+
+def import_rows(conn, path, label, prepare, stats, chunk_size):
+    """按块读取 CSV 文件，每块在一个事务中用 executemany 写入
+
+    prepare(conn, 表头字段列表) 返回插入语句和将一行转换为插入参数的函数。
+
+    无法转换的行直接计为错误；某一块写入失败时回滚该块并逐行重试，
+    只跳过出错的行。
+    """
+    cursor = conn.cursor()
+    progress = Progress(f"Importing {label}")
+
+    def flush(chunk):
+        try:
+            cursor.executemany(sql, chunk)
+            conn.commit()
+            stats["success"] += len(chunk)
+        except sqlite3.Error:
+            conn.rollback()
+            for params in chunk:
+                try:
+                    cursor.execute(sql, params)
+                    stats["success"] += 1
+                except sqlite3.Error as e:
+                    print(f"Error importing {label} row {params[:2]}: {str(e)}")
+                    stats["error"] += 1
+            conn.commit()
+        progress.update(len(chunk))
+
+    with open_csv(path) as f:
+        reader = csv.DictReader(f)
+        sql, to_params = prepare(conn, reader.fieldnames or [])
+        chunk = []
+        for row in reader:
+            stats["processed"] += 1
+            try:
+                chunk.append(to_params(row))
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Error importing {label} row {stats['processed']}: {str(e)}")
+                stats["error"] += 1
+                continue
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+    progress.done()
+
+
+def import_csv_to_db(
+    funds_file=None,
+    transactions_file=None,
+    db_name="finance.db",
+    chunk_size=10000,
+    fast=False,
+):
     """
     从CSV文件导入数据到数据库
-    :param funds_file: funds表的CSV文件路径
-    :param transactions_file: fund_transactions表的CSV文件路径
+    :param funds_file: funds表的CSV文件路径，以 .gz 结尾时按 gzip 读取
+    :param transactions_file: fund_transactions表的CSV文件路径，以 .gz 结尾时按 gzip 读取
+    :param db_name: 数据库文件路径
+    :param chunk_size: 每个事务写入的行数
+    :param fast: 是否在导入期间关闭同步写入并加大缓存（FAST_LOAD_PRAGMAS）
     :return: 导入结果统计
     """
-    conn = sqlite3.connect("finance.db")
-    cursor = conn.cursor()
+    # 导入前确保数据库结构为最新版本
+    migrate(db_name)
+    conn = sqlite3.connect(db_name)
+    if fast:
+        for pragma in FAST_LOAD_PRAGMAS:
+            conn.execute(pragma)
 
     stats = {
         "funds": {"processed": 0, "success": 0, "error": 0},
@@ -22,78 +165,30 @@ def import_csv_to_db(funds_file=None, transactions_file=None):
     try:
         # 导入funds表数据
         if funds_file and os.path.exists(funds_file):
-            with open(funds_file, "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    stats["funds"]["processed"] += 1
-                    try:
-                        cursor.execute(
-                            """
-                            INSERT OR REPLACE INTO funds (
-                                fund_code, fund_name, current_nav, last_update_time,
-                                buy_fee, fund_type,
-                                created_at, updated_at
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                        """,
-                            (
-                                row["fund_code"],
-                                row["fund_name"],
-                                float(row["current_nav"]) if row["current_nav"] else 0,
-                                row["last_update_time"],
-                                float(row["buy_fee"]) if row["buy_fee"] else 0,
-                                row.get("fund_type", ""),
-                                row.get(
-                                    "created_at",
-                                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                ),
-                                row.get(
-                                    "updated_at",
-                                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                ),
-                            ),
-                        )
-                        stats["funds"]["success"] += 1
-                    except Exception as e:
-                        print(f"Error importing fund {row.get('fund_code')}: {str(e)}")
-                        stats["funds"]["error"] += 1
+            import_rows(
+                conn,
+                funds_file,
+                "funds",
+                prepare_funds,
+                stats["funds"],
+                chunk_size,
+            )
 
         # 导入fund_transactions表数据
         if transactions_file and os.path.exists(transactions_file):
-            with open(transactions_file, "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    stats["transactions"]["processed"] += 1
-                    try:
-                        cursor.execute(
-                            """
-                            INSERT OR REPLACE INTO fund_transactions (
-                                transaction_id, fund_code, transaction_type,
-                                amount, nav, fee, transaction_date, shares
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                        """,
-                            (
-                                (
-                                    int(row["transaction_id"])
-                                    if row.get("transaction_id")
-                                    else None
-                                ),
-                                row["fund_code"],
-                                row["transaction_type"],
-                                float(row["amount"]),
-                                float(row["nav"]),
-                                float(row["fee"]),
-                                row["transaction_date"],
-                                float(row["shares"]),
-                            ),
-                        )
-                        stats["transactions"]["success"] += 1
-                    except Exception as e:
-                        print(
-                            f"Error importing transaction {row.get('transaction_id')}: {str(e)}"
-                        )
-                        stats["transactions"]["error"] += 1
-
-        conn.commit()
+            import_rows(
+                conn,
+                transactions_file,
+                "transactions",
+                prepare_transactions,
+                stats["transactions"],
+                chunk_size,
+            )
+
+            # 交易记录变化后重建持仓快照
+            FundService(db_name)._rebuild_positions(conn.cursor())
+            conn.commit()
+
         return stats
 
     except Exception as e:
@@ -104,44 +199,63 @@ def import_csv_to_db(funds_file=None, transactions_file=None):
         conn.close()
 
 
-def find_latest_exports():
+def find_latest_exports(export_dir="db_exports"):
     """
-    在db_exports目录中查找最新的导出文件
+    在db_exports目录中查找最新的导出文件（.csv 或 .csv.gz）
     :return: (funds_file, transactions_file) 元组
     """
-    export_dir = "db_exports"
     if not os.path.exists(export_dir):
         return None, None
 
-    funds_files = [f for f in os.listdir(export_dir) if f.startswith("funds_")]
-    trans_files = [
-        f for f in os.listdir(export_dir) if f.startswith("fund_transactions_")
-    ]
-
-    latest_funds = max(funds_files) if funds_files else None
-    latest_trans = max(trans_files) if trans_files else None
+    def latest(prefix):
+        files = [
+            f
+            for f in os.listdir(export_dir)
+            if f.startswith(prefix) and f.endswith((".csv", ".csv.gz"))
+        ]
+        # 文件名中的时间戳可以直接按字符串比较
+        return os.path.join(export_dir, max(files)) if files else None
 
-    return (
-        os.path.join(export_dir, latest_funds) if latest_funds else None,
-        os.path.join(export_dir, latest_trans) if latest_trans else None,
-    )
+    return latest("funds_"), latest("fund_transactions_")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="从CSV文件导入基金表和交易表，默认使用 db_exports 中最新的导出文件"
+    )
+    parser.add_argument("--db", default="finance.db", help="数据库文件路径")
+    parser.add_argument("--funds", help="funds表的CSV文件（.csv 或 .csv.gz）")
+    parser.add_argument(
+        "--transactions", help="fund_transactions表的CSV文件（.csv 或 .csv.gz）"
+    )
+    parser.add_argument("--export-dir", default="db_exports", help="导出文件目录")
+    parser.add_argument(
+        "--chunk-size", type=int, default=10000, help="每个事务写入的行数"
+    )
+    parser.add_argument(
+        "--fast", action="store_true", help="导入期间关闭同步写入并加大缓存"
+    )
+    args = parser.parse_args()
+
     try:
-        # 查找最新的导出文件
-        funds_file, transactions_file = find_latest_exports()
+        if args.funds or args.transactions:
+            funds_file, transactions_file = args.funds, args.transactions
+        else:
+            # 查找最新的导出文件
+            funds_file, transactions_file = find_latest_exports(args.export_dir)
 
         if not funds_file and not transactions_file:
-            print("No export files found in db_exports directory!")
-            exit(1)
+            print(f"No export files found in {args.export_dir} directory!")
+            sys.exit(1)
 
         print(
             f"Found export files:\nFunds: {funds_file}\nTransactions: {transactions_file}"
         )
 
         # 执行导入
-        stats = import_csv_to_db(funds_file, transactions_file)
+        stats = import_csv_to_db(
+            funds_file, transactions_file, args.db, args.chunk_size, args.fast
+        )
 
         # 打印导入结果
         print("\nImport completed!")
@@ -157,3 +271,4 @@ if __name__ == "__main__":
 
     except Exception as e:
         print(f"Import failed: {str(e)}")
+        sys.exit(1)
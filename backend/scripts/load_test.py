@@ -0,0 +1,127 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from check_query_plans import seed_database  # noqa: E402
+from config import Config  # noqa: E402
+
+MODES = {
+    "per-call": False,  # 每次调用新建连接（原有方式，rollback journal）
+    "pooled": True,  # 连接池 + WAL
+}
+
+
+def worker(app, deadline, write_ratio, seed, results):
+    """循环发送读写混合的请求，直到截止时间"""
+    rnd = random.Random(seed)
+    client = app.test_client()
+    counts = {"requests": 0, "errors": 0, "locked": 0}
+    today = date.today()
+
+    while time.perf_counter() < deadline:
+        fund_code = f"{rnd.randrange(20):06d}"
+        if rnd.random() < write_ratio:
+            nav = rnd.uniform(0.5, 3)
+            response = client.post(
+                "/api/fund/transactions",
+                json={
+                    "fund_code": fund_code,
+                    "fund_name": f"测试成长混合{int(fund_code)}",
+                    "transaction_type": "buy",
+                    "amount": 1000.0,
+                    "nav": nav,
+                    "fee": 0,
+                    "shares": 1000 / nav,
+                    "transaction_date": (
+                        today - timedelta(days=rnd.randrange(1, 1000))
+                    ).isoformat(),
+                },
+            )
+        elif rnd.random() < 0.5:
+            response = client.get("/api/fund/holdings")
+        else:
+            response = client.get(f"/api/fund/transactions?fund_code={fund_code}")
+
+        counts["requests"] += 1
+        if response.status_code != 200:
+            counts["errors"] += 1
+            if b"locked" in response.data:
+                counts["locked"] += 1
+
+    results.append(counts)
+
+
+def run_mode(mode, threads, duration, write_ratio):
+    """在新的临时数据库上以指定连接方式压测，返回 (请求数, 错误数, 锁冲突数, 指标)"""
+    Config.DB_CONNECTION_POOL = MODES[mode]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        seed_database(os.path.join(tmp_dir, "finance.db"))
+        os.chdir(tmp_dir)
+
+        from app import app
+        from routes.fund import fund_service
+        from database.connection import get_pool
+
+        results = []
+        deadline = time.perf_counter() + duration
+        workers = [
+            threading.Thread(
+                target=worker, args=(app, deadline, write_ratio, i, results)
+            )
+            for i in range(threads)
+        ]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        pool = get_pool(fund_service.db_name)
+        stats = pool.stats()
+        pool.close_all()
+        os.chdir(os.path.dirname(tmp_dir))
+
+    return (
+        sum(r["requests"] for r in results),
+        sum(r["errors"] for r in results),
+        sum(r["locked"] for r in results),
+        stats,
+    )
+
+
+def main(threads, duration, write_ratio):
+    print(
+        f"{threads} threads, {duration}s per mode, {write_ratio:.0%} writes "
+        f"(holdings / transactions / add transaction)\n"
+    )
+    print(f"{'mode':<10} {'requests':>9} {'req/s':>9} {'errors':>7} {'locked':>7}")
+    for mode in MODES:
+        requests_count, errors, locked, stats = run_mode(
+            mode, threads, duration, write_ratio
+        )
+        print(
+            f"{mode:<10} {requests_count:>9} {requests_count / duration:>9.1f} "
+            f"{errors:>7} {locked:>7}"
+        )
+        if MODES[mode]:
+            print(
+                f"{'':<10} pool: created={stats['created']} "
+                f"checkouts={stats['checkouts']} "
+                f"reuse_rate={stats['reuse_rate']:.1%} "
+                f"nested={stats['nested']} peak_in_use={stats['peak_in_use']}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="数据库连接方式的并发压测")
+    parser.add_argument("--threads", type=int, default=8, help="并发线程数")
+    parser.add_argument("--duration", type=float, default=10, help="每种方式的压测秒数")
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="写请求比例")
+    args = parser.parse_args()
+    main(args.threads, args.duration, args.write_ratio)
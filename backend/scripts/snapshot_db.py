@@ -0,0 +1,138 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import snapshot  # noqa: E402
+from database.migrations import get_version, migrate  # noqa: E402
+from services.fund_service import FundService  # noqa: E402
+
+
+def export_snapshot(
+    db_name="finance.db",
+    snapshot_root="db_snapshots",
+    fmt="arrow",
+    compression=None,
+    chunk_size=65536,
+):
+    """将基金表、交易表和净值历史表导出为列式快照，返回快照目录"""
+    snapshot_dir = os.path.join(snapshot_root, datetime.now().strftime("%Y%m%d_%H%M%S"))
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    conn = sqlite3.connect(db_name)
+    try:
+        version = get_version(conn)
+        # 在同一个读事务中导出各表，保证快照中的表之间一致
+        conn.execute("BEGIN")
+        for table in snapshot.SNAPSHOT_TABLES:
+            path = os.path.join(snapshot_dir, table + snapshot.FORMATS[fmt])
+            start_time = time.perf_counter()
+            rows = snapshot.export_table(
+                conn, table, path, fmt, chunk_size, compression, version
+            )
+            elapsed = time.perf_counter() - start_time
+            print(
+                f"{table}: {rows} rows -> {path} "
+                f"({os.path.getsize(path) / 1024:.0f} KB, {elapsed:.2f}s)"
+            )
+        return snapshot_dir
+    finally:
+        conn.close()
+
+
+def import_snapshot(snapshot_dir, db_name="finance.db", chunk_size=65536, verify=True):
+    """用列式快照替换数据库中的对应表，并重建持仓快照
+
+    全部表在一个事务中写入，任一步失败（包括校验不一致）时整体回滚。
+    """
+    files = snapshot.snapshot_files(snapshot_dir)
+    if not files:
+        raise ValueError(f"快照目录中没有快照文件: {snapshot_dir}")
+
+    migrate(db_name)
+    conn = sqlite3.connect(db_name)
+    try:
+        for table, path in files.items():
+            start_time = time.perf_counter()
+            rows = snapshot.restore_table(conn, table, path, chunk_size)
+            print(
+                f"{table}: {rows} rows <- {path} "
+                f"({time.perf_counter() - start_time:.2f}s)"
+            )
+            if verify and not snapshot.verify_table(conn, table, path, chunk_size):
+                raise ValueError(f"{table} 恢复后的内容与快照不一致")
+
+        # 交易记录变化后重建持仓快照
+        FundService(db_name)._rebuild_positions(conn.cursor())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def find_latest_snapshot(snapshot_root="db_snapshots"):
+    """查找最新的快照目录"""
+    if not os.path.isdir(snapshot_root):
+        return None
+    # 目录名是时间戳，可以直接按字符串比较
+    names = sorted(
+        name
+        for name in os.listdir(snapshot_root)
+        if snapshot.snapshot_files(os.path.join(snapshot_root, name))
+    )
+    return os.path.join(snapshot_root, names[-1]) if names else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="以 Arrow / Parquet 列式快照导出或恢复基金表、交易表和净值历史表"
+    )
+    parser.add_argument("--db", default="finance.db", help="数据库文件路径")
+    parser.add_argument("--snapshot-root", default="db_snapshots", help="快照根目录")
+    parser.add_argument("--chunk-size", type=int, default=65536, help="每批读写的行数")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="导出快照")
+    export_parser.add_argument(
+        "--format", choices=sorted(snapshot.FORMATS), default="arrow", help="快照格式"
+    )
+    export_parser.add_argument(
+        "--compression",
+        help="压缩算法，如 zstd、lz4；Arrow 快照压缩后读取时无法零拷贝",
+    )
+
+    import_parser = subparsers.add_parser("import", help="恢复快照，默认使用最新的快照")
+    import_parser.add_argument("snapshot_dir", nargs="?", help="快照目录")
+    import_parser.add_argument(
+        "--no-verify", action="store_true", help="跳过恢复后的逐行校验"
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.command == "export":
+            snapshot_dir = export_snapshot(
+                args.db,
+                args.snapshot_root,
+                args.format,
+                args.compression,
+                args.chunk_size,
+            )
+            print(f"Snapshot saved to: {snapshot_dir}")
+        else:
+            snapshot_dir = args.snapshot_dir or find_latest_snapshot(args.snapshot_root)
+            if not snapshot_dir:
+                print(f"No snapshot found in {args.snapshot_root} directory!")
+                sys.exit(1)
+            import_snapshot(
+                snapshot_dir, args.db, args.chunk_size, verify=not args.no_verify
+            )
+            print(f"Snapshot restored from: {snapshot_dir}")
+    except Exception as e:
+        print(f"Snapshot {args.command} failed: {str(e)}")
+        sys.exit(1)
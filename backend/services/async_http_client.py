@@ -0,0 +1,141 @@
+"""异步 HTTP 客户端模块
+
+供异步接口（eastmoney_api 中的 *_async 函数）访问外部行情接口。全部请求在一个
+进程内共享的后台事件循环中发出和等待，由同一个 httpx.AsyncClient 复用连接：不论
+调用方在哪个事件循环中（Flask 的异步视图每个请求一个事件循环），大量进行中的请求
+都共享这一个线程和连接池，数量受 Config.ASYNC_HTTP_MAX_CONNECTIONS 限制。
+超时和失败重试的配置与同步客户端（http_client）一致。
+
+httpx 在 requirements.txt 中；万一环境中没有安装，退回在线程池中调用同步的
+http_get，此时每个进行中的请求占用一个线程，stats() 的 backend 为 thread。
+"""
+
+import asyncio
+import threading
+from functools import partial
+from typing import Any, Dict, Optional
+
+import requests
+
+from config import Config
+from services.http_client import RETRY_STATUS_CODES, http_get
+
+try:
+    import httpx
+except ImportError:  # 未安装 httpx 时的兜底，见模块说明
+    httpx = None
+    print("未安装 httpx（见 requirements.txt），异步接口退回在线程池中发送请求")
+
+# 请求失败时可能抛出的异常
+HTTP_ERRORS = (requests.RequestException,) + ((httpx.HTTPError,) if httpx else ())
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_client: Optional["httpx.AsyncClient"] = None
+
+_stats = {"requests": 0, "retries": 0, "errors": 0, "in_flight": 0, "peak_in_flight": 0}
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """获取共享的后台事件循环，首次调用时在守护线程中启动"""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="async-http", daemon=True
+                ).start()
+                _loop = loop
+    return _loop
+
+
+def _get_client() -> "httpx.AsyncClient":
+    """获取共享的 AsyncClient，只在后台事件循环中调用"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=Config.ASYNC_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.ASYNC_HTTP_MAX_KEEPALIVE,
+            ),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def _send(
+    url: str,
+    params: Optional[Dict[str, Any]],
+    headers: Optional[Dict[str, str]],
+    timeout: float,
+) -> Any:
+    """在后台事件循环中发送请求，连接错误和 RETRY_STATUS_CODES 按退避时间重试"""
+    if httpx is None:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, partial(http_get, url, params, headers, timeout)
+        )
+
+    client = _get_client()
+    for attempt in range(Config.HTTP_MAX_RETRIES + 1):
+        if attempt:
+            _stats["retries"] += 1
+            await asyncio.sleep(Config.HTTP_BACKOFF_FACTOR * 2 ** (attempt - 1))
+        try:
+            response = await client.get(
+                url, params=params, headers=headers, timeout=timeout
+            )
+        except httpx.TransportError:
+            if attempt == Config.HTTP_MAX_RETRIES:
+                raise
+            continue
+        if (
+            response.status_code not in RETRY_STATUS_CODES
+            or attempt == Config.HTTP_MAX_RETRIES
+        ):
+            return response
+
+
+async def _tracked_send(*args) -> Any:
+    _stats["requests"] += 1
+    _stats["in_flight"] += 1
+    _stats["peak_in_flight"] = max(_stats["peak_in_flight"], _stats["in_flight"])
+    try:
+        return await _send(*args)
+    except Exception:
+        _stats["errors"] += 1
+        raise
+    finally:
+        _stats["in_flight"] -= 1
+
+
+async def async_http_get(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+) -> Any:
+    """异步发送 GET 请求，可在任意事件循环中 await
+
+    Args:
+        url: 请求地址
+        params: 查询参数
+        headers: 请求头
+        timeout: 超时时间（秒），默认使用 Config.HTTP_TIMEOUT
+
+    Returns:
+        响应对象（httpx.Response，未安装 httpx 时为 requests.Response），
+        两者都提供 status_code、text、encoding、json() 和 raise_for_status()
+    """
+    coro = _tracked_send(
+        url, params, headers, timeout if timeout is not None else Config.HTTP_TIMEOUT
+    )
+    loop = _get_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+def stats() -> Dict[str, Any]:
+    """返回请求数、重试数、失败数和进行中的请求数"""
+    return {"backend": "httpx" if httpx else "thread", **_stats}
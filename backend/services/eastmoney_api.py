@@ -6,14 +6,29 @@ Author: Your Name
 Date: 2024
 """
 
-from typing import Dict, Optional, Any
+import os
+import sys
+
+if __name__ == "__main__":
+    # 直接运行本文件（python services/eastmoney_api.py）时，将 backend 目录加入导入路径
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing import Dict, List, Optional, Tuple, Any
+from bisect import bisect_right
+import asyncio
 import requests
 import re
 import json
-import pandas as pd
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 from dataclasses import dataclass
+from config import Config
+from services.async_http_client import HTTP_ERRORS, async_http_get
+from services.fund_page_parser import parse_fund_page
+from services.http_client import http_get
+from services.market_hours import is_trading_time, latest_session_day, next_session_open
+from services.single_flight import SingleFlight
+from services.trading_calendar import NAV_PUBLISH_TIME, get_calendar
+from services.ttl_cache import TTLCache
 
 # 常量配置
 BASE_HEADERS = {
@@ -25,6 +40,16 @@ FUND_INFO_URL = "http://fund.eastmoney.com/{}.html"
 FUND_ESTIMATE_URL = "https://fundgz.1234567.com.cn/js/{}.js"
 FUND_HISTORY_URL = "http://api.fund.eastmoney.com/f10/lsjz"
 
+# 查找指定日期的净值时向前请求的交易日数，覆盖 QDII 等基金净值发布的延迟
+HISTORY_LOOKBACK_TRADING_DAYS = 10
+
+# 基金估值缓存：盘中短时间有效，收盘后估值不再变化，缓存到下一个交易时段开盘
+estimate_cache = TTLCache(maxsize=Config.ESTIMATE_CACHE_MAXSIZE)
+
+# 合并同时发起的相同请求：(接口, 基金代码, 日期...) 相同的调用只请求一次外部接口，
+# 同步和异步调用共享结果。返回给调用方的字典和列表均为副本
+upstream_flights = SingleFlight()
+
 
 @dataclass
 class FundInfo:
@@ -53,39 +78,28 @@ def get_fund_info(fund_code: str) -> Dict[str, str]:
     Raises:
         requests.RequestException: 请求失败时抛出
     """
+    return dict(
+        upstream_flights.do(("fund_info", fund_code), _fetch_fund_info, fund_code)
+    )
+
+
+async def get_fund_info_async(fund_code: str) -> Dict[str, str]:
+    """get_fund_info 的异步版本"""
+    return dict(
+        await upstream_flights.do_async(
+            ("fund_info", fund_code), _fetch_fund_info_async, fund_code
+        )
+    )
+
+
+def _fetch_fund_info(fund_code: str) -> Dict[str, str]:
     result = FundInfo(code=fund_code).__dict__
 
     try:
-        response = requests.get(
-            FUND_INFO_URL.format(fund_code), headers=BASE_HEADERS, timeout=10
-        )
+        response = http_get(FUND_INFO_URL.format(fund_code), headers=BASE_HEADERS)
         response.raise_for_status()
         response.encoding = "utf-8"
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # 解析基金名称
-        if name_element := soup.find("div", {"class": "fundDetail-tit"}):
-            name = name_element.text.strip()
-            name = re.sub(r"\([^)]*\)", "", name)
-            name = re.sub(r"\s*\d+\s*$", "", name)
-            result["name"] = name.strip()
-
-        # 解析基金详细信息
-        if info_div := soup.find("div", {"class": "infoOfFund"}):
-            _parse_fund_info_div(info_div, result)
-
-        # 解析申购费用
-        if fee_item := soup.find(
-            "span", {"class": "itemTit"}, string=lambda t: t and "购买手续费" in t
-        ):
-            if fee_value := fee_item.parent.find("span", {"class": "nowPrice"}):
-                fee_text = fee_value.text.strip()
-                # 移除百分号并转换为浮点数
-                try:
-                    fee = float(fee_text.replace("%", "")) / 100
-                    result["purchase_fee"] = fee
-                except (ValueError, TypeError):
-                    result["purchase_fee"] = 0
+        result.update(parse_fund_page(response.text))
 
         return _clean_fund_info(result)
 
@@ -94,46 +108,22 @@ def get_fund_info(fund_code: str) -> Dict[str, str]:
         return result
 
 
-def _parse_fund_info_div(info_div: BeautifulSoup, result: Dict[str, str]) -> None:
-    """解析基金信息div中的数据"""
-    if table := info_div.find("table"):
-        for row in table.find_all("tr"):
-            for cell in row.find_all("td"):
-                text = cell.text.strip()
-
-                if "类型：" in text:
-                    _parse_fund_type(text, result)
-                elif "规模" in text:
-                    _parse_fund_scale(text, result)
-                elif "基金经理：" in text:
-                    if manager_link := cell.find("a"):
-                        result["manager"] = manager_link.text.strip()
-                elif "管 理 人" in text:
-                    if company_link := cell.find("a"):
-                        result["company"] = company_link.text.strip()
-                elif "成 立 日" in text:
-                    result["establish_date"] = text.replace("成 立 日：", "").strip()
-
-
-def _parse_fund_type(text: str, result: Dict[str, str]) -> None:
-    """解析基金类型信息"""
-    type_text = text.replace("类型：", "").strip()
-    if "|" in type_text or "｜" in type_text:
-        type_text = type_text.replace("｜", "|")
-        type_parts = type_text.split("|")
-        result["type"] = type_parts[0].strip()
-        if len(type_parts) > 1:
-            result["risk_level"] = type_parts[1].strip()
-    else:
-        result["type"] = type_text
+async def _fetch_fund_info_async(fund_code: str) -> Dict[str, str]:
+    result = FundInfo(code=fund_code).__dict__
 
+    try:
+        response = await async_http_get(
+            FUND_INFO_URL.format(fund_code), headers=BASE_HEADERS
+        )
+        response.raise_for_status()
+        response.encoding = "utf-8"
+        result.update(parse_fund_page(response.text))
 
-def _parse_fund_scale(text: str, result: Dict[str, str]) -> None:
-    """解析基金规模信息"""
-    scale_text = text.replace("规模：", "").strip()
-    result["scale"] = (
-        scale_text.split("（")[0].strip() if "（" in scale_text else scale_text
-    )
+        return _clean_fund_info(result)
+
+    except HTTP_ERRORS as e:
+        print(f"获取基金信息失败: {e}")
+        return result
 
 
 def _clean_fund_info(data: Dict[str, str]) -> Dict[str, str]:
@@ -144,46 +134,120 @@ def _clean_fund_info(data: Dict[str, str]) -> Dict[str, str]:
     }
 
 
-def get_fund_estimate(fund_code: str) -> Optional[Dict[str, str]]:
+def _estimate_expires_at(now: datetime, estimate: Dict[str, str]) -> datetime:
+    """计算估值缓存的过期时间
+
+    盘中为 Config.ESTIMATE_CACHE_TTL_TRADING 秒。收盘后如果估值中已有最近一个交易时段的
+    官方净值，缓存到下一个交易时段开盘；否则缓存到该交易日净值的发布时间，
+    过了发布时间仍未公布（如 QDII 基金）时每 Config.ESTIMATE_CACHE_TTL_PENDING 秒重新获取。
+    """
+    if is_trading_time(now):
+        return now + timedelta(seconds=Config.ESTIMATE_CACHE_TTL_TRADING)
+
+    session_open = next_session_open(now)
+    session_day = latest_session_day(now)
+    if (estimate.get("last_netvalue_date") or "") >= session_day.isoformat():
+        return session_open
+
+    publish_at = datetime.combine(session_day, NAV_PUBLISH_TIME)
+    if now < publish_at:
+        return min(publish_at, session_open)
+    return min(now + timedelta(seconds=Config.ESTIMATE_CACHE_TTL_PENDING), session_open)
+
+
+def get_fund_estimate(
+    fund_code: str, fund_name: Optional[str] = None
+) -> Optional[Dict[str, str]]:
     """获取基金的实时估值信息
 
+    结果按基金代码缓存在 estimate_cache 中，过期时间见 _estimate_expires_at。
+
     Args:
         fund_code: 基金代码
+        fund_name: 可选，已知的基金名称。估值接口不可用时直接使用该名称，
+            不再下载基金详情页解析名称
 
     Returns:
         包含基金实时估值的字典，如果获取失败返回None
     """
-    try:
-        response = requests.get(
-            FUND_ESTIMATE_URL.format(fund_code), headers=BASE_HEADERS, timeout=10
+    if (cached := estimate_cache.get(fund_code)) is not None:
+        return dict(cached)
+
+    if estimate := upstream_flights.do(
+        ("estimate", fund_code), _fetch_fund_estimate, fund_code, fund_name
+    ):
+        estimate_cache.set(
+            fund_code, estimate, _estimate_expires_at(datetime.now(), estimate)
+        )
+        return dict(estimate)
+    return None
+
+
+async def get_fund_estimate_async(
+    fund_code: str, fund_name: Optional[str] = None
+) -> Optional[Dict[str, str]]:
+    """get_fund_estimate 的异步版本，与同步版本共用 estimate_cache"""
+    if (cached := estimate_cache.get(fund_code)) is not None:
+        return dict(cached)
+
+    if estimate := await upstream_flights.do_async(
+        ("estimate", fund_code), _fetch_fund_estimate_async, fund_code, fund_name
+    ):
+        estimate_cache.set(
+            fund_code, estimate, _estimate_expires_at(datetime.now(), estimate)
         )
+        return dict(estimate)
+    return None
+
+
+def _parse_estimate(response: Any) -> Optional[Dict[str, str]]:
+    """解析估值接口返回的 JSONP，接口不可用时返回None"""
+    if response.status_code != 200:
+        return None
+    if json_match := re.search(r"\((.+)\)", response.text):
+        estimate_data = json.loads(json_match.group(1))
+        return {
+            "code": estimate_data.get("fundcode", ""),
+            "name": estimate_data.get("name", ""),
+            "estimate_value": estimate_data.get("gsz", ""),
+            "estimate_change": f"{estimate_data.get('gszzl', '')}%",
+            "estimate_time": estimate_data.get("gztime", ""),
+            "last_netvalue": estimate_data.get("dwjz", ""),
+            "last_netvalue_date": estimate_data.get("jzrq", ""),
+        }
+    return None
+
+
+def _estimate_from_history(
+    fund_code: str, fund_name: str, history_data: Dict[str, str]
+) -> Dict[str, str]:
+    """估值接口不可用时，以最近的历史净值构造估值信息"""
+    return {
+        "code": fund_code,
+        "name": fund_name,
+        "estimate_value": "",
+        "estimate_change": "",
+        "estimate_time": "",
+        "last_netvalue": history_data["unit_value"],
+        "last_netvalue_date": history_data["date"],
+    }
+
 
-        if response.status_code == 200:
-            if json_match := re.search(r"\((.+)\)", response.text):
-                estimate_data = json.loads(json_match.group(1))
-                return {
-                    "code": estimate_data.get("fundcode", ""),
-                    "name": estimate_data.get("name", ""),
-                    "estimate_value": estimate_data.get("gsz", ""),
-                    "estimate_change": f"{estimate_data.get('gszzl', '')}%",
-                    "estimate_time": estimate_data.get("gztime", ""),
-                    "last_netvalue": estimate_data.get("dwjz", ""),
-                    "last_netvalue_date": estimate_data.get("jzrq", ""),
-                }
+def _fetch_fund_estimate(
+    fund_code: str, fund_name: Optional[str] = None
+) -> Optional[Dict[str, str]]:
+    """从接口获取基金的实时估值信息，获取失败返回None"""
+    try:
+        response = http_get(FUND_ESTIMATE_URL.format(fund_code), headers=BASE_HEADERS)
+        if estimate := _parse_estimate(response):
+            return estimate
 
         # 获取最近的历史净值
         today = datetime.now().strftime("%Y-%m-%d")
         if history_data := get_fund_history_netvalue(fund_code, today):
-            fund_info = get_fund_info(fund_code)
-            return {
-                "code": fund_code,
-                "name": fund_info.get("name", ""),
-                "estimate_value": "",
-                "estimate_change": "",
-                "estimate_time": "",
-                "last_netvalue": history_data["unit_value"],
-                "last_netvalue_date": history_data["date"],
-            }
+            if fund_name is None:
+                fund_name = get_fund_info(fund_code).get("name", "")
+            return _estimate_from_history(fund_code, fund_name, history_data)
 
         return None
 
@@ -192,6 +256,200 @@ def get_fund_estimate(fund_code: str) -> Optional[Dict[str, str]]:
         return None
 
 
+async def _fetch_fund_estimate_async(
+    fund_code: str, fund_name: Optional[str] = None
+) -> Optional[Dict[str, str]]:
+    """_fetch_fund_estimate 的异步版本"""
+    try:
+        response = await async_http_get(
+            FUND_ESTIMATE_URL.format(fund_code), headers=BASE_HEADERS
+        )
+        if estimate := _parse_estimate(response):
+            return estimate
+
+        # 获取最近的历史净值
+        today = datetime.now().strftime("%Y-%m-%d")
+        if history_data := await get_fund_history_netvalue_async(fund_code, today):
+            if fund_name is None:
+                fund_name = (await get_fund_info_async(fund_code)).get("name", "")
+            return _estimate_from_history(fund_code, fund_name, history_data)
+
+        return None
+
+    except Exception as e:
+        print(f"获取基金估值信息失败: {e}")
+        return None
+
+
+def get_fund_history_page(
+    fund_code: str,
+    page_index: int,
+    page_size: int,
+    start_date: str = "",
+    end_date: str = "",
+) -> Tuple[List[Dict[str, str]], int]:
+    """获取基金历史净值的一页数据
+
+    Args:
+        fund_code: 基金代码
+        page_index: 页码，从1开始
+        page_size: 每页条数
+        start_date: 开始日期，格式：YYYY-MM-DD，为空表示不限
+        end_date: 结束日期，格式：YYYY-MM-DD，为空表示不限
+
+    Returns:
+        (按日期倒序排列的净值数据列表, 区间内的总条数)
+
+    Raises:
+        requests.RequestException: 请求失败时抛出
+    """
+    params, headers = _history_page_request(
+        fund_code, page_index, page_size, start_date, end_date
+    )
+    response = http_get(FUND_HISTORY_URL, headers=headers, params=params)
+    response.raise_for_status()
+    return _parse_history_page(response.json())
+
+
+async def get_fund_history_page_async(
+    fund_code: str,
+    page_index: int,
+    page_size: int,
+    start_date: str = "",
+    end_date: str = "",
+) -> Tuple[List[Dict[str, str]], int]:
+    """get_fund_history_page 的异步版本，请求失败时抛出 HTTP_ERRORS 中的异常"""
+    params, headers = _history_page_request(
+        fund_code, page_index, page_size, start_date, end_date
+    )
+    response = await async_http_get(FUND_HISTORY_URL, headers=headers, params=params)
+    response.raise_for_status()
+    return _parse_history_page(response.json())
+
+
+def _history_page_request(
+    fund_code: str, page_index: int, page_size: int, start_date: str, end_date: str
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """历史净值接口的查询参数和请求头"""
+    params = {
+        "fundCode": fund_code,
+        "pageIndex": page_index,
+        "pageSize": page_size,
+        "startDate": start_date,
+        "endDate": end_date,
+    }
+    headers = {
+        **BASE_HEADERS,
+        "Referer": f"http://fund.eastmoney.com/f10/jjjz_{fund_code}.html",
+    }
+    return params, headers
+
+
+def _parse_history_page(
+    history_data: Dict[str, Any],
+) -> Tuple[List[Dict[str, str]], int]:
+    """解析历史净值接口返回的一页数据"""
+    history_list = (history_data.get("Data") or {}).get("LSJZList") or []
+    records = [
+        {
+            "date": item.get("FSRQ", ""),
+            "unit_value": item.get("DWJZ", ""),
+            "cumulative_value": item.get("LJJZ", ""),
+            "daily_growth": item.get("JZZZL", ""),
+        }
+        for item in history_list
+    ]
+    return records, history_data.get("TotalCount") or 0
+
+
+def get_fund_history_netvalues(
+    fund_code: str, start_date: str, end_date: str, page_size: int = 20
+) -> List[Dict[str, str]]:
+    """获取基金在指定日期区间内的全部净值数据（自动翻页）
+
+    Args:
+        fund_code: 基金代码
+        start_date: 开始日期，格式：YYYY-MM-DD
+        end_date: 结束日期，格式：YYYY-MM-DD
+        page_size: 每页条数
+
+    Returns:
+        净值数据列表，按日期倒序排列；请求失败时返回空列表，避免调用方拿到不完整的区间
+    """
+    key = ("history", fund_code, start_date, end_date, page_size)
+    return list(
+        upstream_flights.do(
+            key, _fetch_history_netvalues, fund_code, start_date, end_date, page_size
+        )
+    )
+
+
+async def get_fund_history_netvalues_async(
+    fund_code: str, start_date: str, end_date: str, page_size: int = 20
+) -> List[Dict[str, str]]:
+    """get_fund_history_netvalues 的异步版本，第一页确定总条数后其余分页并发请求"""
+    key = ("history", fund_code, start_date, end_date, page_size)
+    return list(
+        await upstream_flights.do_async(
+            key,
+            _fetch_history_netvalues_async,
+            fund_code,
+            start_date,
+            end_date,
+            page_size,
+        )
+    )
+
+
+def _fetch_history_netvalues(
+    fund_code: str, start_date: str, end_date: str, page_size: int
+) -> List[Dict[str, str]]:
+    records = []
+    page_index = 1
+
+    try:
+        while True:
+            page_records, total_count = get_fund_history_page(
+                fund_code, page_index, page_size, start_date, end_date
+            )
+            records.extend(page_records)
+            if not page_records or len(records) >= total_count:
+                return records
+            page_index += 1
+
+    except Exception as e:
+        print(f"获取基金历史净值失败: {e}")
+        return []
+
+
+async def _fetch_history_netvalues_async(
+    fund_code: str, start_date: str, end_date: str, page_size: int
+) -> List[Dict[str, str]]:
+    try:
+        records, total_count = await get_fund_history_page_async(
+            fund_code, 1, page_size, start_date, end_date
+        )
+        if records and len(records) < total_count:
+            # 接口可能限制每页条数，以第一页实际返回的条数作为后续分页的大小
+            page_size = len(records)
+            page_count = -(-total_count // page_size)
+            pages = await asyncio.gather(
+                *(
+                    get_fund_history_page_async(
+                        fund_code, page_index, page_size, start_date, end_date
+                    )
+                    for page_index in range(2, page_count + 1)
+                )
+            )
+            for page_records, _ in pages:
+                records.extend(page_records)
+        return records
+
+    except Exception as e:
+        print(f"获取基金历史净值失败: {e}")
+        return []
+
+
 def get_fund_history_netvalue(
     fund_code: str, target_date: str
 ) -> Optional[Dict[str, str]]:
@@ -205,63 +463,69 @@ def get_fund_history_netvalue(
         包含净值数据的字典，如果没有找到数据返回None
     """
     try:
-        start_date = (
-            datetime.strptime(target_date, "%Y-%m-%d") - timedelta(days=15)
-        ).strftime("%Y-%m-%d")
-
-        params = {
-            "fundCode": fund_code,
-            "pageIndex": 1,
-            "pageSize": 20,
-            "startDate": start_date,
-            "endDate": target_date,
-        }
+        # 按交易日回溯，长假前后也能覆盖到最近的净值
+        start_date = get_calendar().shift_trading_date(
+            target_date, -HISTORY_LOOKBACK_TRADING_DAYS
+        )
 
-        headers = {
-            **BASE_HEADERS,
-            "Referer": f"http://fund.eastmoney.com/f10/jjjz_{fund_code}.html",
-        }
+        history_list = get_fund_history_netvalues(fund_code, start_date, target_date)
+        return select_netvalue(history_list, target_date)
 
-        response = requests.get(
-            FUND_HISTORY_URL, headers=headers, params=params, timeout=10
+    except Exception as e:
+        print(f"获取基金历史净值失败: {e}")
+        return None
+
+
+async def get_fund_history_netvalue_async(
+    fund_code: str, target_date: str
+) -> Optional[Dict[str, str]]:
+    """get_fund_history_netvalue 的异步版本"""
+    try:
+        start_date = get_calendar().shift_trading_date(
+            target_date, -HISTORY_LOOKBACK_TRADING_DAYS
         )
-        response.raise_for_status()
 
-        history_data = response.json()
-        if not (history_list := history_data.get("Data", {}).get("LSJZList")):
-            return None
-
-        df = pd.DataFrame(history_list)
-        if df.empty:
-            return None
-
-        df = df.rename(
-            columns={
-                "FSRQ": "date",
-                "DWJZ": "unit_value",
-                "LJJZ": "cumulative_value",
-                "JZZZL": "daily_growth",
-            }
+        history_list = await get_fund_history_netvalues_async(
+            fund_code, start_date, target_date
         )
+        return select_netvalue(history_list, target_date)
+
+    except Exception as e:
+        print(f"获取基金历史净值失败: {e}")
+        return None
 
-        df["date"] = pd.to_datetime(df["date"])
-        df = df.sort_values("date", ascending=False)
 
-        target_datetime = pd.to_datetime(target_date)
-        result_df = df[df["date"] <= target_datetime].head(1)
+def select_netvalue(
+    history_list: List[Dict[str, str]], target_date: str
+) -> Optional[Dict[str, str]]:
+    """从净值列表中选出不晚于目标日期的最近一条记录
 
-        if result_df.empty:
-            return None
+    日期均为 YYYY-MM-DD 格式的字符串，按字符串排序即按日期排序，
+    排序后用二分查找定位目标日期。
 
-        result_df["date"] = result_df["date"].dt.strftime("%Y-%m-%d")
-        return result_df[
-            ["date", "unit_value", "cumulative_value", "daily_growth"]
-        ].to_dict("records")[0]
+    Args:
+        history_list: 净值数据列表
+        target_date: 目标日期，格式：YYYY-MM-DD
 
-    except Exception as e:
-        print(f"获取基金历史净值失败: {e}")
+    Returns:
+        净值数据字典，如果没有不晚于目标日期的记录返回None
+    """
+    records = sorted(
+        (item for item in history_list if item.get("date")),
+        key=lambda item: item["date"],
+    )
+    index = bisect_right([item["date"] for item in records], target_date)
+    if index == 0:
         return None
 
+    record = records[index - 1]
+    return {
+        "date": record["date"],
+        "unit_value": record["unit_value"],
+        "cumulative_value": record["cumulative_value"],
+        "daily_growth": record["daily_growth"],
+    }
+
 
 def main():
     """主函数，用于测试"""
@@ -287,16 +551,18 @@ def main():
     else:
         print("\n获取实时估值信息失败")
 
-    # 获取过去7天的净值数据
-    print("\n过去7天的净值数据:")
-    today = datetime.now()
-    for i in range(7):
-        target_date = (today - timedelta(days=i)).strftime("%Y-%m-%d")
-        if netvalue := get_fund_history_netvalue(fund_code, target_date):
-            print(
-                f"{netvalue['date']}: 单位净值 {netvalue['unit_value']}, "
-                f"日增长率 {netvalue['daily_growth']}%"
-            )
+    # 一次请求获取最近7个交易日的净值数据
+    print("\n最近7个交易日的净值数据:")
+    trading_calendar = get_calendar()
+    end_date = trading_calendar.latest_nav_date()
+    start_date = trading_calendar.shift_trading_days(end_date, -6)
+    for netvalue in get_fund_history_netvalues(
+        fund_code, start_date.isoformat(), end_date.isoformat()
+    ):
+        print(
+            f"{netvalue['date']}: 单位净值 {netvalue['unit_value']}, "
+            f"日增长率 {netvalue['daily_growth']}%"
+        )
 
 
 if __name__ == "__main__":
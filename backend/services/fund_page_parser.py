@@ -0,0 +1,321 @@
+"""基金详情页解析模块
+
+从 fund.eastmoney.com 的基金详情页中提取基金名称、类型、规模、基金经理等资料。
+详情页约 300 KB，但需要的只有 fundDetail-tit、infoOfFund 和购买手续费三处片段，
+因此提供多种解析后端：
+
+- fragment: 按 class 名截取所需片段，只对片段做正则提取（默认）
+- lxml: 使用 lxml（C 实现）解析整页，需安装 lxml
+- bs4: BeautifulSoup + html.parser 解析整页，作为兜底
+"""
+
+import html as html_lib
+import re
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from bs4 import BeautifulSoup
+
+from config import Config
+
+try:
+    import lxml.html
+except ImportError:  # lxml 为可选依赖
+    lxml = None
+
+FEE_LABEL = "购买手续费"
+
+# 基金信息表格（infoOfFund）中的字段
+INFO_FIELDS = ("type", "scale", "manager", "company", "establish_date")
+
+_DIV_TAG_PATTERN = re.compile(r"<(/?)div\b", re.IGNORECASE)
+_TABLE_PATTERN = re.compile(r"<table\b.*?</table>", re.IGNORECASE | re.DOTALL)
+_ROW_PATTERN = re.compile(r"<tr\b.*?</tr>", re.IGNORECASE | re.DOTALL)
+_CELL_PATTERN = re.compile(r"<td\b[^>]*>(.*?)</td>", re.IGNORECASE | re.DOTALL)
+_LINK_PATTERN = re.compile(r"<a\b[^>]*>(.*?)</a>", re.IGNORECASE | re.DOTALL)
+_NOW_PRICE_PATTERN = re.compile(
+    r"<span\b[^>]*class=\"[^\"]*\bnowPrice\b[^\"]*\"[^>]*>(.*?)</span>",
+    re.IGNORECASE | re.DOTALL,
+)
+_FEE_ITEM_PATTERN = re.compile(
+    r"<span\b[^>]*class=\"[^\"]*\bitemTit\b[^\"]*\"[^>]*>[^<]*"
+    + re.escape(FEE_LABEL),
+    re.IGNORECASE,
+)
+_COMMENT_PATTERN = re.compile(r"<!--.*?-->", re.DOTALL)
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+
+def parse_fund_page(page: str, backend: Optional[str] = None) -> Dict[str, Any]:
+    """解析基金详情页
+
+    Args:
+        page: 详情页 HTML
+        backend: 解析后端名称，默认使用 Config.FUND_PAGE_PARSER；
+            指定的后端不可用或失败时回退到 bs4。找到了字段所在的片段却没能解析出
+            字段时，用 bs4 的结果补齐；页面本来就没有的字段（如暂停申购的基金没有
+            购买手续费）不会触发 bs4 解析
+
+    Returns:
+        解析出的字段字典，可能包含 name、type、risk_level、scale、manager、
+        company、establish_date、purchase_fee
+    """
+    backend = backend or Config.FUND_PAGE_PARSER
+    if backend == "lxml" and lxml is None:
+        backend = "bs4"
+
+    unparsed: Set[str] = set()
+    try:
+        result = PARSER_BACKENDS[backend](page, unparsed)
+    except Exception as e:
+        print(f"使用 {backend} 解析基金详情页失败: {e}")
+        if backend == "bs4":
+            return {}
+        return PARSER_BACKENDS["bs4"](page)
+
+    if unparsed and backend != "bs4":
+        for field, value in PARSER_BACKENDS["bs4"](page).items():
+            result.setdefault(field, value)
+    return result
+
+
+def _clean_fund_name(text: str) -> str:
+    """去掉基金名称中的括号内容和末尾的基金代码"""
+    name = text.strip()
+    name = re.sub(r"\([^)]*\)", "", name)
+    name = re.sub(r"\s*\d+\s*$", "", name)
+    return name.strip()
+
+
+def _parse_purchase_fee(text: str) -> float:
+    """将 '0.15%' 形式的费率转换为小数"""
+    try:
+        return float(text.strip().replace("%", "")) / 100
+    except (ValueError, TypeError):
+        return 0
+
+
+def _parse_info_cells(
+    cells: List[Tuple[str, Optional[str]]], result: Dict[str, Any]
+) -> Set[str]:
+    """解析基金信息表格的单元格
+
+    Args:
+        cells: (单元格文本, 单元格内第一个链接的文本) 列表
+        result: 写入解析结果的字典
+
+    Returns:
+        有对应单元格但没有解析出来的字段
+    """
+    unparsed = set()
+    for text, link_text in cells:
+        text = text.strip()
+
+        if "类型：" in text:
+            _parse_fund_type(text, result)
+        elif "规模" in text:
+            _parse_fund_scale(text, result)
+        elif "基金经理：" in text:
+            if link_text is not None:
+                result["manager"] = link_text.strip()
+            else:
+                unparsed.add("manager")
+        elif "管 理 人" in text:
+            if link_text is not None:
+                result["company"] = link_text.strip()
+            else:
+                unparsed.add("company")
+        elif "成 立 日" in text:
+            result["establish_date"] = text.replace("成 立 日：", "").strip()
+    return unparsed
+
+
+def _parse_fund_type(text: str, result: Dict[str, Any]) -> None:
+    """解析基金类型信息"""
+    type_text = text.replace("类型：", "").strip()
+    if "|" in type_text or "｜" in type_text:
+        type_text = type_text.replace("｜", "|")
+        type_parts = type_text.split("|")
+        result["type"] = type_parts[0].strip()
+        if len(type_parts) > 1:
+            result["risk_level"] = type_parts[1].strip()
+    else:
+        result["type"] = type_text
+
+
+def _parse_fund_scale(text: str, result: Dict[str, Any]) -> None:
+    """解析基金规模信息"""
+    scale_text = text.replace("规模：", "").strip()
+    result["scale"] = (
+        scale_text.split("（")[0].strip() if "（" in scale_text else scale_text
+    )
+
+
+def _parse_with_bs4(page: str, unparsed: Optional[Set[str]] = None) -> Dict[str, Any]:
+    """使用 BeautifulSoup + html.parser 解析整页
+
+    找到了片段却没能解析出的字段会加入 unparsed。
+    """
+    result = {}
+    if unparsed is None:
+        unparsed = set()
+    soup = BeautifulSoup(page, "html.parser")
+
+    if name_element := soup.find("div", {"class": "fundDetail-tit"}):
+        if name := _clean_fund_name(name_element.text):
+            result["name"] = name
+        else:
+            unparsed.add("name")
+
+    if info_div := soup.find("div", {"class": "infoOfFund"}):
+        if table := info_div.find("table"):
+            cells = []
+            for row in table.find_all("tr"):
+                for cell in row.find_all("td"):
+                    link = cell.find("a")
+                    cells.append((cell.text, link.text if link else None))
+            unparsed |= _parse_info_cells(cells, result)
+        else:
+            unparsed.update(INFO_FIELDS)
+
+    if fee_item := soup.find(
+        "span", {"class": "itemTit"}, string=lambda t: t and FEE_LABEL in t
+    ):
+        if fee_value := fee_item.parent.find("span", {"class": "nowPrice"}):
+            result["purchase_fee"] = _parse_purchase_fee(fee_value.text)
+
+    return result
+
+
+def _parse_with_lxml(page: str, unparsed: Optional[Set[str]] = None) -> Dict[str, Any]:
+    """使用 lxml 解析整页
+
+    找到了片段却没能解析出的字段会加入 unparsed。
+    """
+    result = {}
+    if unparsed is None:
+        unparsed = set()
+    tree = lxml.html.fromstring(page)
+
+    if name_elements := tree.find_class("fundDetail-tit"):
+        if name := _clean_fund_name(name_elements[0].text_content()):
+            result["name"] = name
+        else:
+            unparsed.add("name")
+
+    if info_divs := tree.find_class("infoOfFund"):
+        if (table := info_divs[0].find(".//table")) is not None:
+            cells = []
+            for cell in table.iter("td"):
+                link = cell.find(".//a")
+                cells.append(
+                    (
+                        cell.text_content(),
+                        link.text_content() if link is not None else None,
+                    )
+                )
+            unparsed |= _parse_info_cells(cells, result)
+        else:
+            unparsed.update(INFO_FIELDS)
+
+    for fee_item in tree.find_class("itemTit"):
+        if fee_item.tag == "span" and FEE_LABEL in fee_item.text_content():
+            for fee_value in fee_item.getparent().find_class("nowPrice"):
+                if fee_value.tag == "span":
+                    result["purchase_fee"] = _parse_purchase_fee(
+                        fee_value.text_content()
+                    )
+                    break
+            break
+
+    return result
+
+
+def _html_text(fragment: str) -> str:
+    """去掉标签和注释并反转义，得到片段的文本内容"""
+    return html_lib.unescape(_TAG_PATTERN.sub("", _COMMENT_PATTERN.sub("", fragment)))
+
+
+def _extract_div(page: str, class_name: str) -> Optional[str]:
+    """截取第一个 class 中包含 class_name 的 div（含嵌套的子 div）"""
+    match = re.search(
+        r"<div\b[^>]*class=\"[^\"]*\b" + re.escape(class_name) + r"\b[^\"]*\"",
+        page,
+        re.IGNORECASE,
+    )
+    if not match:
+        return None
+    return _div_from(page, match.start())
+
+
+def _div_from(page: str, start: int) -> str:
+    """截取从 start 处开始的 div（含嵌套的子 div）"""
+    depth = 0
+    for tag in _DIV_TAG_PATTERN.finditer(page, start):
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            return page[start : page.find(">", tag.end()) + 1]
+    return page[start:]
+
+
+def _enclosing_div(page: str, pos: int) -> Optional[str]:
+    """截取包含 pos 处内容的最内层 div"""
+    depth = 0
+    for tag in reversed(list(_DIV_TAG_PATTERN.finditer(page, 0, pos))):
+        if tag.group(1):
+            depth += 1
+        elif depth:
+            depth -= 1
+        else:
+            return _div_from(page, tag.start())
+    return None
+
+
+def _parse_with_fragments(
+    page: str, unparsed: Optional[Set[str]] = None
+) -> Dict[str, Any]:
+    """只截取所需片段，用正则提取字段
+
+    找到了片段却没能解析出的字段会加入 unparsed。
+    """
+    result = {}
+    if unparsed is None:
+        unparsed = set()
+
+    if title_div := _extract_div(page, "fundDetail-tit"):
+        if name := _clean_fund_name(_html_text(title_div)):
+            result["name"] = name
+        else:
+            unparsed.add("name")
+
+    if info_div := _extract_div(page, "infoOfFund"):
+        if table := _TABLE_PATTERN.search(info_div):
+            cells = []
+            for row in _ROW_PATTERN.finditer(table.group(0)):
+                for cell in _CELL_PATTERN.findall(row.group(0)):
+                    link = _LINK_PATTERN.search(cell)
+                    cells.append(
+                        (_html_text(cell), _html_text(link.group(1)) if link else None)
+                    )
+            unparsed |= _parse_info_cells(cells, result)
+        else:
+            unparsed.update(INFO_FIELDS)
+
+    # 与 bs4 后端一致：在"购买手续费" itemTit 所在的 div 中查找 nowPrice；
+    # 该 div 中没有 nowPrice 说明页面本来就没有费率（如暂停申购）
+    if fee_item := _FEE_ITEM_PATTERN.search(page):
+        if fee_div := _enclosing_div(page, fee_item.start()):
+            if fee_value := _NOW_PRICE_PATTERN.search(fee_div):
+                result["purchase_fee"] = _parse_purchase_fee(
+                    _html_text(fee_value.group(1))
+                )
+        else:
+            unparsed.add("purchase_fee")
+
+    return result
+
+
+PARSER_BACKENDS: Dict[str, Callable[[str, Optional[Set[str]]], Dict[str, Any]]] = {
+    "fragment": _parse_with_fragments,
+    "lxml": _parse_with_lxml,
+    "bs4": _parse_with_bs4,
+}
@@ -1,13 +1,97 @@
+import asyncio
+import base64
+import calendar
+import json
+import math
 import sqlite3
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable, Iterator, Tuple
+from config import Config
+from database.connection import get_pool
 from services.eastmoney_api import get_fund_info as api_get_fund_info
-from services.eastmoney_api import get_fund_estimate, get_fund_history_netvalue
+from services.eastmoney_api import get_fund_estimate, get_fund_history_netvalues
+from services.eastmoney_api import get_fund_history_page
+from services.eastmoney_api import get_fund_info_async as api_get_fund_info_async
+from services.eastmoney_api import get_fund_estimate_async
+from services.eastmoney_api import get_fund_history_netvalues_async
+from services.eastmoney_api import HISTORY_LOOKBACK_TRADING_DAYS
+from services import portfolio_engine
+from services.market_hours import is_trading_time
+from services.trading_calendar import get_calendar
+
+
+# 持仓快照（positions 表）中保存的字段
+POSITION_FIELDS = (
+    "total_shares",
+    "total_cost",
+    "realized_profit",
+    "total_buy_amount",
+    "total_sell_amount",
+    "total_buy_shares",
+    "total_sell_shares",
+    "last_buy_nav",
+    "last_buy_date",
+    "last_sell_nav",
+    "last_sell_date",
+    "last_transaction_date",
+)
+
+# 批量导入的交易记录必须包含的字段
+BULK_TRANSACTION_FIELDS = (
+    "fund_code",
+    "fund_name",
+    "transaction_type",
+    "amount",
+    "nav",
+    "fee",
+    "shares",
+    "transaction_date",
+)
+
+
+def _parse_float(value: Any) -> Optional[float]:
+    """将接口返回的数值字符串转换为浮点数，空值或非法值返回None"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
 
 
 class FundService:
-    def __init__(self):
-        self.db_name = "finance.db"
+    def __init__(self, db_name: str = "finance.db"):
+        self.db_name = db_name
+        # 基金名称全文索引是否可用，首次按名称搜索时检查
+        self._fund_name_fts: Optional[bool] = None
+
+    @property
+    def data_version(self) -> str:
+        """数据版本，格式为 "数据库标识.版本号"，用于接口的 ETag 和响应缓存
+
+        交易记录、持仓快照，以及基金名称、类型、费率、净值等接口返回的字段变化时，
+        数据库中的触发器把版本号加一（见数据库迁移版本8），因此导入脚本、其他进程的
+        写入同样会改变版本。数据库标识在建表时随机生成，重建数据库后不会与旧版本混淆。
+        """
+        conn = self.get_db_connection()
+        try:
+            row = conn.execute("SELECT token, version FROM data_version").fetchone()
+        finally:
+            conn.close()
+        return f"{row[0]}.{row[1]}"
+
+    @staticmethod
+    def holdings_time_key(now: Optional[datetime] = None) -> Tuple[str, str, bool]:
+        """get_holdings 结果中随时间变化的部分（默认截止日期、净值是否过期）所依赖的值
+
+        数据版本号和这个值都不变时，get_holdings 的结果不变。
+        """
+        now = now or datetime.now()
+        return (
+            now.date().isoformat(),
+            get_calendar().latest_nav_date(now).isoformat(),
+            is_trading_time(now),
+        )
 
     def fetch_fund_info(self, fund_code: str) -> Optional[Dict[str, Any]]:
         """获取基金基本信息，包括名称、净值、类型等基础信息
@@ -25,51 +109,627 @@ class FundService:
             - buy_fee: 买入费率（如果能获取到）
         """
         # 获取基金估值信息
-        estimate_info = get_fund_estimate(fund_code)
+        estimate_info = self._get_fund_estimate(fund_code)
         if not estimate_info:
             return None
 
         # 获取基金详细信息（包括类型等）
-        fund_detail = api_get_fund_info(fund_code)
+        fund_detail = self.get_fund_detail(fund_code)
+
+        return self._build_fund_info(fund_code, estimate_info, fund_detail)
+
+    async def fetch_fund_info_async(self, fund_code: str) -> Optional[Dict[str, Any]]:
+        """fetch_fund_info 的异步版本，估值和基金详情同时请求"""
+        estimate_info, fund_detail = await asyncio.gather(
+            self._get_fund_estimate_async(fund_code),
+            self.get_fund_detail_async(fund_code),
+        )
+        if not estimate_info:
+            return None
+        return self._build_fund_info(fund_code, estimate_info, fund_detail)
 
-        result = {
+    @staticmethod
+    def _build_fund_info(
+        fund_code: str, estimate_info: Dict[str, str], fund_detail: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        return {
             "code": fund_code,
             "name": estimate_info.get("name", ""),
-            "fund_type": fund_detail.get("type", "未知") if fund_detail else "未知",
+            "fund_type": fund_detail.get("type") or "未知",
             "net_value_date": estimate_info.get("last_netvalue_date"),
             "unit_net_value": estimate_info.get("last_netvalue"),
-            "buy_fee": fund_detail.get("purchase_fee", 0) if fund_detail else 0,
+            "buy_fee": fund_detail.get("purchase_fee") or 0,
         }
 
-        return result
+    def get_fund_detail(
+        self, fund_code: str, force_refresh: bool = False
+    ) -> Dict[str, Any]:
+        """获取基金详情页中的资料（类型、基金经理、规模、成立日、风险等级、管理人、申购费率）
+
+        已在数据库中的基金优先使用数据库中保存的资料，超过 Config.FUND_INFO_REFRESH_DAYS
+        天或 force_refresh 为 True 时才重新抓取详情页，并将结果写回 funds 表。
+
+        Args:
+            fund_code: 基金代码
+            force_refresh: 是否忽略数据库中的资料强制重新抓取
+
+        Returns:
+            与 eastmoney_api.get_fund_info 字段一致的字典
+        """
+        row, fund_detail = self._load_fund_detail(fund_code, force_refresh)
+        if fund_detail:
+            return fund_detail
+        return self._save_fund_detail(fund_code, row, api_get_fund_info(fund_code))
+
+    async def get_fund_detail_async(
+        self, fund_code: str, force_refresh: bool = False
+    ) -> Dict[str, Any]:
+        """get_fund_detail 的异步版本"""
+        row, fund_detail = self._load_fund_detail(fund_code, force_refresh)
+        if fund_detail:
+            return fund_detail
+        return self._save_fund_detail(
+            fund_code, row, await api_get_fund_info_async(fund_code)
+        )
+
+    def _load_fund_detail(
+        self, fund_code: str, force_refresh: bool
+    ) -> Tuple[Optional[sqlite3.Row], Optional[Dict[str, Any]]]:
+        """读取数据库中的基金资料，返回 (funds 表中的基金记录, 仍在有效期内的资料或None)
+
+        不在 funds 表中的基金（如添加交易前先查询的基金）的资料保存在 fund_detail_cache 表中，
+        基金加入 funds 表后、重新抓取之前也继续使用其中的资料。
+        """
+        conn = self.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT 1 AS in_funds, fund_name, fund_type, manager, scale,
+                       establish_date, risk_level, company, purchase_fee, info_fetched_at
+                FROM funds
+                WHERE fund_code = ?
+                UNION ALL
+                SELECT 0, fund_name, fund_type, manager, scale,
+                       establish_date, risk_level, company, purchase_fee, info_fetched_at
+                FROM fund_detail_cache
+                WHERE fund_code = ?
+            """,
+                (fund_code, fund_code),
+            )
+            rows = sorted(cursor.fetchall(), key=lambda r: -r["in_funds"])
+        finally:
+            conn.close()
+
+        row = rows[0] if rows and rows[0]["in_funds"] else None
+        if force_refresh:
+            return row, None
+        for detail_row in rows:
+            if self._is_fund_detail_fresh(detail_row):
+                # 名称和类型以 funds 表中用户设置的为准
+                names = row if row and row["fund_name"] else detail_row
+                return row, {
+                    "code": fund_code,
+                    "name": names["fund_name"] or "",
+                    "type": names["fund_type"] or detail_row["fund_type"] or "",
+                    "purchase_fee": detail_row["purchase_fee"] or 0,
+                    "manager": detail_row["manager"] or "",
+                    "scale": detail_row["scale"] or "",
+                    "establish_date": detail_row["establish_date"] or "",
+                    "risk_level": detail_row["risk_level"] or "",
+                    "company": detail_row["company"] or "",
+                }
+        return row, None
+
+    def _save_fund_detail(
+        self,
+        fund_code: str,
+        row: Optional[sqlite3.Row],
+        fund_detail: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """保存抓取到的基金资料，返回资料
+
+        基金在 funds 表中时写回 funds 表，否则写入 fund_detail_cache 表。
+        """
+        fund_detail["purchase_fee"] = _parse_float(fund_detail.get("purchase_fee"))
+
+        # 只保存抓取成功的资料，不覆盖用户设置的名称和类型
+        if fund_detail.get("name") or fund_detail.get("type"):
+            params = (
+                fund_detail.get("name", ""),
+                fund_detail.get("type", ""),
+                fund_detail.get("manager", ""),
+                fund_detail.get("scale", ""),
+                fund_detail.get("establish_date", ""),
+                fund_detail.get("risk_level", ""),
+                fund_detail.get("company", ""),
+                fund_detail["purchase_fee"],
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                fund_code,
+            )
+            conn = self.get_db_connection()
+            try:
+                cursor = conn.cursor()
+                if row:
+                    cursor.execute(
+                        """
+                        UPDATE funds
+                        SET fund_name = CASE WHEN fund_name IS NULL OR fund_name = ''
+                                             THEN ? ELSE fund_name END,
+                            fund_type = CASE WHEN fund_type IS NULL OR fund_type IN ('', '未知')
+                                             THEN ? ELSE fund_type END,
+                            manager = ?, scale = ?, establish_date = ?, risk_level = ?,
+                            company = ?, purchase_fee = ?, info_fetched_at = ?
+                        WHERE fund_code = ?
+                    """,
+                        params,
+                    )
+                else:
+                    cursor.execute(
+                        """
+                        INSERT OR REPLACE INTO fund_detail_cache (
+                            fund_name, fund_type, manager, scale, establish_date,
+                            risk_level, company, purchase_fee, info_fetched_at,
+                            fund_code
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                        params,
+                    )
+
+                conn.commit()
+            finally:
+                conn.close()
+
+        fund_detail["purchase_fee"] = fund_detail["purchase_fee"] or 0
+        return fund_detail
+
+    @staticmethod
+    def _is_fund_detail_fresh(row: sqlite3.Row) -> bool:
+        """判断数据库中保存的基金资料是否仍在有效期内"""
+        if not row["info_fetched_at"]:
+            return False
+        fetched_at = datetime.strptime(row["info_fetched_at"], "%Y-%m-%d %H:%M:%S")
+        return datetime.now() - fetched_at < timedelta(
+            days=Config.FUND_INFO_REFRESH_DAYS
+        )
+
+    def _get_fund_estimate(self, fund_code: str) -> Optional[Dict[str, str]]:
+        """获取基金估值，估值接口不可用时使用数据库中的基金名称，避免抓取详情页"""
+        return get_fund_estimate(
+            fund_code, fund_name=self._get_stored_fund_name(fund_code)
+        )
+
+    async def _get_fund_estimate_async(
+        self, fund_code: str
+    ) -> Optional[Dict[str, str]]:
+        return await get_fund_estimate_async(
+            fund_code, fund_name=self._get_stored_fund_name(fund_code)
+        )
+
+    def _get_stored_fund_name(self, fund_code: str) -> Optional[str]:
+        conn = self.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT fund_name FROM funds WHERE fund_code = ?", (fund_code,)
+            )
+            row = cursor.fetchone()
+        finally:
+            conn.close()
+        return row["fund_name"] if row and row["fund_name"] else None
 
     def fetch_current_nav(self, fund_code: str) -> Optional[Dict[str, Any]]:
-        """获取基金当前净值"""
-        estimate_info = get_fund_estimate(fund_code)
+        """获取基金当前净值
+
+        返回的 nav_date 为净值对应的交易日，prev_nav / prev_nav_date 为估值接口给出的
+        上一个交易日净值（只有最新净值时为空，由 _resolve_prev_nav 从净值历史补齐）
+        """
+        return self._nav_from_estimate(self._get_fund_estimate(fund_code))
+
+    async def fetch_current_nav_async(self, fund_code: str) -> Optional[Dict[str, Any]]:
+        """fetch_current_nav 的异步版本"""
+        return self._nav_from_estimate(await self._get_fund_estimate_async(fund_code))
+
+    async def fetch_current_navs_async(
+        self, fund_codes: List[str]
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """批量获取基金当前净值
+
+        一次查询读取已保存基金的名称，然后同时请求各基金的估值（经过 estimate_cache
+        和相同请求合并），结果与 fetch_current_nav 一致。
+
+        Args:
+            fund_codes: 基金代码列表，重复的代码只请求一次
+
+        Returns:
+            {基金代码: 净值信息} 字典，获取失败的基金为None
+        """
+        fund_codes = list(dict.fromkeys(fund_codes))
+        if not fund_codes:
+            raise ValueError("fund_codes 不能为空")
+        if len(fund_codes) > Config.NAV_BATCH_MAX_CODES:
+            raise ValueError(f"单次最多获取 {Config.NAV_BATCH_MAX_CODES} 个基金的净值")
+
+        conn = self.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            placeholders = ",".join("?" * len(fund_codes))
+            cursor.execute(
+                "SELECT fund_code, fund_name FROM funds"
+                f" WHERE fund_code IN ({placeholders})",
+                fund_codes,
+            )
+            fund_names = {row["fund_code"]: row["fund_name"] or None for row in cursor}
+        finally:
+            conn.close()
+
+        estimates = await asyncio.gather(
+            *(
+                get_fund_estimate_async(code, fund_name=fund_names.get(code))
+                for code in fund_codes
+            )
+        )
+        return {
+            code: self._nav_from_estimate(estimate_info)
+            for code, estimate_info in zip(fund_codes, estimates)
+        }
+
+    @staticmethod
+    def _nav_from_estimate(
+        estimate_info: Optional[Dict[str, str]],
+    ) -> Optional[Dict[str, Any]]:
+        """从估值信息中选出当前净值，见 fetch_current_nav"""
         if not estimate_info:
             return None
 
-        # 如果有实时估值，使用估值
-        if estimate_info.get("estimate_value"):
+        # 如果有实时估值且估值当天的官方净值尚未公布，使用估值
+        estimate_date = estimate_info.get("estimate_time", "")[:10]
+        if estimate_info.get("estimate_value") and (
+            not estimate_info.get("last_netvalue")
+            or (estimate_info.get("last_netvalue_date") or "") < estimate_date
+        ):
             return {
                 "nav": estimate_info["estimate_value"],
                 "update_time": estimate_info["estimate_time"],
+                "nav_date": estimate_info["estimate_time"][:10] or None,
+                "prev_nav": _parse_float(estimate_info.get("last_netvalue")),
+                "prev_nav_date": estimate_info.get("last_netvalue_date") or None,
             }
         # 否则使用最新净值
         elif estimate_info.get("last_netvalue"):
             return {
                 "nav": estimate_info["last_netvalue"],
                 "update_time": estimate_info["last_netvalue_date"],
+                "nav_date": estimate_info["last_netvalue_date"] or None,
+                "prev_nav": None,
+                "prev_nav_date": None,
             }
 
         return None
 
+    def _resolve_prev_nav(
+        self, fund_code: str, nav_info: Dict[str, Any], stored: Optional[sqlite3.Row]
+    ) -> None:
+        """补全净值对应的上一个交易日净值，并计算日涨幅（daily_growth_rate）
+
+        上一个交易日净值按以下顺序获取，每个基金每次净值发布只需查找一次：
+        1. 估值接口随估值返回的上一个净值
+        2. 数据库中已为同一净值日期保存的上一个净值
+        3. 净值历史中净值日期之前最近的一条（本地没有时从接口补齐），
+           因此周一、节假日后取到的都是上一个交易日的净值
+        """
+        nav_date = nav_info.get("nav_date")
+        prev_date = nav_info.get("prev_nav_date")
+        if nav_date and not (
+            nav_info.get("prev_nav") and prev_date and prev_date < nav_date
+        ):
+            if stored and stored["nav_date"] == nav_date and stored["prev_nav"]:
+                nav_info["prev_nav"] = stored["prev_nav"]
+                nav_info["prev_nav_date"] = stored["prev_nav_date"]
+            else:
+                day_before = get_calendar().previous_trading_date(nav_date)
+                record = self._get_nav_record(fund_code, day_before) or (None, None)
+                nav_info["prev_nav"], nav_info["prev_nav_date"] = record
+
+        nav = _parse_float(nav_info.get("nav"))
+        prev_nav = nav_info.get("prev_nav")
+        nav_info["daily_growth_rate"] = (
+            (nav - prev_nav) / prev_nav if nav and prev_nav else None
+        )
+
     def get_historical_nav(self, fund_code: str, date: str) -> Optional[float]:
-        """获取历史净值"""
-        nav_data = get_fund_history_netvalue(fund_code, date)
-        if nav_data:
-            return float(nav_data["unit_value"])
-        return None
+        """获取历史净值
+
+        优先从本地净值历史表读取，只有目标日期不在本地已覆盖的区间内时才请求接口，
+        并将拉取到的净值写入本地，保证每个基金的本地净值是一段连续区间。
+        """
+        record = self._get_nav_record(fund_code, date)
+        return record[0] if record else None
+
+    async def get_historical_nav_async(
+        self, fund_code: str, date: str
+    ) -> Optional[float]:
+        """get_historical_nav 的异步版本"""
+        record = await self._get_nav_record_async(fund_code, date)
+        return record[0] if record else None
+
+    def _get_nav_record(self, fund_code: str, date: str) -> Optional[Tuple[float, str]]:
+        """获取不晚于指定日期的最近一条净值 (单位净值, 净值日期)，逻辑同 get_historical_nav"""
+        conn = self.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            start_date, end_date = self._get_nav_fetch_range(cursor, fund_code, date)
+            if start_date:
+                history = get_fund_history_netvalues(fund_code, start_date, end_date)
+                self._save_nav_history(cursor, fund_code, history)
+                conn.commit()
+            return self._query_nav_record(cursor, fund_code, date)
+        finally:
+            conn.close()
+
+    async def _get_nav_record_async(
+        self, fund_code: str, date: str
+    ) -> Optional[Tuple[float, str]]:
+        """_get_nav_record 的异步版本，请求接口期间不占用数据库连接"""
+        conn = self.get_db_connection()
+        try:
+            start_date, end_date = self._get_nav_fetch_range(
+                conn.cursor(), fund_code, date
+            )
+        finally:
+            conn.close()
+
+        history = (
+            await get_fund_history_netvalues_async(fund_code, start_date, end_date)
+            if start_date
+            else None
+        )
+
+        conn = self.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            if history:
+                self._save_nav_history(cursor, fund_code, history)
+                conn.commit()
+            return self._query_nav_record(cursor, fund_code, date)
+        finally:
+            conn.close()
+
+    def _get_nav_fetch_range(
+        self, cursor: sqlite3.Cursor, fund_code: str, date: str
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """确定查询指定日期的净值前需要从接口拉取的区间，本地已覆盖时返回 (None, None)"""
+        trading_calendar = get_calendar()
+        first_date, last_date = self._get_nav_coverage(cursor, fund_code)
+
+        # 按交易日历确定请求区间，区间内不可能有新净值（周末、节假日、
+        # 当天净值尚未发布）时不请求接口
+        lookback_date = trading_calendar.shift_trading_date(
+            date, -HISTORY_LOOKBACK_TRADING_DAYS
+        )
+        if not first_date:
+            return lookback_date, date
+        if date > last_date and trading_calendar.has_nav_between(last_date, date):
+            return self._shift_date(last_date, 1), date
+        if date < first_date:
+            return lookback_date, first_date
+        return None, None
+
+    @staticmethod
+    def _query_nav_record(
+        cursor: sqlite3.Cursor, fund_code: str, date: str
+    ) -> Optional[Tuple[float, str]]:
+        cursor.execute(
+            """
+            SELECT unit_value, nav_date
+            FROM nav_history
+            WHERE fund_code = ? AND nav_date <= ?
+            ORDER BY nav_date DESC
+            LIMIT 1
+        """,
+            (fund_code, date),
+        )
+        row = cursor.fetchone()
+        return (float(row["unit_value"]), row["nav_date"]) if row else None
+
+    def backfill_nav_history(
+        self,
+        fund_codes: Optional[List[str]] = None,
+        start_date: Optional[str] = None,
+        page_size: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """批量回填基金的历史净值到净值历史表
+
+        每个基金从本地已保存的净值区间两端继续拉取（断点续传）：向后补齐最后日期之后的净值，
+        向前补齐最早日期之前的历史；本地没有数据时拉取全部历史。第一页确定总条数后，
+        其余分页并发请求，并按照能与本地区间衔接的顺序逐页写入，中断后本地数据仍是连续的。
+
+        Args:
+            fund_codes: 可选，要回填的基金代码列表。如果为None，则回填所有基金
+            start_date: 可选，最早回填到的日期，格式为YYYY-MM-DD，默认不限
+            page_size: 每页条数，默认使用 Config.NAV_BACKFILL_PAGE_SIZE
+            max_workers: 并发请求数，默认使用 Config.NAV_BACKFILL_WORKERS
+            on_progress: 可选，每个基金回填完成后以该基金的结果调用
+
+        Returns:
+            包含回填结果的字典，包括总数、成功数、新增净值条数、总耗时以及每个基金的结果
+        """
+        start_time = time.perf_counter()
+        page_size = page_size or Config.NAV_BACKFILL_PAGE_SIZE
+
+        conn = self.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            if fund_codes:
+                codes = list(dict.fromkeys(fund_codes))
+            else:
+                cursor.execute("SELECT fund_code FROM funds ORDER BY fund_code")
+                codes = [row["fund_code"] for row in cursor.fetchall()]
+
+            details = []
+            with ThreadPoolExecutor(
+                max_workers=max_workers or Config.NAV_BACKFILL_WORKERS
+            ) as executor:
+                for fund_code in codes:
+                    detail = self._backfill_fund_nav_history(
+                        conn, executor, fund_code, start_date, page_size
+                    )
+                    details.append(detail)
+                    if on_progress:
+                        on_progress(detail)
+
+            return {
+                "total": len(codes),
+                "succeeded": sum(1 for item in details if not item["error"]),
+                "failed": sum(1 for item in details if item["error"]),
+                "saved_rows": sum(item["saved_rows"] for item in details),
+                "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 1),
+                "details": details,
+            }
+        finally:
+            conn.close()
+
+    def _backfill_fund_nav_history(
+        self,
+        conn: sqlite3.Connection,
+        executor: Executor,
+        fund_code: str,
+        start_date: Optional[str],
+        page_size: int,
+    ) -> Dict[str, Any]:
+        """回填单个基金的历史净值，返回该基金的回填结果"""
+        fund_start_time = time.perf_counter()
+        cursor = conn.cursor()
+        first_date, last_date = self._get_nav_coverage(cursor, fund_code)
+
+        # (开始日期, 结束日期, 是否从最新一页开始写入)
+        # 向前补历史时从最新一页写起，向后补新净值时从最旧一页写起，保证写入的数据与本地区间相连
+        segments = []
+        if last_date:
+            segments.append((self._shift_date(last_date, 1), "", False))
+        if not first_date or not start_date or start_date < first_date:
+            segments.append(
+                (
+                    start_date or "",
+                    self._shift_date(first_date, -1) if first_date else "",
+                    True,
+                )
+            )
+
+        saved_rows = 0
+        pages = 0
+        error = None
+        try:
+            for segment_start, segment_end, newest_first in segments:
+                rows, total_count = get_fund_history_page(
+                    fund_code, 1, page_size, segment_start, segment_end
+                )
+                if not rows:
+                    continue
+
+                # 接口可能限制每页条数，以第一页实际返回的条数为准；
+                # 后续分页固定结束日期，避免回填期间发布的新净值导致分页错位
+                effective_page_size = (
+                    len(rows) if len(rows) < total_count else page_size
+                )
+                page_count = math.ceil(total_count / effective_page_size)
+                segment_end = max(row["date"] for row in rows)
+                page_futures = [
+                    executor.submit(
+                        get_fund_history_page,
+                        fund_code,
+                        page_index,
+                        effective_page_size,
+                        segment_start,
+                        segment_end,
+                    )
+                    for page_index in range(2, page_count + 1)
+                ]
+
+                write_order = range(page_count)
+                if not newest_first:
+                    write_order = reversed(write_order)
+                try:
+                    for page_index in write_order:
+                        page_rows = (
+                            rows
+                            if page_index == 0
+                            else page_futures[page_index - 1].result()[0]
+                        )
+                        saved_rows += self._save_nav_history(
+                            cursor, fund_code, page_rows
+                        )
+                        conn.commit()
+                        pages += 1
+                finally:
+                    for future in page_futures:
+                        future.cancel()
+
+        except Exception as e:
+            print(f"回填基金 {fund_code} 历史净值失败: {str(e)}")
+            error = str(e)
+
+        first_date, last_date = self._get_nav_coverage(cursor, fund_code)
+        return {
+            "fund_code": fund_code,
+            "saved_rows": saved_rows,
+            "pages": pages,
+            "first_date": first_date,
+            "last_date": last_date,
+            "latency_ms": round((time.perf_counter() - fund_start_time) * 1000, 1),
+            "error": error,
+        }
+
+    @staticmethod
+    def _get_nav_coverage(
+        cursor: sqlite3.Cursor, fund_code: str
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """获取基金在本地净值历史表中的连续区间 (最早日期, 最晚日期)"""
+        cursor.execute(
+            """
+            SELECT MIN(nav_date) AS first_date, MAX(nav_date) AS last_date
+            FROM nav_history
+            WHERE fund_code = ?
+        """,
+            (fund_code,),
+        )
+        coverage = cursor.fetchone()
+        return coverage["first_date"], coverage["last_date"]
+
+    @staticmethod
+    def _shift_date(date: str, days: int) -> str:
+        """日期字符串偏移指定天数"""
+        return (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=days)).strftime(
+            "%Y-%m-%d"
+        )
+
+    def _save_nav_history(
+        self, cursor: sqlite3.Cursor, fund_code: str, history: List[Dict[str, str]]
+    ) -> int:
+        """将接口返回的历史净值写入净值历史表，返回写入条数"""
+        rows = [
+            (
+                fund_code,
+                item["date"],
+                unit_value,
+                _parse_float(item.get("cumulative_value")),
+                _parse_float(item.get("daily_growth")),
+            )
+            for item in history
+            if item.get("date")
+            and (unit_value := _parse_float(item.get("unit_value"))) is not None
+        ]
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO nav_history
+            (fund_code, nav_date, unit_value, cumulative_value, daily_growth)
+            VALUES (?, ?, ?, ?, ?)
+        """,
+            rows,
+        )
+        return len(rows)
 
     def _update_fund_nav(self, fund_code: str, nav: float, update_time: str) -> None:
         """更新基金净值到数据库"""
@@ -92,9 +752,8 @@ class FundService:
             conn.close()
 
     def get_db_connection(self):
-        conn = sqlite3.connect(self.db_name)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """从连接池获取连接，调用 close() 归还"""
+        return get_pool(self.db_name).connection()
 
     def add_transaction(self, data):
         """添加交易记录"""
@@ -144,6 +803,13 @@ class FundService:
                 ),
             )
 
+            # 以数据库中保存的值更新持仓快照
+            cursor.execute(
+                "SELECT * FROM fund_transactions WHERE transaction_id = ?",
+                (cursor.lastrowid,),
+            )
+            self._apply_transaction_to_position(cursor, cursor.fetchone())
+
             conn.commit()
             return True
 
@@ -154,9 +820,127 @@ class FundService:
         finally:
             conn.close()
 
+    def add_transactions_bulk(
+        self, transactions: List[Dict[str, Any]], atomic: bool = False
+    ) -> Dict[str, Any]:
+        """批量添加交易记录
+
+        先逐条校验全部记录，再在一个事务中用 executemany 写入基金和交易，
+        最后按基金重建一次持仓快照，而不是每条记录单独提交、单独更新快照。
+
+        Args:
+            transactions: 交易记录列表，字段同 add_transaction
+            atomic: 为True时只要有一条记录校验失败就全部不写入，
+                否则写入校验通过的记录
+
+        Returns:
+            包含总数、写入数、失败数、总耗时和每条失败记录的下标及原因的字典
+        """
+        start_time = time.perf_counter()
+        if not isinstance(transactions, list):
+            raise ValueError("transactions 必须是交易记录列表")
+        if len(transactions) > Config.TRANSACTIONS_BULK_MAX_ROWS:
+            raise ValueError(
+                f"单次最多导入 {Config.TRANSACTIONS_BULK_MAX_ROWS} 条交易记录"
+            )
+
+        rows = []
+        funds = {}
+        errors = []
+        for index, data in enumerate(transactions):
+            try:
+                row = self._validate_bulk_transaction(data)
+            except ValueError as e:
+                errors.append({"index": index, "error": str(e)})
+                continue
+            rows.append(row)
+            # 同一基金只需插入一次，使用第一条记录的名称和净值
+            funds.setdefault(row[0], (row[0], data["fund_name"], row[3]))
+
+        if errors and atomic:
+            rows = []
+
+        if rows:
+            conn = self.get_db_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    """
+                    INSERT OR IGNORE INTO funds (fund_code, fund_name, current_nav)
+                    VALUES (?, ?, ?)
+                """,
+                    list(funds.values()),
+                )
+                cursor.executemany(
+                    """
+                    INSERT INTO fund_transactions
+                    (fund_code, transaction_type, amount, nav, fee, transaction_date, shares)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                    rows,
+                )
+                self._rebuild_positions(cursor, sorted({row[0] for row in rows}))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"批量添加交易失败: {str(e)}")
+                raise
+            finally:
+                conn.close()
+
+        return {
+            "total": len(transactions),
+            "inserted": len(rows),
+            "failed": len(errors),
+            "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 1),
+            "errors": errors,
+        }
+
+    @staticmethod
+    def _validate_bulk_transaction(data: Any) -> Tuple[Any, ...]:
+        """校验一条批量导入的交易记录，返回 fund_transactions 的插入参数"""
+        if not isinstance(data, dict):
+            raise ValueError("交易记录必须是对象")
+        for field in BULK_TRANSACTION_FIELDS:
+            if data.get(field) in (None, ""):
+                raise ValueError(f"缺少必需字段: {field}")
+
+        if data["transaction_type"] not in ("buy", "sell"):
+            raise ValueError(f"无效的交易类型: {data['transaction_type']}")
+        try:
+            # 统一保存为补零的 YYYY-MM-DD，按字符串比较和截取年月才正确
+            transaction_date = datetime.strptime(
+                str(data["transaction_date"]), "%Y-%m-%d"
+            ).strftime("%Y-%m-%d")
+        except ValueError:
+            raise ValueError(f"无效的交易日期: {data['transaction_date']}")
+
+        values = {}
+        for field in ("amount", "nav", "fee", "shares"):
+            value = _parse_float(data[field])
+            if value is None or not math.isfinite(value) or value < 0:
+                raise ValueError(f"无效的{field}: {data[field]}")
+            values[field] = value
+        if values["nav"] == 0:
+            raise ValueError("净值必须大于0")
+
+        return (
+            str(data["fund_code"]),
+            data["transaction_type"],
+            values["amount"],
+            values["nav"],
+            values["fee"],
+            transaction_date,
+            values["shares"],
+        )
+
     def get_holdings(self, cutoff_date: Optional[str] = None) -> List[Dict[str, Any]]:
         """获取基金持仓信息
 
+        直接读取 positions 表中的持仓快照；在截止日期之后仍有交易的基金，
+        从截止日期前最近的月末检查点开始，只重放检查点之后到截止日期的交易记录。
+        净值只读取数据库中保存的值（由后台任务刷新），nav_stale 表示该净值是否已过期。
+
         Args:
             cutoff_date: 可选，截止日期，格式为YYYY-MM-DD，默认为None表示使用最新数据
         """
@@ -168,208 +952,62 @@ class FundService:
             if not cutoff_date:
                 cutoff_date = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
 
-            # 构建查询语句，添加截止日期条件
-            query = """
-                SELECT f.fund_code, f.fund_name, f.current_nav, f.fund_type, f.last_update_time,
-                       t.transaction_type, t.amount, t.nav, t.shares, t.transaction_date
-                FROM funds f
-                INNER JOIN fund_transactions t ON f.fund_code = t.fund_code
-                WHERE t.transaction_date <= ?
-                ORDER BY f.fund_code, t.transaction_date
+            cursor.execute(
+                """
+                SELECT f.fund_code, f.fund_name, f.current_nav, f.fund_type,
+                       f.last_update_time, f.nav_date, f.daily_growth_rate, p.*
+                FROM positions p
+                INNER JOIN funds f ON f.fund_code = p.fund_code
+                WHERE p.last_transaction_date IS NOT NULL
+                ORDER BY f.fund_code
             """
-
-            cursor.execute(query, [cutoff_date])
-            transactions = cursor.fetchall()
-
-            # 按基金代码分组
+            )
             funds_data = {}
-            for row in transactions:
+            replay_codes = []
+            for row in cursor.fetchall():
                 fund_code = row["fund_code"]
-                if fund_code not in funds_data:
-                    funds_data[fund_code] = {
-                        "fund_code": fund_code,
-                        "fund_name": row["fund_name"],
-                        "current_nav": row["current_nav"] or 0,
-                        "last_update_time": row["last_update_time"],
-                        "fund_type": row["fund_type"] or "未知",
-                        "transactions": [],
-                    }
-
-                funds_data[fund_code]["transactions"].append(
-                    {
-                        "transaction_type": row["transaction_type"],
-                        "amount": row["amount"],
-                        "nav": row["nav"],
-                        "shares": row["shares"],
-                        "transaction_date": row["transaction_date"],
-                    }
-                )
+                funds_data[fund_code] = {
+                    "fund_code": fund_code,
+                    "fund_name": row["fund_name"],
+                    "current_nav": row["current_nav"] or 0,
+                    "last_update_time": row["last_update_time"],
+                    "daily_growth_rate": row["daily_growth_rate"],
+                    "nav_date": row["nav_date"],
+                    "nav_stale": self.is_nav_stale(
+                        row["nav_date"], row["last_update_time"]
+                    ),
+                    "fund_type": row["fund_type"] or "未知",
+                    "position": (
+                        {field: row[field] for field in POSITION_FIELDS}
+                        if row["last_transaction_date"] <= cutoff_date
+                        else None
+                    ),
+                }
+                if funds_data[fund_code]["position"] is None:
+                    replay_codes.append(fund_code)
+
+            # 快照包含截止日期之后的交易，从检查点重放得到截止日期当时的持仓
+            if replay_codes:
+                replayed = self._positions_as_of(cursor, replay_codes, cutoff_date)
+                for fund_code in replay_codes:
+                    if fund_code in replayed:
+                        funds_data[fund_code]["position"] = replayed[fund_code]
+                    else:
+                        del funds_data[fund_code]
+
+            # 批量计算每个基金的市值、收益和仓位
+            fund_list = list(funds_data.values())
+            metrics = portfolio_engine.compute_holding_metrics(
+                [fund_data["position"] for fund_data in fund_list],
+                [fund_data["current_nav"] for fund_data in fund_list],
+                ["货币" in fund_data["fund_type"] for fund_data in fund_list],
+            )
 
-            # 计算每个基金的持仓信息
             holdings = []
-            try:
-                total_market_value = sum(
-                    fund_data["current_nav"]
-                    * sum(
-                        tx["shares"]
-                        for tx in fund_data["transactions"]
-                        if tx["transaction_type"] == "buy"
-                    )
-                    - sum(
-                        tx["shares"]
-                        for tx in fund_data["transactions"]
-                        if tx["transaction_type"] == "sell"
-                    )
-                    for fund_data in funds_data.values()
+            for i, fund_data in enumerate(fund_list):
+                holding = self._build_holding(
+                    fund_data, {name: values[i] for name, values in metrics.items()}
                 )
-            except Exception as e:
-                print(f"计算总市值失败: {str(e)}")
-                total_market_value = 0
-
-            for fund_code, fund_data in funds_data.items():
-                # 检查是否为货币型基金
-                is_money_fund = "货币" in (fund_data["fund_type"] or "")
-
-                total_buy_amount = 0
-                total_sell_amount = 0
-                total_shares = 0
-                total_cost = 0
-                total_profit = 0
-
-                # 用于计算最后一次买入和卖出的净值
-                last_buy_nav = None
-                last_buy_date = None
-                last_sell_nav = None
-                last_sell_date = None
-
-                # 按时间排序交易记录，确保最后一次交易是最新的
-                sorted_transactions = sorted(
-                    fund_data["transactions"], key=lambda x: x["transaction_date"]
-                )
-
-                for tx in sorted_transactions:
-                    if tx["transaction_type"] == "buy":
-                        total_buy_amount += tx["amount"]
-                        last_buy_nav = tx["nav"]
-                        last_buy_date = tx["transaction_date"]
-                        if not is_money_fund:
-                            total_shares += tx["shares"]
-                            total_cost += tx["amount"]
-                    elif tx["transaction_type"] == "sell":
-                        total_sell_amount += tx["amount"]
-                        last_sell_nav = tx["nav"]
-                        last_sell_date = tx["transaction_date"]
-                        if not is_money_fund:
-                            # 计算当前的平均持仓净值
-                            avg_cost = (
-                                total_cost / total_shares if total_shares > 0 else 0
-                            )
-                            total_shares -= tx["shares"]
-                            # 计算卖出收益
-                            sell_value = (
-                                tx["shares"] * tx["nav"]
-                            )  # 卖出收益 = 卖出份额 * 当前的平均持仓净值
-                            sell_cost = tx["shares"] * avg_cost  # 卖出金额
-                            total_profit += (
-                                sell_value - sell_cost
-                            )  # 累积到总收益中 （这里忽略掉卖出时的手续费）
-                            total_cost -= sell_cost
-
-                # 货币型基金特殊处理
-                if is_money_fund:
-                    # 持有市值等于总的买入-总的赎回
-                    market_value = total_buy_amount - total_sell_amount
-
-                    # 货币基金特殊处理
-                    holding = {
-                        "fund_code": fund_code,
-                        "fund_name": fund_data["fund_name"],
-                        "fund_type": fund_data["fund_type"],
-                        "current_nav": 1.0,  # 货币基金净值固定为1
-                        "total_shares": market_value,  # 持有份额等于当前持有的市值
-                        "avg_cost_nav": 1.0,  # 平均持仓净值=最新持仓净值
-                        "cost_amount": market_value,  # 持仓成本=持有市值
-                        "market_value": market_value,
-                        "holding_profit": 0,  # 持有收益为0
-                        "holding_profit_rate": 0,  # 持有收益率为0
-                        "total_profit": 0,  # 累计收益为0
-                        "last_update_time": fund_data["last_update_time"],
-                        "last_buy_nav": last_buy_nav,
-                        "last_buy_date": last_buy_date,
-                        "last_sell_nav": last_sell_nav,
-                        "last_sell_date": last_sell_date,
-                        "since_last_buy_rate": 0,  # 货币基金涨幅为0
-                        "since_last_sell_rate": 0,  # 货币基金涨幅为0
-                        "actual_position": (
-                            (market_value / total_market_value * 100)
-                            if total_market_value > 0
-                            else 0
-                        ),  # 实际仓位百分比
-                        "daily_growth_rate": 0,  # 货币基金日涨幅为0
-                    }
-                else:
-                    # 非货币型基金正常计算
-                    # 获取最新净值，优先使用前一天的净值
-                    current_nav = fund_data["current_nav"]
-
-                    # 获取昨天的历史净值用于计算日涨幅
-                    yesterday = (datetime.now() - timedelta(days=1)).strftime(
-                        "%Y-%m-%d"
-                    )
-                    yesterday_nav = self.get_historical_nav(fund_code, yesterday)
-                    daily_growth_rate = None
-                    if yesterday_nav and current_nav:
-                        daily_growth_rate = (
-                            current_nav - yesterday_nav
-                        ) / yesterday_nav
-
-                    market_value = total_shares * current_nav
-                    avg_cost_nav = total_cost / total_shares if total_shares > 0 else 0
-                    holding_profit = market_value - total_cost
-                    holding_profit_rate = (
-                        holding_profit / total_cost if total_cost > 0 else 0
-                    )
-
-                    # 计算距上次买入涨幅
-                    since_last_buy_rate = None
-                    if last_buy_nav and current_nav > 0:
-                        since_last_buy_rate = (
-                            current_nav - last_buy_nav
-                        ) / last_buy_nav
-
-                    # 计算距上次卖出涨幅
-                    since_last_sell_rate = None
-                    if last_sell_nav and current_nav > 0:
-                        since_last_sell_rate = (
-                            current_nav - last_sell_nav
-                        ) / last_sell_nav
-
-                    holding = {
-                        "fund_code": fund_code,
-                        "fund_name": fund_data["fund_name"],
-                        "fund_type": fund_data["fund_type"],
-                        "current_nav": current_nav,
-                        "total_shares": total_shares,
-                        "avg_cost_nav": avg_cost_nav,
-                        "cost_amount": total_cost,
-                        "market_value": market_value,
-                        "holding_profit": holding_profit,
-                        "holding_profit_rate": holding_profit_rate,
-                        "total_profit": total_profit + holding_profit,
-                        "last_update_time": fund_data["last_update_time"],
-                        "last_buy_nav": last_buy_nav,
-                        "last_buy_date": last_buy_date,
-                        "last_sell_nav": last_sell_nav,
-                        "last_sell_date": last_sell_date,
-                        "since_last_buy_rate": since_last_buy_rate,
-                        "since_last_sell_rate": since_last_sell_rate,
-                        "actual_position": (
-                            (market_value / total_market_value * 100)
-                            if total_market_value > 0
-                            else 0
-                        ),  # 实际仓位百分比
-                        "daily_growth_rate": daily_growth_rate,  # 添加日涨幅字段
-                    }
 
                 # 只添加有持仓的基金
                 if holding["market_value"] > 0:
@@ -382,8 +1020,321 @@ class FundService:
         finally:
             conn.close()
 
+    def _build_holding(
+        self, fund_data: Dict[str, Any], metrics: Dict[str, float]
+    ) -> Dict[str, Any]:
+        """根据基金的持仓快照和 portfolio_engine 算出的指标组装持仓信息"""
+        fund_code = fund_data["fund_code"]
+        position = fund_data["position"]
+        last_buy_nav = position["last_buy_nav"]
+        last_sell_nav = position["last_sell_nav"]
+        market_value = metrics["market_value"]
+
+        # 货币型基金特殊处理
+        if "货币" in (fund_data["fund_type"] or ""):
+            # 持有市值等于总的买入-总的赎回
+            return {
+                "fund_code": fund_code,
+                "fund_name": fund_data["fund_name"],
+                "fund_type": fund_data["fund_type"],
+                "current_nav": 1.0,  # 货币基金净值固定为1
+                "total_shares": market_value,  # 持有份额等于当前持有的市值
+                "avg_cost_nav": 1.0,  # 平均持仓净值=最新持仓净值
+                "cost_amount": market_value,  # 持仓成本=持有市值
+                "market_value": market_value,
+                "holding_profit": 0,  # 持有收益为0
+                "holding_profit_rate": 0,  # 持有收益率为0
+                "total_profit": 0,  # 累计收益为0
+                "last_update_time": fund_data["last_update_time"],
+                "nav_date": fund_data["nav_date"],
+                "nav_stale": fund_data["nav_stale"],
+                "last_buy_nav": last_buy_nav,
+                "last_buy_date": position["last_buy_date"],
+                "last_sell_nav": last_sell_nav,
+                "last_sell_date": position["last_sell_date"],
+                "since_last_buy_rate": 0,  # 货币基金涨幅为0
+                "since_last_sell_rate": 0,  # 货币基金涨幅为0
+                "actual_position": metrics["actual_position"],  # 实际仓位百分比
+                "daily_growth_rate": 0,  # 货币基金日涨幅为0
+            }
+
+        # 非货币型基金正常计算
+        current_nav = fund_data["current_nav"]
+
+        # 计算距上次买入涨幅
+        since_last_buy_rate = None
+        if last_buy_nav and current_nav > 0:
+            since_last_buy_rate = (current_nav - last_buy_nav) / last_buy_nav
+
+        # 计算距上次卖出涨幅
+        since_last_sell_rate = None
+        if last_sell_nav and current_nav > 0:
+            since_last_sell_rate = (current_nav - last_sell_nav) / last_sell_nav
+
+        return {
+            "fund_code": fund_code,
+            "fund_name": fund_data["fund_name"],
+            "fund_type": fund_data["fund_type"],
+            "current_nav": current_nav,
+            "total_shares": position["total_shares"],
+            "avg_cost_nav": metrics["avg_cost_nav"],
+            "cost_amount": position["total_cost"],
+            "market_value": market_value,
+            "holding_profit": metrics["holding_profit"],
+            "holding_profit_rate": metrics["holding_profit_rate"],
+            "total_profit": metrics["total_profit"],
+            "last_update_time": fund_data["last_update_time"],
+            "nav_date": fund_data["nav_date"],
+            "nav_stale": fund_data["nav_stale"],
+            "last_buy_nav": last_buy_nav,
+            "last_buy_date": position["last_buy_date"],
+            "last_sell_nav": last_sell_nav,
+            "last_sell_date": position["last_sell_date"],
+            "since_last_buy_rate": since_last_buy_rate,
+            "since_last_sell_rate": since_last_sell_rate,
+            "actual_position": metrics["actual_position"],  # 实际仓位百分比
+            # 日涨幅在刷新净值时相对上一个交易日净值计算并保存
+            "daily_growth_rate": fund_data["daily_growth_rate"],
+        }
+
+    @staticmethod
+    def _new_position() -> Dict[str, Any]:
+        """创建空的持仓快照"""
+        return {
+            "total_shares": 0.0,
+            "total_cost": 0.0,
+            "realized_profit": 0.0,
+            "total_buy_amount": 0.0,
+            "total_sell_amount": 0.0,
+            "total_buy_shares": 0.0,
+            "total_sell_shares": 0.0,
+            "last_buy_nav": None,
+            "last_buy_date": None,
+            "last_sell_nav": None,
+            "last_sell_date": None,
+            "last_transaction_date": None,
+        }
+
+    @staticmethod
+    def _apply_transaction(position: Dict[str, Any], tx: Dict[str, Any]) -> None:
+        """将一笔交易按移动加权平均成本法计入持仓快照（交易需按时间顺序应用）"""
+        if tx["transaction_type"] == "buy":
+            position["total_buy_amount"] += tx["amount"]
+            position["total_buy_shares"] += tx["shares"]
+            position["last_buy_nav"] = tx["nav"]
+            position["last_buy_date"] = tx["transaction_date"]
+            position["total_shares"] += tx["shares"]
+            position["total_cost"] += tx["amount"]
+        elif tx["transaction_type"] == "sell":
+            position["total_sell_amount"] += tx["amount"]
+            position["total_sell_shares"] += tx["shares"]
+            position["last_sell_nav"] = tx["nav"]
+            position["last_sell_date"] = tx["transaction_date"]
+            # 计算当前的平均持仓净值
+            avg_cost = (
+                position["total_cost"] / position["total_shares"]
+                if position["total_shares"] > 0
+                else 0
+            )
+            position["total_shares"] -= tx["shares"]
+            # 计算卖出收益 （这里忽略掉卖出时的手续费）
+            sell_value = tx["shares"] * tx["nav"]
+            sell_cost = tx["shares"] * avg_cost
+            position["realized_profit"] += sell_value - sell_cost
+            position["total_cost"] -= sell_cost
+        position["last_transaction_date"] = tx["transaction_date"]
+
+    def _replay_positions(
+        self,
+        cursor: sqlite3.Cursor,
+        fund_codes: Optional[List[str]] = None,
+        checkpoints: Optional[List[Tuple[str, str, Dict[str, Any]]]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """按时间顺序重放全部交易记录，计算基金的持仓快照
+
+        使用 portfolio_engine 的列式实现，结果与逐笔调用 _apply_transaction 一致。
+
+        Args:
+            cursor: 数据库游标
+            fund_codes: 可选，要计算的基金代码列表，默认所有基金
+            checkpoints: 可选，传入列表时会追加每个基金每个有交易的月份月末的
+                (基金代码, 月末日期, 持仓快照) 检查点
+
+        Returns:
+            基金代码到持仓快照的字典，没有交易的基金不包含在内
+        """
+        query = """
+            SELECT fund_code, transaction_type, amount, nav, shares, transaction_date
+            FROM fund_transactions
+        """
+        params = []
+        if fund_codes is not None:
+            query += " WHERE fund_code IN ({})".format(",".join("?" * len(fund_codes)))
+            params.extend(fund_codes)
+        query += " ORDER BY fund_code, transaction_date, transaction_id"
+
+        # 直接以元组读取，省去 sqlite3.Row 的转换
+        tuple_cursor = cursor.connection.cursor()
+        tuple_cursor.row_factory = None
+        tuple_cursor.execute(query, params)
+        ledger = portfolio_engine.Ledger(tuple_cursor.fetchall())
+        return portfolio_engine.replay_positions(ledger, checkpoints)
+
+    def _positions_as_of(
+        self, cursor: sqlite3.Cursor, fund_codes: List[str], cutoff_date: str
+    ) -> Dict[str, Dict[str, Any]]:
+        """计算基金在截止日期的持仓快照
+
+        从截止日期前最近的月末检查点开始，只重放检查点之后到截止日期的交易记录。
+
+        Args:
+            cursor: 数据库游标
+            fund_codes: 要计算的基金代码列表
+            cutoff_date: 截止日期，格式为YYYY-MM-DD
+
+        Returns:
+            基金代码到持仓快照的字典，截止日期前没有交易的基金不包含在内
+        """
+        placeholders = ",".join("?" * len(fund_codes))
+        latest_checkpoints = f"""
+            SELECT fund_code, MAX(checkpoint_date) AS checkpoint_date
+            FROM position_checkpoints
+            WHERE fund_code IN ({placeholders}) AND checkpoint_date <= ?
+            GROUP BY fund_code
+        """
+
+        cursor.execute(
+            f"""
+            SELECT c.*
+            FROM position_checkpoints c
+            INNER JOIN ({latest_checkpoints}) latest
+                ON latest.fund_code = c.fund_code
+                AND latest.checkpoint_date = c.checkpoint_date
+        """,
+            [*fund_codes, cutoff_date],
+        )
+        positions = {
+            row["fund_code"]: {field: row[field] for field in POSITION_FIELDS}
+            for row in cursor.fetchall()
+        }
+
+        cursor.execute(
+            f"""
+            SELECT t.fund_code, t.transaction_type, t.amount, t.nav, t.shares,
+                   t.transaction_date
+            FROM fund_transactions t
+            LEFT JOIN ({latest_checkpoints}) latest ON latest.fund_code = t.fund_code
+            WHERE t.fund_code IN ({placeholders})
+                AND t.transaction_date <= ?
+                AND (latest.checkpoint_date IS NULL
+                     OR t.transaction_date > latest.checkpoint_date)
+            ORDER BY t.fund_code, t.transaction_date, t.transaction_id
+        """,
+            [*fund_codes, cutoff_date, *fund_codes, cutoff_date],
+        )
+        for row in cursor:
+            if (position := positions.get(row["fund_code"])) is None:
+                position = positions[row["fund_code"]] = self._new_position()
+            self._apply_transaction(position, row)
+        return positions
+
+    @staticmethod
+    def _month_end(date: str) -> str:
+        """获取日期所在月份的最后一天"""
+        year, month = int(date[:4]), int(date[5:7])
+        return f"{year:04d}-{month:02d}-{calendar.monthrange(year, month)[1]:02d}"
+
+    def _save_positions(
+        self, cursor: sqlite3.Cursor, positions: Dict[str, Dict[str, Any]]
+    ) -> None:
+        """写入持仓快照"""
+        columns = ", ".join(POSITION_FIELDS)
+        placeholders = ", ".join("?" * len(POSITION_FIELDS))
+        cursor.executemany(
+            f"""
+            INSERT OR REPLACE INTO positions (fund_code, {columns}, updated_at)
+            VALUES (?, {placeholders}, CURRENT_TIMESTAMP)
+        """,
+            [
+                (fund_code, *(position[field] for field in POSITION_FIELDS))
+                for fund_code, position in positions.items()
+            ],
+        )
+
+    def _save_checkpoints(
+        self,
+        cursor: sqlite3.Cursor,
+        checkpoints: List[Tuple[str, str, Dict[str, Any]]],
+    ) -> None:
+        """写入月末持仓检查点"""
+        columns = ", ".join(POSITION_FIELDS)
+        placeholders = ", ".join("?" * len(POSITION_FIELDS))
+        cursor.executemany(
+            f"""
+            INSERT OR REPLACE INTO position_checkpoints
+            (fund_code, checkpoint_date, {columns})
+            VALUES (?, ?, {placeholders})
+        """,
+            [
+                (fund_code, checkpoint_date, *(position[f] for f in POSITION_FIELDS))
+                for fund_code, checkpoint_date, position in checkpoints
+            ],
+        )
+
+    def _rebuild_positions(
+        self, cursor: sqlite3.Cursor, fund_codes: Optional[List[str]] = None
+    ) -> None:
+        """根据交易记录重建持仓快照和月末检查点
+
+        Args:
+            cursor: 数据库游标
+            fund_codes: 可选，要重建的基金代码列表，默认重建所有基金
+        """
+        checkpoints = []
+        positions = self._replay_positions(cursor, fund_codes, checkpoints)
+        for table in ("positions", "position_checkpoints"):
+            if fund_codes is None:
+                cursor.execute(f"DELETE FROM {table}")
+            else:
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE fund_code IN ({{}})".format(
+                        ",".join("?" * len(fund_codes))
+                    ),
+                    fund_codes,
+                )
+        self._save_positions(cursor, positions)
+        self._save_checkpoints(cursor, checkpoints)
+
+    def _apply_transaction_to_position(
+        self, cursor: sqlite3.Cursor, tx: Dict[str, Any]
+    ) -> None:
+        """新增交易后更新持仓快照和月末检查点
+
+        交易日期不早于快照中最后一笔交易时直接增量计入；
+        补录更早日期的交易会改变加权平均成本的计算顺序，需要重建该基金的快照。
+        """
+        cursor.execute(
+            "SELECT * FROM positions WHERE fund_code = ?", (tx["fund_code"],)
+        )
+        row = cursor.fetchone()
+        if row and row["last_transaction_date"] is not None:
+            if tx["transaction_date"] < row["last_transaction_date"]:
+                self._rebuild_positions(cursor, [tx["fund_code"]])
+                return
+            position = {field: row[field] for field in POSITION_FIELDS}
+        else:
+            position = self._new_position()
+
+        self._apply_transaction(position, tx)
+        self._save_positions(cursor, {tx["fund_code"]: position})
+        # 新交易之后的持仓就是该交易所在月份月末的检查点
+        self._save_checkpoints(
+            cursor,
+            [(tx["fund_code"], self._month_end(tx["transaction_date"]), position)],
+        )
+
     def update_nav(self, data):
-        """更新基金净值"""
+        """更新基金净值，日涨幅按已保存的上一个交易日净值重新计算"""
         conn = self.get_db_connection()
         cursor = conn.cursor()
 
@@ -391,11 +1342,17 @@ class FundService:
             cursor.execute(
                 """
                 UPDATE funds 
-                SET current_nav = ?,
-                    last_update_time = ?
-                WHERE fund_code = ?
+                SET current_nav = :nav,
+                    last_update_time = :update_time,
+                    daily_growth_rate = CASE WHEN prev_nav > 0
+                                             THEN (:nav - prev_nav) / prev_nav END
+                WHERE fund_code = :fund_code
             """,
-                (data["current_nav"], datetime.now(), data["fund_code"]),
+                {
+                    "nav": float(data["current_nav"]),
+                    "update_time": datetime.now(),
+                    "fund_code": data["fund_code"],
+                },
             )
 
             conn.commit()
@@ -492,54 +1449,148 @@ class FundService:
         finally:
             conn.close()
 
+    @staticmethod
+    def is_nav_stale(
+        nav_date: Optional[str],
+        last_update_time: Optional[str],
+        now: Optional[datetime] = None,
+    ) -> bool:
+        """判断基金保存的当前净值是否过期
+
+        保存的是官方净值时 last_update_time 等于 nav_date。已是最近一个应已发布的
+        官方净值时不过期；否则盘中应为当天的估值，收盘后在当天净值发布前可以是当天的估值，
+        发布后应为当天的官方净值。
+        """
+        now = now or datetime.now()
+        expected = get_calendar().latest_nav_date(now).isoformat()
+        if nav_date and last_update_time == nav_date and nav_date >= expected:
+            return False
+        if is_trading_time(now):
+            return nav_date != now.date().isoformat()
+        return not nav_date or nav_date <= expected
+
+    def get_stale_nav_codes(self, now: Optional[datetime] = None) -> List[str]:
+        """获取当前净值已过期（见 is_nav_stale）的基金代码"""
+        conn = self.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT fund_code, nav_date, last_update_time FROM funds"
+                " ORDER BY fund_code"
+            )
+            return [
+                row["fund_code"]
+                for row in cursor.fetchall()
+                if self.is_nav_stale(row["nav_date"], row["last_update_time"], now)
+            ]
+        finally:
+            conn.close()
+
+    def _fetch_nav_with_stats(
+        self, fund_code: str, stored: Optional[sqlite3.Row] = None
+    ) -> Dict[str, Any]:
+        """获取单个基金的当前净值和日涨幅，并记录耗时和失败原因
+
+        Args:
+            fund_code: 基金代码
+            stored: 可选，数据库中该基金当前保存的净值日期和上一个交易日净值
+        """
+        start_time = time.perf_counter()
+        error = None
+        try:
+            nav_info = self.fetch_current_nav(fund_code)
+            if not nav_info:
+                error = "未获取到净值数据"
+            else:
+                self._resolve_prev_nav(fund_code, nav_info, stored)
+        except Exception as e:
+            nav_info = None
+            error = str(e)
+
+        return {
+            "fund_code": fund_code,
+            "status": "failed" if error else "updated",
+            "nav": nav_info["nav"] if nav_info else None,
+            "update_time": nav_info["update_time"] if nav_info else None,
+            "nav_date": nav_info["nav_date"] if nav_info else None,
+            "prev_nav": nav_info["prev_nav"] if nav_info else None,
+            "prev_nav_date": nav_info["prev_nav_date"] if nav_info else None,
+            "daily_growth_rate": nav_info["daily_growth_rate"] if nav_info else None,
+            "latency_ms": round((time.perf_counter() - start_time) * 1000, 1),
+            "error": error,
+        }
+
     def update_all_navs(self, fund_codes: Optional[List[str]] = None) -> Dict[str, Any]:
         """更新基金的最新净值
 
+        估值接口的请求通过线程池并发执行（并发数见 Config.NAV_REFRESH_WORKERS），
+        全部完成后在一个事务中批量写入数据库。同时保存净值日期、上一个交易日净值和日涨幅，
+        持仓接口直接读取，不再逐个基金查询历史净值。
+
         Args:
             fund_codes: 可选，要更新的基金代码列表。如果为None，则更新所有基金
 
         Returns:
-            包含更新结果的字典
+            包含更新结果的字典，包括总数、成功数、失败数、总耗时以及每个基金的耗时和失败原因
         """
+        start_time = time.perf_counter()
         try:
             conn = self.get_db_connection()
             cursor = conn.cursor()
 
             # 获取需要更新的基金列表
+            query = "SELECT fund_code, nav_date, prev_nav, prev_nav_date FROM funds"
             if fund_codes:
-                cursor.execute(
-                    "SELECT fund_code FROM funds WHERE fund_code IN ({})".format(
-                        ",".join("?" * len(fund_codes))
-                    ),
-                    fund_codes,
-                )
+                placeholders = ",".join("?" * len(fund_codes))
+                cursor.execute(f"{query} WHERE fund_code IN ({placeholders})", fund_codes)
             else:
-                cursor.execute("SELECT fund_code FROM funds")
-
-            funds = cursor.fetchall()
-            updated_count = 0
+                cursor.execute(query)
 
-            for fund in funds:
-                fund_code = fund["fund_code"]
-                result = self.fetch_current_nav(fund_code)
+            stored = cursor.fetchall()
+            codes = [row["fund_code"] for row in stored]
 
-                if result:
-                    cursor.execute(
-                        """
-                        UPDATE funds 
-                        SET current_nav = ?,
-                            last_update_time = ?
-                        WHERE fund_code = ?
-                    """,
-                        (result["nav"], result["update_time"], fund_code),
+            details = []
+            if codes:
+                max_workers = min(Config.NAV_REFRESH_WORKERS, len(codes))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    details = list(
+                        executor.map(self._fetch_nav_with_stats, codes, stored)
                     )
-                    conn.commit()
-                    updated_count += 1
+
+            updates = [
+                (
+                    item["nav"],
+                    item["update_time"],
+                    item["nav_date"],
+                    item["prev_nav"],
+                    item["prev_nav_date"],
+                    item["daily_growth_rate"],
+                    item["fund_code"],
+                )
+                for item in details
+                if item["status"] == "updated"
+            ]
+            cursor.executemany(
+                """
+                UPDATE funds 
+                SET current_nav = ?,
+                    last_update_time = ?,
+                    nav_date = ?,
+                    prev_nav = ?,
+                    prev_nav_date = ?,
+                    daily_growth_rate = ?
+                WHERE fund_code = ?
+            """,
+                updates,
+            )
+            conn.commit()
 
             return {
-                "total": len(funds),
-                "updated": updated_count,
-                "failed": len(funds) - updated_count,
+                "total": len(codes),
+                "updated": len(updates),
+                "failed": len(codes) - len(updates),
+                "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 1),
+                "details": details,
             }
 
         except Exception as e:
@@ -550,81 +1601,195 @@ class FundService:
                 conn.close()
 
     def get_transactions(self, filters=None):
+        """获取符合条件的全部交易记录，按交易日期、交易ID倒序"""
         conn = self.get_db_connection()
         cursor = conn.cursor()
 
         try:
-            query = """
-                SELECT 
-                    t.transaction_id,
-                    t.fund_code,
-                    f.fund_name,
-                    t.transaction_type,
-                    t.amount,
-                    t.nav,
-                    t.fee,
-                    t.shares,
-                    t.transaction_date
-                FROM fund_transactions t
-                JOIN funds f ON t.fund_code = f.fund_code
-                WHERE 1=1
-            """
-            params = []
+            query, params = self._build_transactions_query(cursor, filters)
+            cursor.execute(query, params)
+            return [self._transaction_to_dict(row) for row in cursor.fetchall()]
 
-            if filters:
-                if filters.get("fund_code"):
-                    query += " AND f.fund_code LIKE ?"
-                    params.append(f"%{filters['fund_code']}%")
-                if filters.get("fund_name"):
-                    query += " AND f.fund_name LIKE ?"
-                    params.append(f"%{filters['fund_name']}%")
-                if filters.get("start_date"):
-                    query += " AND t.transaction_date >= ?"
-                    params.append(filters["start_date"])
-                if filters.get("end_date"):
-                    query += " AND t.transaction_date <= ?"
-                    params.append(filters["end_date"])
-                # 只在交易类型不为 'all' 时添加条件
-                if (
-                    filters.get("transaction_type")
-                    and filters["transaction_type"] != "all"
-                ):
-                    query += " AND t.transaction_type = ?"
-                    params.append(filters["transaction_type"])
-
-            query += " ORDER BY t.transaction_date DESC"
+        finally:
+            conn.close()
 
-            cursor.execute(query, params)
-            transactions = cursor.fetchall()
+    def get_transactions_page(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        page_cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """按游标分页获取交易记录（keyset 分页）
 
-            return [
-                {
-                    "transaction_id": row["transaction_id"],
-                    "fund_code": row["fund_code"],
-                    "fund_name": row["fund_name"],
-                    "transaction_type": row["transaction_type"],
-                    "amount": float(row["amount"]),
-                    "nav": float(row["nav"]),
-                    "fee": float(row["fee"]),
-                    "shares": float(row["shares"]),
-                    "transaction_date": row["transaction_date"],
-                }
-                for row in transactions
-            ]
+        Args:
+            filters: 筛选条件，同 get_transactions
+            limit: 每页条数，默认 Config.TRANSACTIONS_PAGE_SIZE，
+                不超过 Config.TRANSACTIONS_MAX_PAGE_SIZE
+            page_cursor: 上一页返回的 next_cursor，为空时从第一页开始
+
+        Returns:
+            (本页交易记录, 下一页的游标)，没有下一页时游标为None
+        """
+        limit = min(
+            max(int(limit or Config.TRANSACTIONS_PAGE_SIZE), 1),
+            Config.TRANSACTIONS_MAX_PAGE_SIZE,
+        )
+        after = self._decode_transactions_cursor(page_cursor) if page_cursor else None
 
+        conn = self.get_db_connection()
+        cursor = conn.cursor()
+        try:
+            query, params = self._build_transactions_query(cursor, filters, after)
+            # 多取一条判断是否还有下一页
+            cursor.execute(f"{query} LIMIT ?", [*params, limit + 1])
+            rows = cursor.fetchall()
         finally:
             conn.close()
 
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = self._encode_transactions_cursor(
+                last["transaction_date"], last["transaction_id"]
+            )
+        return [self._transaction_to_dict(row) for row in rows], next_cursor
+
+    def iter_transactions(
+        self, filters: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """逐条产出符合条件的交易记录，每次从游标读取一批，用于流式导出"""
+        conn = self.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            query, params = self._build_transactions_query(cursor, filters)
+            cursor.execute(query, params)
+            while rows := cursor.fetchmany(Config.TRANSACTIONS_STREAM_BATCH):
+                for row in rows:
+                    yield self._transaction_to_dict(row)
+        finally:
+            conn.close()
+
+    def _build_transactions_query(
+        self,
+        cursor: sqlite3.Cursor,
+        filters: Optional[Dict[str, Any]] = None,
+        after: Optional[Tuple[str, int]] = None,
+    ) -> Tuple[str, List[Any]]:
+        """构造交易记录查询，按交易日期、交易ID倒序
+
+        Args:
+            cursor: 数据库游标，用于检查全文索引是否可用
+            filters: 筛选条件
+            after: 可选，(交易日期, 交易ID)，只返回排在其后的记录
+        """
+        query = """
+            SELECT 
+                t.transaction_id,
+                t.fund_code,
+                f.fund_name,
+                t.transaction_type,
+                t.amount,
+                t.nav,
+                t.fee,
+                t.shares,
+                t.transaction_date
+            FROM fund_transactions t
+            JOIN funds f ON t.fund_code = f.fund_code
+            WHERE 1=1
+        """
+        params = []
+
+        if filters:
+            if filters.get("fund_code"):
+                # 按代码前缀搜索，转换为范围条件以使用 fund_code 索引
+                prefix = filters["fund_code"]
+                query += " AND t.fund_code >= ? AND t.fund_code < ?"
+                params.extend([prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)])
+            if filters.get("fund_name"):
+                fund_name = filters["fund_name"]
+                if self._fund_name_fts is None:
+                    cursor.execute(
+                        "SELECT 1 FROM sqlite_master WHERE name = 'funds_fts'"
+                    )
+                    self._fund_name_fts = cursor.fetchone() is not None
+                if self._fund_name_fts and len(fund_name) >= 3:
+                    query += """
+                        AND t.fund_code IN (
+                            SELECT fund_code FROM funds_fts WHERE funds_fts MATCH ?
+                        )
+                    """
+                    params.append('"{}"'.format(fund_name.replace('"', '""')))
+                else:
+                    # trigram 索引至少需要 3 个字符，更短的关键词直接匹配基金表
+                    query += " AND f.fund_name LIKE ?"
+                    params.append(f"%{fund_name}%")
+            if filters.get("start_date"):
+                query += " AND t.transaction_date >= ?"
+                params.append(filters["start_date"])
+            if filters.get("end_date"):
+                query += " AND t.transaction_date <= ?"
+                params.append(filters["end_date"])
+            # 只在交易类型不为 'all' 时添加条件
+            if filters.get("transaction_type") and filters["transaction_type"] != "all":
+                query += " AND t.transaction_type = ?"
+                params.append(filters["transaction_type"])
+
+        if after:
+            query += " AND (t.transaction_date, t.transaction_id) < (?, ?)"
+            params.extend(after)
+
+        query += " ORDER BY t.transaction_date DESC, t.transaction_id DESC"
+        return query, params
+
+    @staticmethod
+    def _transaction_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "transaction_id": row["transaction_id"],
+            "fund_code": row["fund_code"],
+            "fund_name": row["fund_name"],
+            "transaction_type": row["transaction_type"],
+            "amount": float(row["amount"]),
+            "nav": float(row["nav"]),
+            "fee": float(row["fee"]),
+            "shares": float(row["shares"]),
+            "transaction_date": row["transaction_date"],
+        }
+
+    @staticmethod
+    def _encode_transactions_cursor(transaction_date: str, transaction_id: int) -> str:
+        """将最后一条记录的 (交易日期, 交易ID) 编码为分页游标"""
+        raw = json.dumps([transaction_date, transaction_id]).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    @staticmethod
+    def _decode_transactions_cursor(page_cursor: str) -> Tuple[str, int]:
+        try:
+            transaction_date, transaction_id = json.loads(
+                base64.urlsafe_b64decode(page_cursor.encode("ascii"))
+            )
+            return str(transaction_date), int(transaction_id)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"无效的分页游标: {page_cursor}") from e
+
     def delete_transaction(self, transaction_id):
         """删除交易记录"""
         conn = self.get_db_connection()
         cursor = conn.cursor()
 
         try:
+            cursor.execute(
+                "SELECT fund_code FROM fund_transactions WHERE transaction_id = ?",
+                (transaction_id,),
+            )
+            transaction = cursor.fetchone()
             cursor.execute(
                 "DELETE FROM fund_transactions WHERE transaction_id = ?",
                 (transaction_id,),
             )
+            # 删除交易会改变之后所有交易的平均成本，需要重建该基金的持仓快照
+            if transaction:
+                self._rebuild_positions(cursor, [transaction["fund_code"]])
             conn.commit()
             return True
         except Exception as e:
@@ -668,22 +1833,16 @@ class FundService:
             cursor.execute(
                 "SELECT * FROM funds WHERE fund_code = ?", (data["fund_code"],)
             )
-            if not cursor.fetchone():
+            fund = cursor.fetchone()
+            if not fund:
                 raise ValueError("基金不存在")
 
             # 计算手续费
             if data["transaction_type"] == "sell":
                 fee = float(data.get("fee", 0))  # 使用用户输入的手续费
             else:
-                # 获取基金费率设置
-                fund_settings = self.get_all_fund_settings()
-                fund_setting = next(
-                    (f for f in fund_settings if f["fund_code"] == data["fund_code"]),
-                    None,
-                )
-                if not fund_setting:
-                    raise ValueError("未找到基金费率设置")
-                fee = amount * fund_setting["buy_fee"]
+                # 使用基金的买入费率设置
+                fee = amount * float(fund["buy_fee"])
 
             # 计算份额
             shares = (
@@ -718,6 +1877,13 @@ class FundService:
             if cursor.rowcount == 0:
                 raise ValueError("更新失败，未找到对应的交易记录")
 
+            # 修改已计入快照的交易会改变之后所有交易的平均成本，需要重建该基金的持仓快照
+            cursor.execute(
+                "SELECT fund_code FROM fund_transactions WHERE transaction_id = ?",
+                (transaction_id,),
+            )
+            self._rebuild_positions(cursor, [cursor.fetchone()["fund_code"]])
+
             conn.commit()
             return True
         except Exception as e:
@@ -741,74 +1907,87 @@ class FundService:
             - update_time: 净值更新时间
             - buy_fee: 买入费率
         """
-        conn = None
         try:
-            # 准备返回结果
-            result = {
-                "code": fund_code,
-                "name": "",
-                "fund_type": "未知",
-                "nav": 0,
-                "update_time": "",
-                "buy_fee": 0,
-            }
+            result = self._get_stored_fund_info(fund_code)
+            # 如果数据库中没有完整信息，从API获取
+            if not result["name"] or result["fund_type"] == "未知":
+                self._merge_fund_basic_info(result, self.fetch_fund_info(fund_code))
+            return result
 
-            # 首先从数据库获取基本信息
-            conn = self.get_db_connection()
+        except Exception as e:
+            print(f"获取基金信息失败: {str(e)}")
+            # 确保返回基本结构，即使出错
+            return self._empty_fund_info(fund_code)
+
+    async def get_fund_info_async(self, fund_code: str) -> Dict[str, Any]:
+        """get_fund_info 的异步版本"""
+        try:
+            result = self._get_stored_fund_info(fund_code)
+            if not result["name"] or result["fund_type"] == "未知":
+                self._merge_fund_basic_info(
+                    result, await self.fetch_fund_info_async(fund_code)
+                )
+            return result
+
+        except Exception as e:
+            print(f"获取基金信息失败: {str(e)}")
+            return self._empty_fund_info(fund_code)
+
+    @staticmethod
+    def _empty_fund_info(fund_code: str) -> Dict[str, Any]:
+        return {
+            "code": fund_code,
+            "name": "",
+            "fund_type": "未知",
+            "nav": 0,
+            "update_time": "",
+            "buy_fee": 0,
+        }
+
+    def _get_stored_fund_info(self, fund_code: str) -> Dict[str, Any]:
+        """从数据库获取基金的名称、类型和费率，没有的字段为默认值"""
+        result = self._empty_fund_info(fund_code)
+        conn = self.get_db_connection()
+        try:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT fund_name, fund_type, buy_fee FROM funds WHERE fund_code = ?",
                 (fund_code,),
             )
             fund_info = cursor.fetchone()
+        finally:
+            conn.close()
 
-            # 如果数据库中有信息，优先使用
-            if fund_info:
-                result["name"] = (
-                    fund_info["fund_name"] if fund_info["fund_name"] else ""
-                )
-                result["fund_type"] = (
-                    fund_info["fund_type"] if fund_info["fund_type"] else "未知"
-                )
-                result["buy_fee"] = (
-                    float(fund_info["buy_fee"])
-                    if fund_info["buy_fee"] is not None
-                    else 0
-                )
-
-            # 如果数据库中没有完整信息，从API获取
-            if not result["name"] or result["fund_type"] == "未知":
-                fund_basic_info = self.fetch_fund_info(fund_code)
-                if fund_basic_info:
-                    # 更新基金信息
-                    if not result["name"]:
-                        result["name"] = fund_basic_info["name"]
-                    if result["fund_type"] == "未知":
-                        result["fund_type"] = fund_basic_info["fund_type"]
-                    # 如果数据库中没有费率信息，使用API返回的费率
-                    if result["buy_fee"] == 0:
-                        result["buy_fee"] = fund_basic_info.get("buy_fee", 0)
-
-                    # 更新净值信息
-                    result["nav"] = fund_basic_info.get("unit_net_value", 0)
-                    result["update_time"] = fund_basic_info.get("net_value_date", "")
-
-            return result
+        # 如果数据库中有信息，优先使用
+        if fund_info:
+            result["name"] = fund_info["fund_name"] if fund_info["fund_name"] else ""
+            result["fund_type"] = (
+                fund_info["fund_type"] if fund_info["fund_type"] else "未知"
+            )
+            result["buy_fee"] = (
+                float(fund_info["buy_fee"]) if fund_info["buy_fee"] is not None else 0
+            )
+        return result
 
-        except Exception as e:
-            print(f"获取基金信息失败: {str(e)}")
-            # 确保返回基本结构，即使出错
-            return {
-                "code": fund_code,
-                "name": "",
-                "fund_type": "未知",
-                "nav": 0,
-                "update_time": "",
-                "buy_fee": 0,
-            }
-        finally:
-            if conn:
-                conn.close()
+    @staticmethod
+    def _merge_fund_basic_info(
+        result: Dict[str, Any], fund_basic_info: Optional[Dict[str, Any]]
+    ) -> None:
+        """用接口获取的基金信息补全数据库中缺少的字段"""
+        if not fund_basic_info:
+            return
+        # 更新基金信息
+        if not result["name"]:
+            result["name"] = fund_basic_info["name"]
+        if result["fund_type"] == "未知":
+            result["fund_type"] = fund_basic_info["fund_type"]
+        # 如果数据库中没有费率信息，使用API返回的费率
+        if result["buy_fee"] == 0:
+            result["buy_fee"] = fund_basic_info.get("buy_fee", 0)
+
+        # 更新净值信息
+        result["nav"] = fund_basic_info.get("unit_net_value", 0)
+        result["update_time"] = fund_basic_info.get("net_value_date", "")
 
     def get_all_fund_settings(self):
         conn = self.get_db_connection()
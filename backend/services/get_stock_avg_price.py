@@ -1,5 +1,4 @@
-import requests
-import pandas as pd
+from services.http_client import http_get
 from datetime import datetime, timedelta
 import time
 import json
@@ -55,7 +54,7 @@ def get_stock_price_average_eastmoney(stock_code='00020', year=2024, month=12):
     }
     
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = http_get(url, params=params, headers=headers)
         
         if response.status_code != 200:
             print(f"HTTP错误: 状态码 {response.status_code}")
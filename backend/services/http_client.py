@@ -0,0 +1,76 @@
+"""共享 HTTP 客户端模块
+
+所有访问外部行情接口（fund.eastmoney.com、fundgz.1234567.com.cn、api.fund.eastmoney.com 等）
+的请求都通过这里的 Session 发出：按主机复用连接池并保持 keep-alive，
+统一配置超时和带退避的失败重试，批量操作时不必为每个请求重新建立 TCP/TLS 连接。
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import Config
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _create_session() -> requests.Session:
+    """创建挂载了连接池和重试策略的 Session"""
+    retry = Retry(
+        total=Config.HTTP_MAX_RETRIES,
+        backoff_factor=Config.HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=Config.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=Config.HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """获取进程内共享的 Session，首次调用时创建"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+    return _session
+
+
+def http_get(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+) -> requests.Response:
+    """通过共享 Session 发送 GET 请求
+
+    Args:
+        url: 请求地址
+        params: 查询参数
+        headers: 请求头
+        timeout: 超时时间（秒），默认使用 Config.HTTP_TIMEOUT
+
+    Returns:
+        响应对象
+    """
+    return get_session().get(
+        url,
+        params=params,
+        headers=headers,
+        timeout=timeout if timeout is not None else Config.HTTP_TIMEOUT,
+    )
@@ -0,0 +1,50 @@
+"""A 股交易时段模块
+
+提供判断当前是否处于交易时段、计算下一个交易时段开盘时间等功能，
+用于决定基金估值等盘中数据的缓存有效期。
+"""
+
+from datetime import date, datetime, time
+
+from services.trading_calendar import get_calendar
+
+MORNING_OPEN = time(9, 30)
+MORNING_CLOSE = time(11, 30)
+AFTERNOON_OPEN = time(13, 0)
+AFTERNOON_CLOSE = time(15, 0)
+
+
+def is_trading_day(day: date) -> bool:
+    """判断是否为交易日（排除周末和交易日历中的休市日）"""
+    return get_calendar().is_trading_day(day)
+
+
+def is_trading_time(now: datetime) -> bool:
+    """判断给定时间是否处于交易时段内"""
+    if not is_trading_day(now.date()):
+        return False
+    current = now.time()
+    return (
+        MORNING_OPEN <= current < MORNING_CLOSE
+        or AFTERNOON_OPEN <= current < AFTERNOON_CLOSE
+    )
+
+
+def latest_session_day(now: datetime) -> date:
+    """获取给定时间之前最近一个已经开盘的交易日"""
+    calendar = get_calendar()
+    day = calendar.latest_trading_day(now.date())
+    if day == now.date() and now.time() < MORNING_OPEN:
+        return calendar.previous_trading_day(day)
+    return day
+
+
+def next_session_open(now: datetime) -> datetime:
+    """获取给定时间之后下一个交易时段的开盘时间（午间休市后的开盘也算）"""
+    if is_trading_day(now.date()):
+        if now.time() < MORNING_OPEN:
+            return datetime.combine(now.date(), MORNING_OPEN)
+        if MORNING_CLOSE <= now.time() < AFTERNOON_OPEN:
+            return datetime.combine(now.date(), AFTERNOON_OPEN)
+
+    return datetime.combine(get_calendar().next_trading_day(now.date()), MORNING_OPEN)
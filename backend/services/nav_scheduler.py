@@ -0,0 +1,146 @@
+"""后台净值刷新任务
+
+在应用进程内的后台线程中定期刷新基金净值，请求处理只读取数据库中保存的净值：
+
+- 盘中每 Config.NAV_SCHEDULER_ESTIMATE_INTERVAL 分钟刷新一次全部基金的估值
+- 非交易时段每 Config.NAV_SCHEDULER_OFFICIAL_INTERVAL 分钟检查一次，
+  刷新官方净值尚未保存的基金（见 FundService.is_nav_stale），直到全部更新
+- 每个净值日期第一次检查官方净值之后，预热最近
+  Config.NAV_SCHEDULER_HISTORY_DAYS 个交易日的历史净值
+"""
+
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+from config import Config
+from services.eastmoney_api import estimate_cache
+from services.fund_service import FundService
+from services.market_hours import is_trading_time
+from services.trading_calendar import get_calendar
+
+
+class NavRefreshScheduler:
+    """后台净值刷新任务，start() 后在守护线程中运行"""
+
+    def __init__(self, fund_service: FundService):
+        self.fund_service = fund_service
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.started_at: Optional[datetime] = None
+        self.last_estimate_refresh: Optional[datetime] = None
+        self.last_official_check: Optional[datetime] = None
+        self.history_warmed_for: Optional[date] = None
+        self.runs = {"estimate": 0, "official": 0, "history": 0}
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        """启动后台线程，已在运行时不重复启动"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="nav-refresh", daemon=True
+            )
+            self.started_at = datetime.now()
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """停止后台线程，等待当前任务完成"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.run_pending()
+            self._stop.wait(Config.NAV_SCHEDULER_TICK)
+
+    def run_pending(self, now: Optional[datetime] = None) -> None:
+        """执行当前已到期的任务"""
+        now = now or datetime.now()
+        try:
+            if is_trading_time(now):
+                if self._due(self.last_estimate_refresh, now, "ESTIMATE"):
+                    self.refresh_estimates(now)
+                return
+
+            if self._due(self.last_official_check, now, "OFFICIAL"):
+                self.refresh_official_navs(now)
+
+            nav_date = get_calendar().latest_nav_date(now)
+            if self.history_warmed_for != nav_date:
+                self.warm_history(nav_date)
+        except Exception as e:
+            print(f"后台刷新净值失败: {str(e)}")
+            self.errors += 1
+            self.last_error = str(e)
+
+    @staticmethod
+    def _due(last_run: Optional[datetime], now: datetime, job: str) -> bool:
+        interval = getattr(Config, f"NAV_SCHEDULER_{job}_INTERVAL")
+        return last_run is None or now - last_run >= timedelta(minutes=interval)
+
+    def refresh_estimates(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """盘中刷新全部基金的估值"""
+        result = self.fund_service.update_all_navs()
+        self.last_estimate_refresh = now or datetime.now()
+        self.runs["estimate"] += 1
+        return result
+
+    def refresh_official_navs(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """刷新官方净值尚未保存的基金
+
+        估值缓存在收盘后会保留到下一个交易时段，这里先删除这些基金的缓存，
+        以便取到新公布的净值。
+        """
+        now = now or datetime.now()
+        codes = self.fund_service.get_stale_nav_codes(now)
+        self.last_official_check = now
+        if not codes:
+            return {"total": 0, "updated": 0, "failed": 0}
+
+        for fund_code in codes:
+            estimate_cache.invalidate(fund_code)
+        result = self.fund_service.update_all_navs(codes)
+        self.runs["official"] += 1
+        return result
+
+    def warm_history(self, nav_date: date) -> Dict[str, Any]:
+        """补齐全部基金最近的历史净值，每个净值日期执行一次"""
+        start_date = get_calendar().shift_trading_days(
+            nav_date, -Config.NAV_SCHEDULER_HISTORY_DAYS
+        )
+        result = self.fund_service.backfill_nav_history(
+            start_date=start_date.isoformat()
+        )
+        self.history_warmed_for = nav_date
+        self.runs["history"] += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """返回后台任务的运行状态"""
+
+        def isoformat(value):
+            return value.isoformat(timespec="seconds") if value else None
+
+        return {
+            "enabled": Config.NAV_SCHEDULER_ENABLED,
+            "running": self.running,
+            "started_at": isoformat(self.started_at),
+            "last_estimate_refresh": isoformat(self.last_estimate_refresh),
+            "last_official_check": isoformat(self.last_official_check),
+            "history_warmed_for": (
+                self.history_warmed_for.isoformat() if self.history_warmed_for else None
+            ),
+            "runs": dict(self.runs),
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
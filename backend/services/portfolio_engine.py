@@ -0,0 +1,441 @@
+"""基于 NumPy 的持仓计算引擎
+
+把交易记录加载为列式数组（基金序号、交易类型、金额、净值、份额、月份序号），
+按移动加权平均成本法计算所有基金的持仓快照，并批量计算持仓市值、收益和仓位。
+
+移动加权平均成本依赖同一基金之前的交易，无法在基金内部并行，因此按
+"每个基金的第 k 笔交易"逐步推进：第 k 步同时处理所有基金的第 k 笔交易。
+交易笔数最多的少数基金剩下的交易不再逐步推进（每步的数组操作只处理几个元素，
+开销高于逐笔计算），而是逐个基金用 Python 浮点数逐笔计算。每个基金内部的浮点
+运算顺序与逐笔计算完全相同，结果与 FundService._apply_transaction 逐位一致。
+"""
+
+import calendar
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+TX_OTHER = 0
+TX_BUY = 1
+TX_SELL = 2
+
+_TX_TYPE_CODES = {"buy": TX_BUY, "sell": TX_SELL}
+
+# 仍有交易的基金少于该数量时，剩余交易改为逐个基金逐笔计算
+_MIN_VECTOR_FUNDS = 64
+
+# 交易记录的列，代码和日期保留为 Python 字符串
+_LEDGER_DTYPE = np.dtype(
+    [
+        ("code", object),
+        ("type", object),
+        ("amount", np.float64),
+        ("nav", np.float64),
+        ("shares", np.float64),
+        ("date", object),
+    ]
+)
+
+# 持仓快照中的数值字段，按基金保存为 float64 数组
+_SUM_FIELDS = (
+    "total_shares",
+    "total_cost",
+    "realized_profit",
+    "total_buy_amount",
+    "total_sell_amount",
+    "total_buy_shares",
+    "total_sell_shares",
+)
+
+
+class Ledger:
+    """列式存储的交易记录，需按 (基金代码, 交易日期, 交易ID) 排序"""
+
+    def __init__(self, rows: Iterable[Tuple[Any, ...]]):
+        """
+        Args:
+            rows: (fund_code, transaction_type, amount, nav, shares, transaction_date)
+                元组形式的交易记录
+        """
+        table = np.array(list(rows), dtype=_LEDGER_DTYPE)
+        n_rows = len(table)
+
+        self.dates: List[str] = table["date"].tolist()
+        self.type_code = np.zeros(n_rows, dtype=np.int8)
+        for tx_type, code in _TX_TYPE_CODES.items():
+            self.type_code[table["type"] == tx_type] = code
+        self.amount = table["amount"]
+        self.nav = table["nav"]
+        self.shares = table["shares"]
+
+        # 交易按基金代码排序，相邻代码不同处即为新基金的起点
+        codes = table["code"]
+        is_start = np.ones(n_rows, dtype=bool)
+        is_start[1:] = codes[1:] != codes[:-1]
+        self.fund_starts = np.flatnonzero(is_start)
+        self.fund_codes: List[str] = codes[self.fund_starts].tolist()
+        self.fund_index = np.cumsum(is_start) - 1
+
+        # YYYY-MM-DD 的年、月按字符解码为月份序号 (year * 12 + month)
+        digits = (
+            table["date"].astype("U10").view(np.uint32).reshape(-1, 10) - ord("0")
+        ).astype(np.int32)
+        year = (
+            digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+        )
+        self.month = year * 12 + digits[:, 5] * 10 + digits[:, 6]
+
+    def __len__(self) -> int:
+        return len(self.amount)
+
+
+def replay_positions(
+    ledger: Ledger,
+    checkpoints: Optional[List[Tuple[str, str, Dict[str, Any]]]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """按时间顺序计入全部交易，计算每个基金的持仓快照
+
+    Args:
+        ledger: 交易记录
+        checkpoints: 可选，传入列表时会追加每个基金每个有交易的月份月末的
+            (基金代码, 月末日期, 持仓快照) 检查点
+
+    Returns:
+        基金代码到持仓快照的字典，字段同 positions 表
+    """
+    n_rows = len(ledger)
+    n_funds = len(ledger.fund_codes)
+    starts = ledger.fund_starts
+    counts = np.diff(np.append(starts, n_rows))
+
+    state = {field: np.zeros(n_funds) for field in _SUM_FIELDS}
+    last_row = np.full(n_funds, -1)
+    last_buy_row = np.full(n_funds, -1)
+    last_sell_row = np.full(n_funds, -1)
+
+    # 同一基金同一月份的最后一笔交易之后的持仓就是该月的月末检查点
+    if checkpoints is not None:
+        is_month_last = np.ones(n_rows, dtype=bool)
+        is_month_last[:-1] = (ledger.month[1:] != ledger.month[:-1]) | (
+            ledger.fund_index[1:] != ledger.fund_index[:-1]
+        )
+        checkpoint_rows = []
+        checkpoint_states = []
+
+    # 按交易笔数从多到少排列基金，第 k 步参与的基金正好是前若干个
+    funds_by_count = np.argsort(-counts, kind="stable")
+    sorted_counts = counts[funds_by_count]
+    tail_funds, tail_step = [], 0
+    for step in range(int(sorted_counts[0]) if n_funds else 0):
+        active = funds_by_count[: np.searchsorted(-sorted_counts, -step, "left")]
+        if len(active) < _MIN_VECTOR_FUNDS:
+            tail_funds, tail_step = active.tolist(), step
+            break
+        rows = starts[active] + step
+        tx_type = ledger.type_code[rows]
+
+        is_buy = tx_type == TX_BUY
+        buy_funds, buy_rows = active[is_buy], rows[is_buy]
+        if len(buy_rows):
+            amount, shares = ledger.amount[buy_rows], ledger.shares[buy_rows]
+            state["total_buy_amount"][buy_funds] += amount
+            state["total_buy_shares"][buy_funds] += shares
+            state["total_shares"][buy_funds] += shares
+            state["total_cost"][buy_funds] += amount
+            last_buy_row[buy_funds] = buy_rows
+
+        is_sell = tx_type == TX_SELL
+        sell_funds, sell_rows = active[is_sell], rows[is_sell]
+        if len(sell_rows):
+            amount, shares = ledger.amount[sell_rows], ledger.shares[sell_rows]
+            state["total_sell_amount"][sell_funds] += amount
+            state["total_sell_shares"][sell_funds] += shares
+            held = state["total_shares"][sell_funds]
+            cost = state["total_cost"][sell_funds]
+            # 卖出前的平均持仓净值，没有持仓时为0
+            avg_cost = np.divide(cost, held, out=np.zeros_like(cost), where=held > 0)
+            state["total_shares"][sell_funds] = held - shares
+            # 计算卖出收益 （这里忽略掉卖出时的手续费）
+            sell_cost = shares * avg_cost
+            state["realized_profit"][sell_funds] += (
+                shares * ledger.nav[sell_rows] - sell_cost
+            )
+            state["total_cost"][sell_funds] = cost - sell_cost
+            last_sell_row[sell_funds] = sell_rows
+
+        last_row[active] = rows
+
+        if checkpoints is not None:
+            month_last = is_month_last[rows]
+            if month_last.any():
+                checkpoint_funds = active[month_last]
+                checkpoint_rows.append(rows[month_last])
+                checkpoint_states.append(
+                    np.stack(
+                        [state[field][checkpoint_funds] for field in _SUM_FIELDS],
+                        axis=1,
+                    )
+                )
+
+    for fund in tail_funds:
+        begin = int(starts[fund]) + tail_step
+        end = int(starts[fund] + counts[fund])
+        fund_checkpoints = _replay_rows(
+            ledger,
+            state,
+            fund,
+            begin,
+            end,
+            last_buy_row,
+            last_sell_row,
+            is_month_last[begin:end] if checkpoints is not None else None,
+        )
+        last_row[fund] = end - 1
+        if fund_checkpoints is not None and fund_checkpoints[0]:
+            checkpoint_rows.append(np.array(fund_checkpoints[0]))
+            checkpoint_states.append(np.array(fund_checkpoints[1]))
+
+    positions = {}
+    for fund, fund_code in enumerate(ledger.fund_codes):
+        position = {field: state[field][fund] for field in _SUM_FIELDS}
+        positions[fund_code] = _to_position(
+            ledger,
+            position,
+            int(last_buy_row[fund]),
+            int(last_sell_row[fund]),
+            int(last_row[fund]),
+        )
+
+    if checkpoints is not None and checkpoint_rows:
+        checkpoints.extend(
+            _collect_checkpoints(
+                ledger,
+                np.concatenate(checkpoint_rows),
+                np.concatenate(checkpoint_states),
+            )
+        )
+    return positions
+
+
+def _replay_rows(
+    ledger: Ledger,
+    state: Dict[str, np.ndarray],
+    fund: int,
+    begin: int,
+    end: int,
+    last_buy_row: np.ndarray,
+    last_sell_row: np.ndarray,
+    is_month_last: Optional[np.ndarray],
+) -> Optional[Tuple[List[int], List[Tuple[float, ...]]]]:
+    """用 Python 浮点数逐笔计入一个基金 [begin, end) 行的交易，更新 state
+
+    运算与 replay_positions 的逐步推进相同。传入 is_month_last 时返回该基金
+    (月末检查点行号列表, 对应的持仓数值列表)。
+    """
+    (
+        total_shares,
+        total_cost,
+        realized_profit,
+        total_buy_amount,
+        total_sell_amount,
+        total_buy_shares,
+        total_sell_shares,
+    ) = (float(state[field][fund]) for field in _SUM_FIELDS)
+    checkpoint_rows, checkpoint_values = [], []
+    month_last = is_month_last.tolist() if is_month_last is not None else None
+
+    for offset, (tx_type, amount, nav, shares) in enumerate(
+        zip(
+            ledger.type_code[begin:end].tolist(),
+            ledger.amount[begin:end].tolist(),
+            ledger.nav[begin:end].tolist(),
+            ledger.shares[begin:end].tolist(),
+        )
+    ):
+        if tx_type == TX_BUY:
+            total_buy_amount += amount
+            total_buy_shares += shares
+            total_shares += shares
+            total_cost += amount
+            last_buy_row[fund] = begin + offset
+        elif tx_type == TX_SELL:
+            total_sell_amount += amount
+            total_sell_shares += shares
+            avg_cost = total_cost / total_shares if total_shares > 0 else 0.0
+            total_shares -= shares
+            sell_cost = shares * avg_cost
+            realized_profit += shares * nav - sell_cost
+            total_cost -= sell_cost
+            last_sell_row[fund] = begin + offset
+
+        if month_last is not None and month_last[offset]:
+            checkpoint_rows.append(begin + offset)
+            checkpoint_values.append(
+                (
+                    total_shares,
+                    total_cost,
+                    realized_profit,
+                    total_buy_amount,
+                    total_sell_amount,
+                    total_buy_shares,
+                    total_sell_shares,
+                )
+            )
+
+    for field, value in zip(
+        _SUM_FIELDS,
+        (
+            total_shares,
+            total_cost,
+            realized_profit,
+            total_buy_amount,
+            total_sell_amount,
+            total_buy_shares,
+            total_sell_shares,
+        ),
+    ):
+        state[field][fund] = value
+
+    if month_last is None:
+        return None
+    return checkpoint_rows, checkpoint_values
+
+
+def _collect_checkpoints(
+    ledger: Ledger,
+    rows: np.ndarray,
+    states: np.ndarray,
+) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """把逐步记录的检查点转换为 (基金代码, 月末日期, 持仓快照) 列表"""
+    # 检查点之前最近一次买入/卖出的行号：在基金内按行号前向填充
+    is_buy = ledger.type_code == TX_BUY
+    is_sell = ledger.type_code == TX_SELL
+    row_numbers = np.arange(len(ledger))
+    group_floor = ledger.fund_starts[ledger.fund_index] - 1
+    prev_buy = np.maximum.accumulate(np.where(is_buy, row_numbers, -1))
+    prev_sell = np.maximum.accumulate(np.where(is_sell, row_numbers, -1))
+    prev_buy = np.where(prev_buy > group_floor, prev_buy, -1)
+    prev_sell = np.where(prev_sell > group_floor, prev_sell, -1)
+
+    month_ends = {}
+    for month in np.unique(ledger.month[rows]).tolist():
+        year, month_of_year = divmod(month - 1, 12)
+        month_ends[month] = (
+            f"{year:04d}-{month_of_year + 1:02d}-"
+            f"{calendar.monthrange(year, month_of_year + 1)[1]:02d}"
+        )
+
+    # 按列转换为 Python 对象后再逐个组装，字段顺序与 _to_position 相同。
+    # 行号 -1 表示没有买入/卖出，对应末尾追加的 None
+    navs = np.append(ledger.nav.astype(object), None)
+    dates = np.append(np.array(ledger.dates, dtype=object), None)
+    buy_rows, sell_rows = prev_buy[rows], prev_sell[rows]
+    checkpoints = []
+    for fund, month, values, buy_nav, buy_date, sell_nav, sell_date, date in zip(
+        ledger.fund_index[rows].tolist(),
+        ledger.month[rows].tolist(),
+        states.tolist(),
+        navs[buy_rows].tolist(),
+        dates[buy_rows].tolist(),
+        navs[sell_rows].tolist(),
+        dates[sell_rows].tolist(),
+        dates[rows].tolist(),
+    ):
+        position = dict(zip(_SUM_FIELDS, values))
+        position["last_buy_nav"] = buy_nav
+        position["last_buy_date"] = buy_date
+        position["last_sell_nav"] = sell_nav
+        position["last_sell_date"] = sell_date
+        position["last_transaction_date"] = date
+        checkpoints.append((ledger.fund_codes[fund], month_ends[month], position))
+    return checkpoints
+
+
+def _to_position(
+    ledger: Ledger,
+    sums: Dict[str, Any],
+    last_buy_row: int,
+    last_sell_row: int,
+    last_row: int,
+) -> Dict[str, Any]:
+    """组装与 FundService._new_position 字段相同的持仓快照"""
+    position = {field: float(value) for field, value in sums.items()}
+    position["last_buy_nav"] = (
+        float(ledger.nav[last_buy_row]) if last_buy_row >= 0 else None
+    )
+    position["last_buy_date"] = (
+        ledger.dates[last_buy_row] if last_buy_row >= 0 else None
+    )
+    position["last_sell_nav"] = (
+        float(ledger.nav[last_sell_row]) if last_sell_row >= 0 else None
+    )
+    position["last_sell_date"] = (
+        ledger.dates[last_sell_row] if last_sell_row >= 0 else None
+    )
+    position["last_transaction_date"] = (
+        ledger.dates[last_row] if last_row >= 0 else None
+    )
+    return position
+
+
+def compute_holding_metrics(
+    positions: Sequence[Dict[str, Any]],
+    current_navs: Sequence[float],
+    is_money_fund: Sequence[bool],
+) -> Dict[str, List[float]]:
+    """批量计算各基金的持仓市值、成本净值、收益和实际仓位
+
+    Args:
+        positions: 各基金的持仓快照
+        current_navs: 各基金的最新净值
+        is_money_fund: 各基金是否为货币型基金
+
+    Returns:
+        指标名到各基金指标值列表的字典，顺序与 positions 相同
+    """
+    columns = {
+        field: np.array([position[field] for position in positions], dtype=np.float64)
+        for field in _SUM_FIELDS
+    }
+    current_nav = np.array(current_navs, dtype=np.float64)
+    is_money = np.array(is_money_fund, dtype=bool)
+
+    # 总市值沿用原有口径：最新净值 * 累计买入份额 - 累计卖出份额，按基金顺序累加
+    market_value_terms = (
+        current_nav * columns["total_buy_shares"] - columns["total_sell_shares"]
+    )
+    total_market_value = (
+        float(np.add.accumulate(market_value_terms)[-1]) if len(positions) else 0
+    )
+
+    total_shares = columns["total_shares"]
+    total_cost = columns["total_cost"]
+    market_value = np.where(
+        is_money,
+        columns["total_buy_amount"] - columns["total_sell_amount"],
+        total_shares * current_nav,
+    )
+    holding_profit = market_value - total_cost
+    metrics = {
+        "market_value": market_value,
+        "avg_cost_nav": np.divide(
+            total_cost,
+            total_shares,
+            out=np.zeros_like(total_cost),
+            where=total_shares > 0,
+        ),
+        "holding_profit": holding_profit,
+        "holding_profit_rate": np.divide(
+            holding_profit,
+            total_cost,
+            out=np.zeros_like(total_cost),
+            where=total_cost > 0,
+        ),
+        "total_profit": columns["realized_profit"] + holding_profit,
+        "actual_position": (
+            market_value / total_market_value * 100
+            if total_market_value > 0
+            else np.zeros_like(market_value)
+        ),
+    }
+    return {name: values.tolist() for name, values in metrics.items()}
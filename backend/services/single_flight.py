@@ -0,0 +1,91 @@
+"""合并并发的相同请求（single-flight）"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """同一个键同时只执行一次，期间到达的调用等待并共享其结果（或异常）
+
+    键的第一个元素作为统计时的接口名。线程和协程都可以调用：进行中的调用以
+    concurrent.futures.Future 表示，同步调用方阻塞等待，异步调用方在各自的
+    事件循环中 await，同一个键的同步和异步调用也会合并。
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _join(self, key: Tuple) -> Tuple[Future, bool]:
+        """返回 (进行中的调用, 当前调用方是否负责执行)"""
+        with self._lock:
+            counts = self._stats.setdefault(str(key[0]), {"calls": 0, "shared": 0})
+            counts["calls"] += 1
+            future = self._calls.get(key)
+            if future is not None:
+                counts["shared"] += 1
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _finish(self, key: Tuple, future: Future) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def do(self, key: Tuple, fn: Callable[..., Any], *args: Any) -> Any:
+        """执行 fn(*args)，同一个键已有调用在进行时等待其结果"""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key, future)
+
+    async def do_async(
+        self, key: Tuple, fn: Callable[..., Awaitable[Any]], *args: Any
+    ) -> Any:
+        """do 的异步版本，fn 为协程函数"""
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key, future)
+
+    def stats(self) -> Dict[str, Any]:
+        """按接口统计调用数、被合并的调用数和合并比例"""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "endpoints": {
+                    endpoint: {
+                        **counts,
+                        "coalesced_rate": (
+                            round(counts["shared"] / counts["calls"], 4)
+                            if counts["calls"]
+                            else 0
+                        ),
+                    }
+                    for endpoint, counts in self._stats.items()
+                },
+            }
@@ -0,0 +1,184 @@
+"""交易日历模块
+
+根据离线维护的休市日列表（Config.TRADING_HOLIDAYS_FILE）判断交易日，并预先计算
+覆盖区间内每一天的前一个 / 后一个交易日，查找为 O(1)。用于：
+
+- 请求历史净值前跳过不可能有净值的日期（周末、节假日、当天净值尚未发布）
+- 以准确的上一个交易日作为日涨幅和缓存查找的键，而不是逐天试探
+
+休市日列表只覆盖到最后一个列出的年份，之后的日期只排除周末。
+"""
+
+import os
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional, Set
+
+from config import Config
+
+# 基金当日净值通常在晚间公布，此时间之后才认为当天的净值应已发布
+NAV_PUBLISH_TIME = time(20, 0)
+
+# 覆盖区间的起始日期，之前的日期只排除周末
+CALENDAR_START = date(2000, 1, 1)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _parse_date(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def load_holidays(path: str) -> Set[date]:
+    """读取休市日文件，每行一个 YYYY-MM-DD 日期，# 之后为注释"""
+    holidays = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            value = line.split("#", 1)[0].strip()
+            if value:
+                holidays.add(_parse_date(value))
+    return holidays
+
+
+class TradingCalendar:
+    """交易日历，覆盖区间内的查找均为 O(1)"""
+
+    def __init__(
+        self,
+        holidays: Iterable[date],
+        start: date = CALENDAR_START,
+        end: Optional[date] = None,
+    ):
+        self.holidays = frozenset(holidays)
+        self.start = start
+        # 默认覆盖到最后一个休市日所在年份的年底
+        self.end = end or date(
+            max((d.year for d in self.holidays), default=start.year), 12, 31
+        )
+
+        self._base = start.toordinal()
+        days = self.end.toordinal() - self._base + 1
+        self._is_trading: List[bool] = []
+        # 每一天（含）之前最近的交易日、之后（含）最近的交易日的序数
+        self._on_or_before: List[Optional[int]] = [None] * days
+        self._on_or_after: List[Optional[int]] = [None] * days
+
+        latest = None
+        for offset in range(days):
+            ordinal = self._base + offset
+            trading = self._is_open(date.fromordinal(ordinal))
+            self._is_trading.append(trading)
+            if trading:
+                latest = ordinal
+            self._on_or_before[offset] = latest
+        upcoming = None
+        for offset in range(days - 1, -1, -1):
+            if self._is_trading[offset]:
+                upcoming = self._base + offset
+            self._on_or_after[offset] = upcoming
+
+    def _is_open(self, day: date) -> bool:
+        return day.weekday() < 5 and day not in self.holidays
+
+    def _offset(self, day: date) -> Optional[int]:
+        offset = day.toordinal() - self._base
+        return offset if 0 <= offset < len(self._is_trading) else None
+
+    def is_trading_day(self, day: date) -> bool:
+        """判断是否为交易日"""
+        offset = self._offset(day)
+        return self._is_trading[offset] if offset is not None else self._is_open(day)
+
+    def latest_trading_day(self, day: date) -> date:
+        """获取不晚于给定日期的最近一个交易日"""
+        offset = self._offset(day)
+        if offset is not None and self._on_or_before[offset] is not None:
+            return date.fromordinal(self._on_or_before[offset])
+        while not self.is_trading_day(day):
+            day -= timedelta(days=1)
+        return day
+
+    def previous_trading_day(self, day: date) -> date:
+        """获取给定日期之前（不含当天）的最近一个交易日"""
+        return self.latest_trading_day(day - timedelta(days=1))
+
+    def next_trading_day(self, day: date) -> date:
+        """获取给定日期之后（不含当天）的最近一个交易日"""
+        day += timedelta(days=1)
+        offset = self._offset(day)
+        if offset is not None and self._on_or_after[offset] is not None:
+            return date.fromordinal(self._on_or_after[offset])
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return day
+
+    def shift_trading_days(self, day: date, n: int) -> date:
+        """从不晚于给定日期的最近交易日起，向前（n < 0）或向后（n > 0）移动 n 个交易日"""
+        day = self.latest_trading_day(day)
+        step = self.next_trading_day if n > 0 else self.previous_trading_day
+        for _ in range(abs(n)):
+            day = step(day)
+        return day
+
+    def is_nav_expected(self, day: date, now: Optional[datetime] = None) -> bool:
+        """判断给定日期的净值此时是否应已发布：交易日，且不是今天或已过发布时间"""
+        now = now or datetime.now()
+        if not self.is_trading_day(day) or day > now.date():
+            return False
+        return day < now.date() or now.time() >= NAV_PUBLISH_TIME
+
+    def latest_nav_date(self, now: Optional[datetime] = None) -> date:
+        """获取此时应已发布净值的最近一个交易日"""
+        now = now or datetime.now()
+        day = self.latest_trading_day(now.date())
+        return day if self.is_nav_expected(day, now) else self.previous_trading_day(day)
+
+    # 以 YYYY-MM-DD 字符串为参数和返回值的便捷方法，与数据库和接口中的日期格式一致
+
+    def previous_trading_date(self, value: str) -> str:
+        return self.previous_trading_day(_parse_date(value)).isoformat()
+
+    def latest_trading_date(self, value: str) -> str:
+        return self.latest_trading_day(_parse_date(value)).isoformat()
+
+    def shift_trading_date(self, value: str, n: int) -> str:
+        return self.shift_trading_days(_parse_date(value), n).isoformat()
+
+    def has_nav_between(
+        self, start: str, end: str, now: Optional[datetime] = None
+    ) -> bool:
+        """判断 (start, end] 区间内是否有应已发布净值的交易日，没有时无需请求接口"""
+        first = self.next_trading_day(_parse_date(start))
+        return first <= _parse_date(end) and first <= self.latest_nav_date(now)
+
+
+_calendar: Optional[TradingCalendar] = None
+_calendar_lock = threading.Lock()
+
+
+def holidays_path() -> str:
+    """休市日文件路径，相对路径相对 backend 目录"""
+    return os.path.join(BACKEND_DIR, Config.TRADING_HOLIDAYS_FILE)
+
+
+def get_calendar() -> TradingCalendar:
+    """获取进程内共享的交易日历，首次调用时读取休市日文件"""
+    global _calendar
+    if _calendar is None:
+        with _calendar_lock:
+            if _calendar is None:
+                try:
+                    holidays = load_holidays(holidays_path())
+                except OSError as e:
+                    print(f"读取休市日文件失败，交易日只排除周末: {str(e)}")
+                    holidays = set()
+                _calendar = TradingCalendar(holidays)
+    return _calendar
+
+
+def reload_calendar() -> TradingCalendar:
+    """休市日文件更新后重新读取"""
+    global _calendar
+    with _calendar_lock:
+        _calendar = None
+    return get_calendar()
@@ -0,0 +1,143 @@
+import os
+import random
+import re
+import sqlite3
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.migrations import migrate  # noqa: E402
+from services.fund_service import FundService  # noqa: E402
+
+# 随交易和净值增长的大表（及查询中使用的别名），访问时必须走索引；
+# funds、positions 每个基金只有一行，允许全表扫描
+LARGE_TABLES = {"fund_transactions", "t", "nav_history", "position_checkpoints", "c"}
+
+_SCAN_PATTERN = re.compile(r"^SCAN (\w+)(.*)$")
+
+
+class TracingFundService(FundService):
+    """记录执行过的每条 SQL（参数已展开）"""
+
+    def __init__(self, db_name):
+        super().__init__(db_name)
+        self.statements = []
+
+    def get_db_connection(self):
+        conn = sqlite3.connect(self.db_name)
+        conn.row_factory = sqlite3.Row
+        conn.set_trace_callback(self.statements.append)
+        return conn
+
+
+def seed_database(db_name, n_funds=20, n_transactions=2000):
+    """初始化测试数据库并写入随机交易和净值"""
+    migrate(db_name)
+    conn = sqlite3.connect(db_name)
+
+    rnd = random.Random(0)
+    today = date.today()
+    for i in range(n_funds):
+        fund_code = f"{i:06d}"
+        conn.execute(
+            "INSERT INTO funds (fund_code, fund_name, current_nav, fund_type)"
+            " VALUES (?, ?, ?, ?)",
+            (fund_code, f"测试成长混合{i}", 1.5, "混合型"),
+        )
+        conn.executemany(
+            "INSERT INTO nav_history (fund_code, nav_date, unit_value) VALUES (?, ?, ?)",
+            [
+                (fund_code, (today - timedelta(days=d)).strftime("%Y-%m-%d"), 1.5)
+                for d in range(30)
+            ],
+        )
+    for _ in range(n_transactions):
+        nav = rnd.uniform(0.5, 3)
+        amount = rnd.uniform(100, 10000)
+        conn.execute(
+            "INSERT INTO fund_transactions (fund_code, transaction_type, amount, nav,"
+            " fee, transaction_date, shares) VALUES (?, ?, ?, ?, 0, ?, ?)",
+            (
+                f"{rnd.randrange(n_funds):06d}",
+                rnd.choice(("buy", "buy", "sell")),
+                amount,
+                nav,
+                (today - timedelta(days=rnd.randrange(1000))).strftime("%Y-%m-%d"),
+                amount / nav,
+            ),
+        )
+    FundService(db_name)._rebuild_positions(conn.cursor())
+    conn.commit()
+    conn.close()
+
+
+def run_hot_queries(service):
+    """执行各个接口用到的查询"""
+    today = date.today()
+    cutoff = (today - timedelta(days=400)).strftime("%Y-%m-%d")
+
+    service.get_holdings()
+    service.get_holdings(cutoff)
+    service.get_transactions()
+    service.get_transactions({"fund_code": "0000"})
+    service.get_transactions({"fund_name": "成长混合"})
+    service.get_transactions({"start_date": cutoff, "end_date": str(today)})
+    service.get_transactions({"fund_code": "000001", "transaction_type": "sell"})
+    page, next_cursor = service.get_transactions_page(limit=50)
+    service.get_transactions_page({"fund_code": "0000"}, 50, next_cursor)
+    for _ in service.iter_transactions({"start_date": cutoff}):
+        pass
+    service.check_fund_transactions("000001")
+    service.get_historical_nav("000001", (today - timedelta(days=3)).isoformat())
+    service.add_transaction(
+        {
+            "fund_code": "000001",
+            "fund_name": "测试成长混合1",
+            "transaction_type": "buy",
+            "amount": 1000.0,
+            "nav": 1.2,
+            "fee": 0,
+            "shares": 1000 / 1.2,
+            "transaction_date": cutoff,
+        }
+    )
+    transaction_id = service.get_transactions({"fund_code": "000001"})[0][
+        "transaction_id"
+    ]
+    service.delete_transaction(transaction_id)
+
+
+def find_full_scans(db_name, statements):
+    """对每条查询做 EXPLAIN QUERY PLAN，返回全表扫描大表的 (SQL, 计划) 列表"""
+    conn = sqlite3.connect(db_name)
+    problems = []
+    checked = set()
+    for sql in statements:
+        sql = sql.strip()
+        if sql in checked or not re.match(r"(SELECT|UPDATE|DELETE)\b", sql, re.I):
+            continue
+        checked.add(sql)
+
+        for _, _, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+            match = _SCAN_PATTERN.match(detail)
+            if (
+                match
+                and match.group(1) in LARGE_TABLES
+                and "INDEX" not in match.group(2)
+            ):
+                problems.append((sql, detail))
+    conn.close()
+    return len(checked), problems
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    """热点查询不能全表扫描交易、净值等大表"""
+    db_name = str(tmp_path / "finance.db")
+    seed_database(db_name)
+    service = TracingFundService(db_name)
+    run_hot_queries(service)
+
+    checked, problems = find_full_scans(db_name, service.statements)
+    assert checked > 0
+    assert problems == []
@@ -60,6 +60,16 @@ export const fundApi = {
         }
     },
 
+    getCurrentNavs: async (fundCodes) => {
+        try {
+            const params = new URLSearchParams({ fund_codes: fundCodes.join(',') });
+            return await axiosInstance.get(`/fund/nav/batch?${params}`);
+        } catch (error) {
+            console.error('批量获取当前净值失败:', error);
+            throw error;
+        }
+    },
+
     getHistoricalNav: async (fundCode, date) => {
         try {
             return await axiosInstance.get(`/fund/nav/${fundCode}/history/${date}`);
@@ -99,6 +109,21 @@ export const fundApi = {
         }
     },
 
+    // 按游标分页获取交易记录，cursor 为上一页返回的 next_cursor
+    getTransactionsPage: async (filters, limit, cursor) => {
+        try {
+            const params = new URLSearchParams(filters);
+            params.set('limit', limit);
+            if (cursor) {
+                params.set('cursor', cursor);
+            }
+            return await axiosInstance.get(`/fund/transactions?${params}`);
+        } catch (error) {
+            console.error('获取交易记录失败:', error);
+            throw error;
+        }
+    },
+
     addTransaction: async (data) => {
         try {
             return await axiosInstance.post('/fund/transactions', data);
@@ -108,6 +133,16 @@ export const fundApi = {
         }
     },
 
+    // 批量导入交易记录，返回每条失败记录的下标和原因
+    addTransactionsBulk: async (transactions, atomic = false) => {
+        try {
+            return await axiosInstance.post('/fund/transactions/bulk', { transactions, atomic });
+        } catch (error) {
+            console.error('批量导入交易失败:', error);
+            throw error;
+        }
+    },
+
     updateTransaction: async (transactionId, data) => {
         try {
             const updateData = {